@@ -1,26 +1,84 @@
-from langchain import hub
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import Tool, AgentExecutor, create_react_agent
-from langchain_experimental.plan_and_execute import (
-    PlanAndExecute,
-    load_agent_executor,
-    load_chat_planner
-)
+import queue
+import threading
+from contextlib import contextmanager
 
 from config import Config
+from agents.prompts import REACT_HUB_PROMPT, local_react_prompt
 from tools.threat_intelligence_tools import IPIntelligenceTool
 from tools.threat_intelligence_tools import GeolocationTool
 from tools.threat_intelligence_tools import MalwareAnalysisTool
 from tools.threat_intelligence_tools import ThreatScoreAssessmentTool
 from tools.threat_intelligence_tools import Retrieve_IP_Info
+from tools.threat_intelligence_tools import get_shared_ti_lookup
+from tools.output_compactor import RETRIEVAL_TOOL_NAME, get_shared_compactor
+from telemetry.tracing import traced
+
+# langchain, langchain_experimental and langchain_google_genai take seconds to
+# import, so they are loaded on first use rather than when this module is
+# imported; the fast path never needs them
+
+# The hub prompt is pulled at most once per process and shared by all factories
+_prompt_lock = threading.Lock()
+_react_prompt = None
+
+
+def get_react_prompt(use_local: bool = False):
+    """Return the ReAct base prompt, pulling it from the hub only on first use"""
+    global _react_prompt
+    with _prompt_lock:
+        if _react_prompt is None:
+            if use_local:
+                _react_prompt = local_react_prompt()
+            else:
+                try:
+                    from langchain import hub
+                    _react_prompt = hub.pull(REACT_HUB_PROMPT)
+                except Exception as e:
+                    print(f"⚠️ Could not pull '{REACT_HUB_PROMPT}' from hub, using bundled prompt: {str(e)}")
+                    _react_prompt = local_react_prompt()
+        return _react_prompt
+
+
+class AgentExecutorPool:
+    """Thread-safe pool of reusable agent executors, built lazily up to max_size"""
+
+    def __init__(self, builder, max_size: int, reset=None):
+        self._builder = builder
+        self._reset = reset
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def acquire(self):
+        """Check out an executor for exclusive use by the calling worker"""
+        self._slots.acquire()
+        try:
+            try:
+                executor = self._idle.get_nowait()
+            except queue.Empty:
+                executor = self._builder()
+            try:
+                yield executor
+            finally:
+                if self._reset:
+                    self._reset(executor)
+                self._idle.put(executor)
+        finally:
+            self._slots.release()
+
+
+def _reset_step_container(agent):
+    from langchain_experimental.plan_and_execute.schema import ListStepContainer
+
+    # PlanAndExecute keeps completed steps on the instance between calls
+    agent.step_container = ListStepContainer()
+
 
 class ThreatIntelAgentFactory:
     def __init__(self, config: Config):
         self.config = config
-        self.llm = ChatGoogleGenerativeAI(
-            model=config.LLM_MODEL,
-            temperature=config.LLM_TEMPERATURE
-        )
+        self._llm = None
+        self._llm_lock = threading.Lock()
 
         # Initialize tools
         self.ip_intel_tool = IPIntelligenceTool(config)
@@ -29,49 +87,137 @@ class ThreatIntelAgentFactory:
         self.threat_Score_Assessment_tool = ThreatScoreAssessmentTool(config)
         self.retrieve_IP_Info_tool = Retrieve_IP_Info(config)
 
+        self._tools = None
+        self._tools_lock = threading.Lock()
+
+        # Executors are reused across alerts/queries instead of rebuilt per call
+        self._react_pool = AgentExecutorPool(self.create_react_agent, config.AGENT_POOL_SIZE)
+        self._plan_execute_pool = AgentExecutorPool(
+            self.create_plan_execute_agent,
+            config.AGENT_POOL_SIZE,
+            reset=_reset_step_container
+        )
+
+    @property
+    def llm(self):
+        """Gemini chat model, created on first use and backed by the shared LLM response cache"""
+        with self._llm_lock:
+            if self._llm is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                from agents.llm_cache import get_shared_llm_cache
+                from agents.llm_metrics import LLMMetricsHandler
+                self._llm = ChatGoogleGenerativeAI(
+                    model=self.config.LLM_MODEL,
+                    temperature=self.config.LLM_TEMPERATURE,
+                    cache=get_shared_llm_cache(self.config),
+                    callbacks=[LLMMetricsHandler()]
+                )
+            return self._llm
+
+    @llm.setter
+    def llm(self, llm):
+        """Use another chat model (e.g. the load-test stub); agents built afterwards pick it up"""
+        with self._llm_lock:
+            self._llm = llm
+
+    def llm_cache_stats(self):
+        """Stats of the LLM response cache, or None until the LLM has been used (or with no cache)"""
+        cache = self._llm.cache if self._llm is not None else None
+        return cache.stats() if hasattr(cache, "stats") else None
+
     def _create_tools(self):
-        """Create LangChain tools"""
-        return [
-            Tool(
-                name="IP_Intelligence",
-                func=self.ip_intel_tool.process,
-                description="Retrieve threat intelligence for an IP address"
-            ),
-            Tool(
-                name="Geolocation",
-                func=self.geolocation_tool.process,
-                description="Perform geolocation lookup for an IP address, providing city, region, country, and organization details"
-            ),
-            Tool(
-                name="Malware_Analysis",
-                func=self.malware_tool.process,
-                description="Analyze file hash for malware characteristics"
-            ),
-            Tool(
-                name="Threat_Score_Assessment",
-                func=self.threat_Score_Assessment_tool.process,
-                description="Calculate a comprehensive threat score for an IP address based on multiple intelligence sources"
-            ),
-            Tool(
-                name="Retrieve_IP_Info",
-                func=self.retrieve_IP_Info_tool.process,
-                description="Retrieve threat intelligence information for an IP address from VirusTotal"
-            ),
-        ]
+        """
+        Create LangChain tools (built once and shared by every executor)
+
+        Each call is timed as a tool.<name> span, and results over the tool's
+        token budget are summarised before they reach the agent's scratchpad
+        """
+        with self._tools_lock:
+            if self._tools is None:
+                from langchain.agents import Tool
+                compactor = get_shared_compactor(self.config)
+
+                def tool_func(name, func):
+                    return traced(f"tool.{name}", compactor.wrap(name, func) if compactor else func)
+
+                self._tools = [
+                    Tool(
+                        name="IP_Intelligence",
+                        func=tool_func("IP_Intelligence", self.ip_intel_tool.process),
+                        description="Retrieve threat intelligence for an IP address"
+                    ),
+                    Tool(
+                        name="Geolocation",
+                        func=tool_func("Geolocation", self.geolocation_tool.process),
+                        description="Perform geolocation lookup for an IP address, providing city, region, country, and organization details"
+                    ),
+                    Tool(
+                        name="Malware_Analysis",
+                        func=tool_func("Malware_Analysis", self.malware_tool.process),
+                        description="Analyze file hash for malware characteristics"
+                    ),
+                    Tool(
+                        name="Threat_Score_Assessment",
+                        func=tool_func("Threat_Score_Assessment", self.threat_Score_Assessment_tool.process),
+                        description="Calculate a comprehensive threat score for an IP address based on multiple intelligence sources"
+                    ),
+                    Tool(
+                        name="Retrieve_IP_Info",
+                        func=tool_func("Retrieve_IP_Info", self.retrieve_IP_Info_tool.process),
+                        description="Retrieve threat intelligence information for an IP address from VirusTotal"
+                    ),
+                ]
+                if compactor:
+                    self._tools.append(Tool(
+                        name=RETRIEVAL_TOOL_NAME,
+                        func=traced(f"tool.{RETRIEVAL_TOOL_NAME}", compactor.retrieve),
+                        description="Page through the full records of a summarised tool output. Input: the "
+                                    "full_result_id, optionally followed by a space and the next_offset to continue from"
+                    ))
+            return self._tools
 
     def create_react_agent(self):
         """Create a React-style agent"""
+        from langchain.agents import AgentExecutor, create_react_agent
+
         tools = self._create_tools()
-        base_prompt = hub.pull("langchain-ai/react-agent-template")
+        base_prompt = get_react_prompt(self.config.USE_LOCAL_PROMPT)
         prompt = base_prompt.partial(instructions="Utilize tools to answer threat intelligence queries")
 
         react_agent = create_react_agent(self.llm, tools, prompt)
         return AgentExecutor(agent=react_agent, tools=tools, verbose=True)
 
     def create_plan_execute_agent(self):
-        """Create a Plan-and-Execute agent"""
+        """Create a Plan-and-Execute agent (independent steps run in parallel unless PLAN_MAX_PARALLEL_STEPS is 1)"""
+        from langchain_experimental.plan_and_execute import (
+            PlanAndExecute,
+            load_agent_executor,
+            load_chat_planner
+        )
+
         tools = self._create_tools()
         planner = load_chat_planner(self.llm)
         executor = load_agent_executor(self.llm, tools, verbose=True)
 
-        return PlanAndExecute(planner=planner, executor=executor)
\ No newline at end of file
+        if self.config.PLAN_MAX_PARALLEL_STEPS > 1:
+            from agents.plan_execute_agent import ParallelPlanAndExecute
+            return ParallelPlanAndExecute(
+                planner=planner,
+                executor=executor,
+                max_parallel_steps=self.config.PLAN_MAX_PARALLEL_STEPS
+            )
+        return PlanAndExecute(planner=planner, executor=executor)
+
+    def react_agent(self):
+        """Borrow a pooled React agent: ``with factory.react_agent() as agent: ...``"""
+        return self._react_pool.acquire()
+
+    def plan_execute_agent(self):
+        """Borrow a pooled Plan-and-Execute agent"""
+        return self._plan_execute_pool.acquire()
+
+    def warm_up(self):
+        """Load the agent backends and provider registry ahead of the first query"""
+        get_shared_ti_lookup()
+        with self.react_agent():
+            pass
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+
+from telemetry.metrics import REGISTRY
+from triage.ioc_extractor import extract_iocs_from_text
+
+# Tokens that differ between otherwise identical alerts and never change the analysis
+_VOLATILE_PATTERNS = (
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?\b"), "<timestamp>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<uuid>"),
+)
+_WHITESPACE = re.compile(r"\s+")
+
+# Only model outputs are ever cached; refuse to rebuild anything else from the database
+_CACHED_CLASSES = (Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk)
+# loads() warns it is in beta on use; every cache hit would repeat it
+warnings.filterwarnings("ignore", message=r"The function `loads` is in beta")
+
+
+def normalize_prompt(prompt: str, mask_volatile: bool = True) -> str:
+    """Collapse whitespace and (optionally) mask timestamps and UUIDs so near-identical prompts share a key"""
+    if mask_volatile:
+        for pattern, placeholder in _VOLATILE_PATTERNS:
+            prompt = pattern.sub(placeholder, prompt)
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def _generation_tokens(generation: Generation, prompt: str) -> int:
+    """Tokens the LLM call cost, from its usage metadata or estimated at ~4 characters per token"""
+    message = getattr(generation, "message", None)
+    usage = getattr(message, "usage_metadata", None) or (generation.generation_info or {}).get("usage_metadata") or {}
+    total = usage.get("total_tokens") or usage.get("total_token_count")
+    if total:
+        return int(total)
+    return (len(prompt) + len(generation.text)) // 4
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Exact-match LLM response cache on SQLite, plugged into the chat model
+
+    Entries are keyed by the normalized prompt and the model settings. For
+    the ReAct agent each prompt carries the scratchpad, i.e. every tool
+    observation so far, so a cached step is only reused when the tools
+    returned the same enrichment data; fresh data changes the key. Entries
+    are also tagged with the observables in their prompt and can be dropped
+    explicitly with invalidate_observable(), which the shared enrichment
+    cache calls when an IOC is invalidated there.
+
+    Each entry remembers the tokens and latency of the call that produced
+    it, so hits report how much LLM time and spend the cache saved.
+    """
+
+    def __init__(self, path: str = ":memory:", ttl: float = 3600, mask_volatile: bool = True):
+        self.path = path
+        self.ttl = ttl
+        self.mask_volatile = mask_volatile
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, llm_string TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL, tokens INTEGER NOT NULL, latency REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache_iocs (ioc TEXT NOT NULL, key TEXT NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_iocs_ioc ON llm_cache_iocs (ioc)")
+
+        # Start time of each miss, so update() knows how long the real call took
+        self._pending: "OrderedDict[str, float]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "saved_tokens": 0, "saved_seconds": 0.0, "invalidated": 0}
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, prompt: str, llm_string: str) -> str:
+        normalized = normalize_prompt(prompt, self.mask_volatile)
+        return hashlib.sha256(f"{llm_string}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, tokens, latency FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None or row[1] <= time.time():
+            with self._stats_lock:
+                self._stats["misses"] += 1
+                self._pending[key] = time.perf_counter()
+                while len(self._pending) > 1024:
+                    self._pending.popitem(last=False)
+            return None
+
+        try:
+            generations = [loads(item, allowed_objects=_CACHED_CLASSES) for item in json.loads(row[0])]
+        except Exception:
+            # Written by an incompatible langchain version; treat as a miss
+            return None
+        with self._stats_lock:
+            self._stats["hits"] += 1
+            self._stats["saved_tokens"] += row[2]
+            self._stats["saved_seconds"] += row[3]
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        key = self.make_key(prompt, llm_string)
+        with self._stats_lock:
+            started = self._pending.pop(key, None)
+        latency = time.perf_counter() - started if started is not None else 0.0
+        tokens = sum(_generation_tokens(generation, prompt) for generation in return_val)
+        now = time.time()
+
+        iocs = {value.lower() for values in extract_iocs_from_text(prompt).values() for value in values}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, value, created_at, expires_at, tokens, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, llm_string, json.dumps([dumps(generation) for generation in return_val]),
+                 now, now + self.ttl, tokens, latency)
+            )
+            self._conn.execute("DELETE FROM llm_cache_iocs WHERE key = ?", (key,))
+            self._conn.executemany("INSERT INTO llm_cache_iocs (ioc, key) VALUES (?, ?)", [(ioc, key) for ioc in iocs])
+
+    def invalidate_observable(self, observable: str) -> int:
+        """Drop every cached response whose prompt mentioned the observable; returns how many"""
+        with self._lock, self._conn:
+            keys = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT key FROM llm_cache_iocs WHERE ioc = ?", (observable.strip().lower(),)
+            )]
+            self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(key,) for key in keys])
+            self._conn.executemany("DELETE FROM llm_cache_iocs WHERE key = ?", [(key,) for key in keys])
+        with self._stats_lock:
+            self._stats["invalidated"] += len(keys)
+        return len(keys)
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM llm_cache_iocs WHERE key IN (SELECT key FROM llm_cache WHERE expires_at < ?)",
+                (time.time(),)
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+
+    def clear(self, **kwargs: Any):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.execute("DELETE FROM llm_cache_iocs")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and the tokens/seconds served from the cache"""
+        with self._stats_lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "saved_seconds": round(self._stats["saved_seconds"], 3),
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            }
+
+    def metric_families(self):
+        """Hit/miss and savings counters for the /metrics endpoint"""
+        stats = self.stats()
+        yield ("threat_intel_llm_cache_lookups_total", "counter", "LLM response cache lookups by result", [
+            ({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])
+        ])
+        yield ("threat_intel_llm_cache_saved_tokens_total", "counter", "LLM tokens served from the cache", [
+            ({}, stats["saved_tokens"])
+        ])
+        yield ("threat_intel_llm_cache_saved_seconds_total", "counter", "LLM call time served from the cache", [
+            ({}, stats["saved_seconds"])
+        ])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+_shared_llm_cache = None
+_shared_llm_cache_lock = threading.Lock()
+
+
+def get_shared_llm_cache(config) -> Optional[LLMResponseCache]:
+    """Return the process-wide LLM cache, or None when LLM_CACHE_TTL is 0"""
+    global _shared_llm_cache
+    if config.LLM_CACHE_TTL <= 0:
+        return None
+    with _shared_llm_cache_lock:
+        if _shared_llm_cache is None:
+            from tools.enrichment_cache import get_shared_cache
+
+            _shared_llm_cache = LLMResponseCache(
+                path=config.LLM_CACHE_DB_PATH or ":memory:",
+                ttl=config.LLM_CACHE_TTL,
+                mask_volatile=config.LLM_CACHE_MASK_VOLATILE
+            )
+            _shared_llm_cache.purge_expired()
+            # Reasoning over an IOC is stale once its enrichment is invalidated
+            get_shared_cache(config).add_invalidation_listener(_shared_llm_cache.invalidate_observable)
+            REGISTRY.register_collector("llm_cache", _shared_llm_cache.metric_families)
+        return _shared_llm_cache
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Any, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from telemetry.metrics import REGISTRY
+from telemetry.tracing import record_span
+
+LLM_CALLS = REGISTRY.counter("threat_intel_llm_calls_total", "LLM calls by outcome", ("outcome",))
+LLM_TOKENS = REGISTRY.counter("threat_intel_llm_tokens_total", "LLM tokens reported by the model", ("kind",))
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Records every chat model call as an "llm" span, plus call and token counters
+
+    Attached to the chat model itself, so planner, executor and ReAct calls
+    are all covered. Token counts come from the model's usage metadata;
+    responses served from the LLM cache are counted as calls but carry no
+    new usage.
+    """
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID) -> float:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        seconds = self._finish(run_id)
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        LLM_CALLS.inc(outcome="ok")
+        if input_tokens:
+            LLM_TOKENS.inc(input_tokens, kind="input")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, kind="output")
+        record_span("llm", seconds, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        seconds = self._finish(run_id)
+        LLM_CALLS.inc(outcome="error")
+        record_span("llm", seconds, outcome="error", error=type(error).__name__)
@@ -0,0 +1,161 @@
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from langchain_core.callbacks.manager import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun
+from langchain_experimental.plan_and_execute import PlanAndExecute
+from langchain_experimental.plan_and_execute.schema import ListStepContainer
+
+from telemetry.tracing import in_current_context
+from triage.ioc_extractor import extract_iocs_from_text
+
+# Wording that makes a step consume the output of the steps before it
+_AGGREGATE_PATTERN = re.compile(
+    r"\b(previous|above|prior|earlier|preceding|results?|findings|outputs?|gathered|collected|"
+    r"combine|correlate|summari[sz]e|aggregate|based on|given|final|overall|conclu\w*|"
+    r"report|answer|respond|compare)\b",
+    re.IGNORECASE
+)
+# Explicit references such as "the IP found in step 2"
+_STEP_REFERENCE_PATTERN = re.compile(r"\bsteps?\s+#?(\d+)", re.IGNORECASE)
+
+
+def infer_step_dependencies(steps: List[str]) -> List[Set[int]]:
+    """
+    Guess which earlier plan steps each step needs, from the step text alone
+
+    A step that names a concrete observable (IP, hash, domain, URL) and does
+    not refer back to other steps can run on its own. Explicit "step N"
+    references create an edge to that step; aggregating wording ("based on
+    the results", "summarize") and steps with nothing concrete to act on
+    depend on every earlier step. The last step produces the final answer,
+    so it always waits for everything else.
+
+    Args:
+        steps (list): Step texts in plan order
+
+    Returns:
+        list: For each step, the set of indices of earlier steps it depends on
+    """
+    dependencies = []
+    for index, text in enumerate(steps):
+        earlier = set(range(index))
+        references = {int(n) - 1 for n in _STEP_REFERENCE_PATTERN.findall(text)}
+        references = {ref for ref in references if 0 <= ref < index}
+
+        if index == len(steps) - 1 or _AGGREGATE_PATTERN.search(text):
+            dependencies.append(earlier)
+        elif references:
+            dependencies.append(references)
+        elif any(extract_iocs_from_text(text).values()):
+            dependencies.append(set())
+        else:
+            # Nothing to act on by itself (e.g. "look up the IP from the alert")
+            dependencies.append(earlier)
+    return dependencies
+
+
+def plan_waves(dependencies: List[Set[int]]) -> List[List[int]]:
+    """Group steps into waves that can run together; each wave only needs earlier waves"""
+    level = []
+    for deps in dependencies:
+        level.append(max((level[dep] + 1 for dep in deps), default=0))
+    waves = [[] for _ in range(max(level, default=-1) + 1)]
+    for index, wave in enumerate(level):
+        waves[wave].append(index)
+    return waves
+
+
+class ParallelPlanAndExecute(PlanAndExecute):
+    """
+    Plan-and-Execute agent that runs independent plan steps concurrently
+
+    The plan is split into waves with infer_step_dependencies(); steps in a
+    wave are executed at the same time, each seeing only the responses of
+    the steps it depends on. Responses are added to the step container in
+    plan order once the wave finishes, so the final answer and the recorded
+    steps do not depend on which call returned first. max_parallel_steps=1
+    only runs the steps one at a time: each still sees just its dependencies,
+    not every earlier step as in PlanAndExecute, which is why the agent
+    factory builds a plain PlanAndExecute when PLAN_MAX_PARALLEL_STEPS is 1.
+    """
+
+    max_parallel_steps: int = 4
+
+    def _step_inputs(self, inputs: Dict[str, Any], step, deps: Set[int], completed: Dict[int, Any]) -> Dict[str, Any]:
+        previous = ListStepContainer()
+        for dep in sorted(deps):
+            previous.add_step(*completed[dep])
+        return {
+            "previous_steps": previous,
+            "current_step": step,
+            "objective": inputs[self.input_key],
+            **inputs
+        }
+
+    def _call(
+            self,
+            inputs: Dict[str, Any],
+            run_manager: Optional[CallbackManagerForChainRun] = None
+    ) -> Dict[str, Any]:
+        plan = self.planner.plan(inputs, callbacks=run_manager.get_child() if run_manager else None)
+        if run_manager:
+            run_manager.on_text(str(plan), verbose=self.verbose)
+
+        dependencies = infer_step_dependencies([step.value for step in plan.steps])
+        completed: Dict[int, Any] = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.max_parallel_steps), thread_name_prefix="plan-step") as pool:
+            for wave in plan_waves(dependencies):
+                futures = {
+                    index: pool.submit(
+                        in_current_context(self.executor.step),
+                        self._step_inputs(inputs, plan.steps[index], dependencies[index], completed),
+                        callbacks=run_manager.get_child() if run_manager else None
+                    )
+                    for index in wave
+                }
+                # Collect in plan order, whatever order the calls finished in
+                for index in wave:
+                    completed[index] = (plan.steps[index], futures[index].result())
+
+        for index, step in enumerate(plan.steps):
+            response = completed[index][1]
+            if run_manager:
+                run_manager.on_text(f"*****\n\nStep: {step.value}", verbose=self.verbose)
+                run_manager.on_text(f"\n\nResponse: {response.response}", verbose=self.verbose)
+            self.step_container.add_step(step, response)
+        return {self.output_key: self.step_container.get_final_response()}
+
+    async def _acall(
+            self,
+            inputs: Dict[str, Any],
+            run_manager: Optional[AsyncCallbackManagerForChainRun] = None
+    ) -> Dict[str, Any]:
+        plan = await self.planner.aplan(inputs, callbacks=run_manager.get_child() if run_manager else None)
+        if run_manager:
+            await run_manager.on_text(str(plan), verbose=self.verbose)
+
+        dependencies = infer_step_dependencies([step.value for step in plan.steps])
+        completed: Dict[int, Any] = {}
+        slots = asyncio.Semaphore(max(1, self.max_parallel_steps))
+
+        async def run_step(index: int):
+            async with slots:
+                return await self.executor.astep(
+                    self._step_inputs(inputs, plan.steps[index], dependencies[index], completed),
+                    callbacks=run_manager.get_child() if run_manager else None
+                )
+
+        for wave in plan_waves(dependencies):
+            responses = await asyncio.gather(*(run_step(index) for index in wave))
+            for index, response in zip(wave, responses):
+                completed[index] = (plan.steps[index], response)
+
+        for index, step in enumerate(plan.steps):
+            response = completed[index][1]
+            if run_manager:
+                await run_manager.on_text(f"*****\n\nStep: {step.value}", verbose=self.verbose)
+                await run_manager.on_text(f"\n\nResponse: {response.response}", verbose=self.verbose)
+            self.step_container.add_step(step, response)
+        return {self.output_key: self.step_container.get_final_response()}
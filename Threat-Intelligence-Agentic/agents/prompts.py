@@ -0,0 +1,47 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import PromptTemplate
+
+REACT_HUB_PROMPT = "langchain-ai/react-agent-template"
+
+# Local copy of the hub "react-agent-template", used when the hub cannot be reached
+REACT_AGENT_TEMPLATE = """{instructions}
+
+TOOLS:
+------
+
+You have access to the following tools:
+
+{tools}
+
+To use a tool, please use the following format:
+
+```
+Thought: Do I need to use a tool? Yes
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+```
+
+When you have a response to say to the Human, or if you do not need to use a tool, you MUST use the format:
+
+```
+Thought: Do I need to use a tool? No
+Final Answer: [your response here]
+```
+
+Begin!
+
+Previous conversation history:
+{chat_history}
+
+New input: {input}
+{agent_scratchpad}"""
+
+
+def local_react_prompt() -> "PromptTemplate":
+    """Build the bundled ReAct prompt without any network access"""
+    from langchain_core.prompts import PromptTemplate
+
+    return PromptTemplate.from_template(REACT_AGENT_TEMPLATE).partial(chat_history="")
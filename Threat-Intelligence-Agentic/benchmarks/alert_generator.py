@@ -0,0 +1,108 @@
+"""
+Synthetic alert generator for load tests
+
+Alerts look like the telemetry the listener consumes: a type, source,
+severity, a public source IP and sometimes a destination IP, file hash or
+domain. IOCs are drawn from bounded pools, so the enrichment cache and
+alert aggregation see realistic repeat rates, and a fixed seed replays
+the same stream.
+
+Run from the project root (one JSON alert per line on stdout):
+    python -m benchmarks.alert_generator --alerts 1000 --seed 7 > alerts.jsonl
+"""
+import argparse
+import json
+import random
+from typing import Any, Dict, Iterator, Optional
+
+TYPES = ["ssh_bruteforce", "port_scan", "malware", "phishing", "dns_tunnel", "web_attack", "c2_beacon"]
+SOURCES = ["edr", "ids", "firewall", "proxy", "email"]
+TAGS = ["ransomware", "c2", "lateral-movement", "recon", "credential-access", "benign"]
+# Weighted towards the routine alerts that dominate real feeds
+SEVERITIES = {"low": 45, "info": 15, "medium": 25, "high": 10, "critical": 5}
+
+
+def _public_ip(rng: random.Random) -> str:
+    # Stays clear of the private/reserved ranges the reputation prefilter answers locally
+    while True:
+        first = rng.randint(1, 223)
+        if first not in (10, 100, 127, 169, 172, 192):
+            return f"{first}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+class AlertGenerator:
+    """Deterministic stream of synthetic alerts with bounded IOC pools"""
+
+    def __init__(self, seed: int = 7, unique_ips: int = 500, unique_hashes: int = 200,
+                 hash_ratio: float = 0.3, severities: Optional[Dict[str, int]] = None):
+        self.rng = random.Random(seed)
+        self.ips = [_public_ip(self.rng) for _ in range(unique_ips)]
+        self.hashes = ["%064x" % self.rng.getrandbits(256) for _ in range(unique_hashes)]
+        self.domains = [f"host{i}.example-{i % 37}.net" for i in range(max(unique_ips // 5, 1))]
+        self.hash_ratio = hash_ratio
+        severities = severities or SEVERITIES
+        self.severity_names = list(severities)
+        self.severity_weights = list(severities.values())
+        self._count = 0
+
+    def alert(self) -> Dict[str, Any]:
+        rng = self.rng
+        alert_type = rng.choice(TYPES)
+        alert = {
+            "id": f"alert-{self._count}",
+            "type": alert_type,
+            "source": rng.choice(SOURCES),
+            "severity": rng.choices(self.severity_names, self.severity_weights)[0],
+            "tags": rng.sample(TAGS, rng.randint(0, 2)),
+            "src_ip": rng.choice(self.ips),
+            "message": f"{alert_type} activity from host-{rng.randint(1, 500)}"
+        }
+        if rng.random() < 0.5:
+            alert["network"] = {"dst_ip": rng.choice(self.ips), "dst_port": rng.choice([22, 53, 80, 443, 3389])}
+        if rng.random() < self.hash_ratio:
+            alert["file"] = {"sha256": rng.choice(self.hashes), "name": f"payload-{rng.randint(1, 99)}.exe"}
+        if alert_type in ("phishing", "dns_tunnel", "c2_beacon"):
+            alert["domain"] = rng.choice(self.domains)
+        self._count += 1
+        return alert
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            yield self.alert()
+
+    def take(self, count: int):
+        return [self.alert() for _ in range(count)]
+
+
+def parse_severities(spec: str) -> Dict[str, int]:
+    """"low=60,high=40" -> {"low": 60, "high": 40}"""
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1000, help="Number of alerts to print")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--unique-ips", type=int, default=500, help="Size of the IP pool")
+    parser.add_argument("--unique-hashes", type=int, default=200, help="Size of the file hash pool")
+    parser.add_argument("--hash-ratio", type=float, default=0.3, help="Share of alerts carrying a file hash")
+    parser.add_argument("--severities", help="Severity weights, e.g. low=60,medium=30,high=10")
+    args = parser.parse_args()
+
+    generator = AlertGenerator(
+        seed=args.seed,
+        unique_ips=args.unique_ips,
+        unique_hashes=args.unique_hashes,
+        hash_ratio=args.hash_ratio,
+        severities=parse_severities(args.severities) if args.severities else None
+    )
+    for alert in generator.take(args.alerts):
+        print(json.dumps(alert))
+
+
+if __name__ == "__main__":
+    main()
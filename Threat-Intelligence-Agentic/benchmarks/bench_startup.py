@@ -0,0 +1,88 @@
+"""
+Cold import cost of each entry point, measured in fresh interpreters
+
+Every module is imported --runs times in a new `python -X importtime`
+process (so nothing is cached in sys.modules) and the median wall time is
+reported, together with the heaviest top-level packages it pulled in.
+
+Run from the project root:
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --max-seconds 1.5 ui.nats_listener
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "ui.nats_listener",
+    "ui.streamlit_app",
+    "agents.agent_factory",
+    "triage.fast_path",
+    "tools.threat_intelligence_tools",
+    "triage.ioc_extractor"
+]
+
+_PROBE = (
+    "import importlib, time\n"
+    "start = time.perf_counter()\n"
+    "importlib.import_module({module!r})\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def measure(module: str, cwd: str):
+    """Import module in a fresh interpreter; returns (seconds, {top-level package: cumulative µs})"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    packages = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip()) == 1:
+            top = name.strip().split(".")[0]
+            packages[top] = packages.get(top, 0) + int(cumulative)
+    return float(proc.stdout.strip().splitlines()[-1]), packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS, help="Modules to import (default: entry points)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages listed per module")
+    parser.add_argument("--max-seconds", type=float, help="Exit non-zero if any median exceeds this")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    slow = []
+    for module in args.modules:
+        try:
+            samples = [measure(module, cwd) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:<36} failed: {e}")
+            slow.append(module)
+            continue
+
+        median = statistics.median(seconds for seconds, _ in samples)
+        print(f"{module:<36} {median * 1000:8.1f} ms (median of {args.runs})")
+        heaviest = sorted(samples[0][1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for package, micros in heaviest:
+            print(f"    {package:<32} {micros / 1000:8.1f} ms")
+
+        if args.max_seconds is not None and median > args.max_seconds:
+            slow.append(module)
+
+    if slow:
+        raise SystemExit(f"Startup budget exceeded or import failed: {', '.join(slow)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Check that batch threat scoring matches the scalar path, and time both
+
+Run from the project root:
+    python -m benchmarks.bench_threat_scoring --rows 200000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from tools.threat_intelligence_tools import ThreatScoreCalculator
+
+COUNTRIES = ['US', 'RU', 'CN', 'DE', 'TH', 'IR', 'KP', 'NL', 'BR', None]
+ORGS = [
+    'AS13335 Cloudflare, Inc.',
+    'AS16509 Amazon Cloud Provider',
+    'AS24940 Hetzner Hosting Provider',
+    'AS7922 Comcast Cable',
+    'Unknown',
+    '',
+    None
+]
+
+
+def make_rows(rows: int, seed: int):
+    rng = random.Random(seed)
+    sample_counts = [rng.choice([0, 0, 0, 1, 2, 5, 9, 10, 11, 40]) for _ in range(rows)]
+    countries = [rng.choice(COUNTRIES) for _ in range(rows)]
+    organizations = [rng.choice(ORGS) for _ in range(rows)]
+    return sample_counts, countries, organizations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="Number of IPs to score")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sample_counts, countries, organizations = make_rows(args.rows, args.seed)
+    # pandas is imported lazily on the first batch call; keep that one-off cost out of the timing
+    ThreatScoreCalculator.calculate_threat_scores(sample_counts[:10], countries[:10], organizations[:10])
+
+    start = time.perf_counter()
+    scalar = [
+        ThreatScoreCalculator.score(count, country, org)
+        for count, country, org in zip(sample_counts, countries, organizations)
+    ]
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = ThreatScoreCalculator.calculate_threat_scores(sample_counts, countries, organizations)
+    batch_elapsed = time.perf_counter() - start
+
+    expected_scores = np.array([score for score, _ in scalar])
+    expected_levels = np.array([level for _, level in scalar])
+    mismatches = int(np.count_nonzero(expected_scores != batch["threat_score"]))
+    mismatches += int(np.count_nonzero(expected_levels != batch["risk_level"]))
+
+    print(f"rows:          {args.rows}")
+    print(f"scalar:        {scalar_elapsed:.3f} s ({args.rows / scalar_elapsed:,.0f} IPs/s)")
+    print(f"batch:         {batch_elapsed:.3f} s ({args.rows / batch_elapsed:,.0f} IPs/s)")
+    print(f"speedup:       {scalar_elapsed / batch_elapsed:.1f}x")
+    print(f"mismatches:    {mismatches}")
+    if mismatches:
+        raise SystemExit("Batch scoring diverged from the scalar path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Check the compiled triage rules against triage_alert(), and time both
+
+The shipped config/triage_rules.json mirrors triage_alert(), so any label
+mismatch is reported as a failure; pass --rules to time a custom rule set
+(mismatches are then expected and only counted).
+
+--blocklist N wires in the reputation prefilter as the listener does, with
+N blocklisted addresses outside the replay's range, so labels still match
+triage_alert() but the blocklisted-ioc rule has to consult reputation.
+IOCs are extracted up front, as AlertPipeline already has them.
+
+Run from the project root:
+    python -m benchmarks.bench_triage_rules --alerts 200000
+    python -m benchmarks.bench_triage_rules --alerts 200000 --blocklist 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from tools.reputation_prefilter import ReputationPrefilter
+from triage.ioc_extractor import extract_iocs_from_alert
+from triage.rules_engine import TriageRulesEngine
+from triage.triage_logic import triage_alert
+
+DEFAULT_RULES = "config/triage_rules.json"
+SEVERITIES = [
+    "critical", "Critical", "high", "sev-high", "medium", "moderate", "sev-med",
+    "low", "info", "sev-low", "LOW", "warning", "", "unknown"
+]
+TYPES = ["ssh_bruteforce", "port_scan", "malware", "phishing", "dns_tunnel", "web_attack"]
+SOURCES = ["edr", "ids", "firewall", "proxy", "email"]
+TAGS = ["ransomware", "c2", "lateral-movement", "recon", "credential-access", "benign"]
+
+
+def make_alerts(count: int, seed: int):
+    rng = random.Random(seed)
+    alerts = []
+    for i in range(count):
+        alert = {
+            "id": f"alert-{i}",
+            "type": rng.choice(TYPES),
+            "source": rng.choice(SOURCES),
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+            "src_ip": f"203.0.113.{rng.randint(1, 254)}",
+            "message": f"{rng.choice(TYPES)} activity from host-{rng.randint(1, 500)}"
+        }
+        severity = rng.choice(SEVERITIES)
+        if severity:
+            alert["severity"] = severity
+        alerts.append(alert)
+    return alerts
+
+
+def best_of(repeat: int, func):
+    """Fastest of repeat runs, so one noisy run does not decide the comparison; returns (seconds, result)"""
+    best, result = None, None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=200000, help="Number of alerts to triage")
+    parser.add_argument("--rules", default=DEFAULT_RULES, help="Rules file to evaluate")
+    parser.add_argument("--blocklist", type=int, default=0, help="Blocklisted addresses for the reputation prefilter")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per implementation; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    alerts = make_alerts(args.alerts, args.seed)
+    prefilter, extracted = None, None
+    if args.blocklist:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as feed:
+            # 198.51.0.0/16 never overlaps the replay's 203.0.113.0/24 sources
+            feed.write("\n".join(f"198.51.{i // 256 % 256}.{i % 256}" for i in range(args.blocklist)))
+        try:
+            prefilter = ReputationPrefilter(blocklist_files=[feed.name])
+        finally:
+            os.unlink(feed.name)
+        extracted = [extract_iocs_from_alert(alert) for alert in alerts]
+
+    start = time.perf_counter()
+    engine = TriageRulesEngine.from_file(args.rules, reputation=prefilter.reputation if prefilter else None)
+    compile_elapsed = time.perf_counter() - start
+
+    scalar_elapsed, expected = best_of(args.repeat, lambda: [triage_alert(alert) for alert in alerts])
+    batch_elapsed, labels = best_of(args.repeat, lambda: engine.triage_batch(alerts, extracted))
+
+    mismatches = sum(1 for a, b in zip(expected, labels) if a != b)
+
+    print(f"alerts:        {args.alerts}")
+    print(f"rules:         {len(engine)} ({args.rules}, compiled in {compile_elapsed * 1000:.1f} ms)")
+    print(f"triage_alert:  {scalar_elapsed:.3f} s ({args.alerts / scalar_elapsed:,.0f} alerts/s)")
+    print(f"triage_batch:  {batch_elapsed:.3f} s ({args.alerts / batch_elapsed:,.0f} alerts/s)")
+    print(f"speedup:       {scalar_elapsed / batch_elapsed:.1f}x")
+    if prefilter:
+        checks = prefilter.stats["checks"] // max(1, args.repeat)
+        print(f"reputation:    {checks} lookups per run for {args.blocklist} blocklisted addresses")
+    print(f"mismatches:    {mismatches}")
+    if mismatches and args.rules == DEFAULT_RULES:
+        raise SystemExit("Compiled rules diverged from triage_alert()")
+
+
+if __name__ == "__main__":
+    main()
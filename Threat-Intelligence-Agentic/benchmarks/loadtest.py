@@ -0,0 +1,347 @@
+"""
+End-to-end load test of the NATS alert listener against local stand-ins
+
+Starts the mock VirusTotal/ipinfo server, swaps Gemini for the stub chat
+model, runs the real listener in-process and replays synthetic alerts to a
+local nats-server at a target rate. Reports p50/p95/p99 per stage
+(triage, enrichment, agent, history write, end to end) and alerts/second.
+
+Needs a local nats-server (with -js for --jetstream):
+    nats-server -js
+
+Run from the project root:
+    python -m benchmarks.loadtest --alerts 2000 --rate 200
+    python -m benchmarks.loadtest --alerts 2000 --rate 200 --save-baseline data/loadtest_baseline.json
+    python -m benchmarks.loadtest --alerts 2000 --rate 200 --baseline data/loadtest_baseline.json
+
+With --baseline the run fails when a stage's p95 or the throughput is
+worse than the baseline by more than --max-regression, so it can gate
+every performance change.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from benchmarks.alert_generator import AlertGenerator, parse_severities
+from benchmarks.mock_providers import MockProviderServer, install_ti_lookup
+
+STAGES = ("triage", "enrichment", "agent", "history_write", "end_to_end")
+SENT_AT_FIELD = "loadtest_sent_at"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+
+class StageRecorder:
+    """Thread-safe latency samples per pipeline stage"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def timed(self, stage: str, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def timed_context(self, stage: str, factory):
+        @contextmanager
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with factory(*args, **kwargs) as value:
+                    yield value
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def timed_async(self, stage: str, func):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        with self._lock:
+            for stage, values in self.samples.items():
+                values = sorted(values)
+                report[stage] = {
+                    "count": len(values),
+                    "p50_ms": round(percentile(values, 50) * 1000, 2),
+                    "p95_ms": round(percentile(values, 95) * 1000, 2),
+                    "p99_ms": round(percentile(values, 99) * 1000, 2),
+                    "max_ms": round(values[-1] * 1000, 2) if values else 0.0
+                }
+        return report
+
+
+def _configure_environment(args, provider_url: str, history_dir: str):
+    """Point the listener's Config at the stand-ins; explicit environment settings still win"""
+    defaults = {
+        "VIRUSTOTAL_API_KEY": "loadtest",
+        "IPINFO_API_KEY": "loadtest",
+        "GOOGLE_API_KEY": "loadtest",
+        "NATS_URL": args.nats_url,
+        "NATS_SUBJECT": args.subject,
+        "NATS_QUEUE_GROUP": "",
+        "NATS_JETSTREAM": "true" if args.jetstream else "false",
+        "JS_STREAM": "LOADTEST",
+        "JS_DURABLE": "loadtest",
+        "JS_DEAD_LETTER_SUBJECT": f"{args.subject}.deadletter",
+        "JS_BACKOFF_BASE": "0.5",
+        "JS_BACKOFF_MAX": "2",
+        "HEALTH_PORT": "0",
+        "LISTENER_WARM_UP": "false",
+        "USE_LOCAL_PROMPT": "true",
+        "LLM_CACHE_TTL": "0",
+        "CACHE_DB_PATH": "",
+        "RATE_LIMIT_VIRUSTOTAL_PER_MIN": "0",
+        "RATE_LIMIT_IPINFO_PER_MIN": "0"
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    # Always the stand-ins and a throwaway history, whatever .env says
+    os.environ["IPINFO_BASE_URL"] = f"{provider_url}/ipinfo"
+    os.environ["VIRUSTOTAL_BASE_URL"] = f"{provider_url}/virustotal/api/v3"
+    os.environ["HISTORY_DIR"] = history_dir
+    if args.workers:
+        os.environ["ALERT_WORKERS"] = str(args.workers)
+
+
+def _instrument(listener, recorder: StageRecorder):
+    """Wrap the stage entry points of one listener instance with timers"""
+    import triage.alert_pipeline as alert_pipeline
+
+    pipeline = listener.pipeline
+    if pipeline.rules is not None:
+        pipeline.rules.triage = recorder.timed("triage", pipeline.rules.triage)
+    else:
+        alert_pipeline.triage_alert = recorder.timed("triage", alert_pipeline.triage_alert)
+    pipeline.fast_path.enrich = recorder.timed("enrichment", pipeline.fast_path.enrich)
+    pipeline.agent_factory.react_agent = recorder.timed_context("agent", pipeline.agent_factory.react_agent)
+
+    write = recorder.timed_async("history_write", listener.history_writer.write)
+
+    async def write_and_record(record: Dict[str, Any]):
+        result = await write(record)
+        sent_at = (record.get("alert") or {}).get(SENT_AT_FIELD)
+        if sent_at and "aggregation" not in record:
+            recorder.record("end_to_end", time.time() - sent_at)
+        return result
+
+    listener.history_writer.write = write_and_record
+
+
+async def _replay(args, alerts: List[Dict[str, Any]]) -> float:
+    """Publish alerts at args.rate per second; returns the achieved publish rate"""
+    import nats
+
+    nc = await nats.connect(args.nats_url)
+    js = nc.jetstream() if args.jetstream else None
+    start = time.perf_counter()
+    for index, alert in enumerate(alerts):
+        delay = start + index / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        alert[SENT_AT_FIELD] = time.time()
+        payload = json.dumps(alert).encode()
+        if js is not None:
+            await js.publish(args.subject, payload)
+        else:
+            await nc.publish(args.subject, payload)
+    await nc.flush()
+    elapsed = time.perf_counter() - start
+    await nc.close()
+    return len(alerts) / elapsed if elapsed else float("inf")
+
+
+async def _drop_streams(args):
+    import nats
+    from nats.js.errors import NotFoundError
+
+    nc = await nats.connect(args.nats_url)
+    js = nc.jetstream()
+    for stream in (os.environ["JS_STREAM"], f"{os.environ['JS_STREAM']}_DLQ"):
+        try:
+            await js.delete_stream(stream)
+        except NotFoundError:
+            pass
+    await nc.close()
+
+
+async def run(args) -> Dict[str, Any]:
+    mock = MockProviderServer(
+        latency_ms=args.provider_latency_ms,
+        jitter_ms=args.provider_latency_ms / 4,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed
+    )
+    provider_url = mock.start()
+    history_dir = tempfile.mkdtemp(prefix="loadtest-history-")
+    _configure_environment(args, provider_url, history_dir)
+
+    from agents.llm_metrics import LLMMetricsHandler
+    from benchmarks.stub_llm import StubChatModel
+    from tools.enrichment_cache import get_shared_cache
+    from ui.nats_listener import NATSAlertListener
+
+    install_ti_lookup(provider_url)
+    if args.jetstream:
+        await _drop_streams(args)
+
+    quiet = open(os.devnull, "w") if args.quiet else None
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        listener = NATSAlertListener(processes=0)
+        llm = StubChatModel(latency_ms=args.llm_latency_ms, callbacks=[LLMMetricsHandler()])
+        listener.pipeline.agent_factory.llm = llm
+        recorder = StageRecorder()
+        _instrument(listener, recorder)
+
+        listen = asyncio.create_task(listener.connect_and_listen())
+        while not listener._subscribed:
+            if listen.done():
+                listen.result()
+            await asyncio.sleep(0.05)
+
+        generator = AlertGenerator(
+            seed=args.seed,
+            unique_ips=args.unique_ips,
+            hash_ratio=args.hash_ratio,
+            severities=parse_severities(args.severities) if args.severities else None
+        )
+        alerts = generator.take(args.alerts)
+        start = time.perf_counter()
+        publish_rate = await _replay(args, alerts)
+
+        def settled():
+            if listener._jetstream is not None:
+                # Failed alerts are redelivered, so only acks and dead letters are final
+                return listener._jetstream.stats["acked"] + listener._jetstream.stats["dead_lettered"]
+            suppressed = listener.aggregator.stats["suppressed"] if listener.aggregator is not None else 0
+            return listener.stats["processed"] + listener.stats["failed"] + suppressed
+
+        deadline = time.perf_counter() + args.timeout
+        while settled() < len(alerts) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.02)
+        elapsed = time.perf_counter() - start
+
+        listener.stop()
+        await listen
+    if quiet:
+        quiet.close()
+    mock.stop()
+    if args.jetstream:
+        await _drop_streams(args)
+
+    return {
+        "alerts": len(alerts),
+        "settled": settled(),
+        "elapsed_s": round(elapsed, 3),
+        "alerts_per_s": round(settled() / elapsed, 1),
+        "publish_rate": round(publish_rate, 1),
+        "listener": dict(listener.stats),
+        "jetstream": dict(listener._jetstream.stats) if listener._jetstream is not None else None,
+        "aggregation": dict(listener.aggregator.stats) if listener.aggregator is not None else None,
+        "stages": recorder.summary(),
+        "providers": dict(mock.stats),
+        "enrichment_cache": get_shared_cache(listener.config).stats(),
+        "llm": {"calls": llm.calls, "prompt_tokens": llm.prompt_tokens},
+        "history_dir": history_dir
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Stage p95s and throughput that got worse than the baseline by more than max_regression"""
+    regressions = []
+    for stage, stats in result["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {})
+        # Sub-millisecond stages are too noisy to gate on
+        if stats["count"] and before.get("count") and before["p95_ms"] >= 1.0:
+            if stats["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+                regressions.append(f"{stage} p95 {before['p95_ms']} ms -> {stats['p95_ms']} ms")
+    if baseline.get("alerts_per_s") and result["alerts_per_s"] < baseline["alerts_per_s"] * (1 - max_regression):
+        regressions.append(f"throughput {baseline['alerts_per_s']} -> {result['alerts_per_s']} alerts/s")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"alerts:        {result['alerts']} ({result['settled']} settled, listener {result['listener']})")
+    print(f"throughput:    {result['alerts_per_s']} alerts/s over {result['elapsed_s']} s "
+          f"(published at {result['publish_rate']}/s)")
+    print(f"{'stage':<15}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<15}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print(f"aggregation:   {result['aggregation']}")
+    print(f"providers:     {result['providers']}")
+    print(f"cache:         {result['enrichment_cache']}")
+    print(f"llm:           {result['llm']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1000, help="Alerts to replay")
+    parser.add_argument("--rate", type=float, default=100.0, help="Target publish rate (alerts/s)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--unique-ips", type=int, default=500, help="IP pool size (drives cache hit rate)")
+    parser.add_argument("--hash-ratio", type=float, default=0.3, help="Share of alerts carrying a file hash")
+    parser.add_argument("--severities", help="Severity weights, e.g. low=60,medium=30,high=10")
+    parser.add_argument("--workers", type=int, default=0, help="ALERT_WORKERS override")
+    parser.add_argument("--provider-latency-ms", type=float, default=80.0, help="Mean mock provider latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of provider calls failing with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of provider calls answered 429")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Stub LLM latency per call")
+    parser.add_argument("--nats-url", default="nats://localhost:4222")
+    parser.add_argument("--subject", default="loadtest.alerts", help="Subject to replay on (not the live one)")
+    parser.add_argument("--jetstream", action="store_true", help="Consume through the JetStream pull consumer")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for the backlog to drain")
+    parser.add_argument("--quiet", action=argparse.BooleanOptionalAction, default=True,
+                        help="Silence the listener's per-alert output")
+    parser.add_argument("--json", help="Also write the full result to this file")
+    parser.add_argument("--baseline", help="Fail if worse than this saved result")
+    parser.add_argument("--save-baseline", help="Save this run as the baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if result["settled"] < result["alerts"]:
+        raise SystemExit(f"Only {result['settled']} of {result['alerts']} alerts settled within {args.timeout}s")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        if regressions:
+            raise SystemExit("Performance regression against baseline:\n  " + "\n  ".join(regressions))
+        print(f"No regression beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Local stand-ins for VirusTotal and ipinfo.io
+
+One threaded HTTP server answers the endpoints the tools call, with
+deterministic data derived from the observable and configurable latency,
+error (HTTP 500) and throttling (HTTP 429) rates:
+
+    /ipinfo/{ip}/json, POST /ipinfo/batch         -> IPINFO_BASE_URL=<url>/ipinfo
+    /virustotal/api/v3/files/{hash}               -> VIRUSTOTAL_BASE_URL=<url>/virustotal/api/v3
+    /virustotal/vtapi/v2/ip-address/report?ip=    -> MockTILookup (msticpy stand-in)
+
+VirusTotal IP reports normally go through msticpy's TILookup, so
+MockTILookup implements the two TILookup methods the tools use on top of
+the mock server; install_ti_lookup() makes it the shared instance.
+
+Run standalone from the project root:
+    python -m benchmarks.mock_providers --port 8900 --latency-ms 80 --error-rate 0.01
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+COUNTRIES = ["US", "DE", "NL", "SG", "BR", "RU", "CN", "FR", "GB", "IN"]
+ORGS = ["AS13335 Cloudflare", "AS16509 Amazon Hosting Provider", "AS4134 Chinanet", "AS3320 Deutsche Telekom",
+        "AS14061 DigitalOcean Cloud Provider", "AS12389 Rostelecom"]
+
+
+def _digest(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def ipinfo_record(ip: str) -> Dict[str, Any]:
+    d = _digest(ip)
+    return {
+        "ip": ip,
+        "city": f"City-{d % 97}",
+        "region": f"Region-{d % 13}",
+        "country": COUNTRIES[d % len(COUNTRIES)],
+        "loc": f"{(d % 180) - 90}.{d % 1000},{(d % 360) - 180}.{d % 997}",
+        "org": ORGS[(d >> 8) % len(ORGS)]
+    }
+
+
+def vt_ip_report(ip: str, max_samples: int = 40) -> Dict[str, Any]:
+    d = _digest(ip)
+
+    def samples(count: int, offset: int):
+        return [
+            {"date": f"2024-{1 + (i % 12):02d}-{1 + (i % 28):02d} 10:00:00",
+             "positives": (d >> (i % 32)) % 60 + (1 if offset else 0),
+             "total": 70,
+             "sha256": "%064x" % _digest(f"{ip}-{offset}-{i}")}
+            for i in range(count)
+        ]
+
+    # Most IPs have a handful of detections; one in ten is a busy, well-known bad host
+    detected = d % max_samples if d % 10 == 0 else d % 3
+    return {
+        "response_code": 1,
+        "detected_communicating_samples": samples(detected, 1),
+        "undetected_communicating_samples": samples((d >> 16) % max_samples, 0)
+    }
+
+
+def vt_file_object(file_hash: str) -> Optional[Dict[str, Any]]:
+    d = _digest(file_hash.lower())
+    if d % 5 == 0:
+        return None
+    malicious = d % 50
+    return {"data": {"id": file_hash, "type": "file", "attributes": {
+        "last_analysis_stats": {"malicious": malicious, "suspicious": d % 3, "undetected": 70 - malicious, "harmless": 0},
+        "first_submission_date": 1_600_000_000 + d % 50_000_000,
+        "last_submission_date": 1_700_000_000 + d % 10_000_000,
+        "type_description": ["Win32 EXE", "PDF", "ZIP", "ELF"][d % 4],
+        "reputation": -(d % 80)
+    }}}
+
+
+class MockProviderServer:
+    """Threaded HTTP server serving both providers; start() binds and returns the base URL"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 50.0, jitter_ms: float = 20.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 7):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-providers", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _fault(self) -> Tuple[float, Optional[int]]:
+        """Delay for this request and the injected failure status, if any"""
+        with self._rng_lock:
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            roll = self._rng.random()
+            self.stats["requests"] += 1
+            if roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return delay, 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return delay, 500
+        return delay, None
+
+    def route(self, method: str, path: str, query: Dict[str, List[str]], body: bytes) -> Tuple[int, Any]:
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] == ["ipinfo"]:
+            if method == "POST" and parts[1:] == ["batch"]:
+                return 200, {ip: ipinfo_record(ip) for ip in json.loads(body or b"[]")}
+            if len(parts) == 3 and parts[2] == "json":
+                return 200, ipinfo_record(parts[1])
+        if parts[:3] == ["virustotal", "api", "v3"] and len(parts) == 5 and parts[3] == "files":
+            found = vt_file_object(parts[4])
+            return (200, found) if found else (404, {"error": {"code": "NotFoundError"}})
+        if parts[:2] == ["virustotal", "vtapi"] and parts[-1] == "report" and query.get("ip"):
+            return 200, vt_ip_report(query["ip"][0])
+        return 404, {"error": f"no mock for {method} {path}"}
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self, method: str):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                delay, fault = mock._fault()
+                time.sleep(delay)
+                if fault is not None:
+                    status, payload = fault, {"error": "injected failure"}
+                else:
+                    url = urlsplit(self.path)
+                    status, payload = mock.route(method, url.path, parse_qs(url.query), body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class MockTILookup:
+    """The lookup_ioc/lookup_iocs subset of msticpy's TILookup, answered by the mock VirusTotal"""
+
+    def __init__(self, base_url: str):
+        self._client = httpx.Client(base_url=f"{base_url}/virustotal/vtapi/v2", timeout=30)
+
+    def _row(self, ioc: str, ioc_type: str) -> Dict[str, Any]:
+        response = self._client.get("/ip-address/report", params={"ip": ioc})
+        ok = response.status_code == 200
+        return {
+            "Ioc": ioc,
+            "IocType": ioc_type,
+            "Provider": "VirusTotal",
+            "Status": 0 if ok else response.status_code,
+            "RawResult": response.json() if ok else None
+        }
+
+    def lookup_ioc(self, observable: str, ioc_type: str = "ipv4", providers=None):
+        import pandas as pd
+
+        return pd.DataFrame([self._row(observable, ioc_type)])
+
+    def lookup_iocs(self, data, ioc_col: str = "Ioc", ioc_type_col: str = "IocType", providers=None):
+        import pandas as pd
+
+        return pd.DataFrame([self._row(row[ioc_col], row[ioc_type_col]) for _, row in data.iterrows()])
+
+
+def install_ti_lookup(base_url: str) -> MockTILookup:
+    """Make MockTILookup the process-wide TILookup used by the VirusTotal IP tools"""
+    import tools.threat_intelligence_tools as ti_tools
+
+    with ti_tools._shared_ti_lookup_lock:
+        ti_tools._shared_ti_lookup = MockTILookup(base_url)
+        return ti_tools._shared_ti_lookup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    args = parser.parse_args()
+
+    server = MockProviderServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate)
+    url = server.start()
+    print(f"Mock providers on {url}")
+    print(f"  IPINFO_BASE_URL={url}/ipinfo")
+    print(f"  VIRUSTOTAL_BASE_URL={url}/virustotal/api/v3")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
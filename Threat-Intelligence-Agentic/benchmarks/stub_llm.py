@@ -0,0 +1,76 @@
+"""
+Stub chat model for load tests: ReAct-formatted answers without Gemini
+
+Plugged in with ``factory.llm = StubChatModel(...)``. For each prompt it
+looks at the agent scratchpad and either asks for the next tool in a
+fixed plan (IP intelligence and geolocation for the first IP, malware
+analysis for the first hash) or gives the final answer, so agent runs
+exercise the real tools and executor loop. Latency and token usage are
+simulated per call.
+"""
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from triage.ioc_extractor import extract_iocs_from_text
+
+_counter_lock = threading.Lock()
+
+
+class StubChatModel(BaseChatModel):
+    """Deterministic ReAct stand-in for ChatGoogleGenerativeAI"""
+
+    latency_ms: float = 300.0
+    ms_per_1k_prompt_tokens: float = 20.0
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-react"
+
+    @staticmethod
+    def _next_action(prompt: str) -> Optional[str]:
+        # Only the text after the input is scratchpad; the instructions mention "Observation:" too
+        question, _, scratchpad = prompt.rpartition("New input:")
+        if not question:
+            scratchpad = prompt
+        done = scratchpad.count("Observation:")
+        iocs = extract_iocs_from_text(scratchpad.split("Thought:", 1)[0])
+        plan = []
+        ips = iocs["ipv4"] + iocs["ipv6"]
+        if ips:
+            plan += [("IP_Intelligence", ips[0]), ("Geolocation", ips[0])]
+        hashes = iocs["sha256"] + iocs["sha1"] + iocs["md5"]
+        if hashes:
+            plan.append(("Malware_Analysis", hashes[0]))
+        if done < len(plan):
+            tool, tool_input = plan[done]
+            return f"Thought: Do I need to use a tool? Yes\nAction: {tool}\nAction Input: {tool_input}"
+        return None
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        text = self._next_action(prompt) or (
+            "Thought: Do I need to use a tool? No\n"
+            "Final Answer: Enrichment complete; see the tool observations above for the verdict."
+        )
+        prompt_tokens = len(prompt) // 4
+        time.sleep((self.latency_ms + self.ms_per_1k_prompt_tokens * prompt_tokens / 1000) / 1000)
+        with _counter_lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+
+        completion_tokens = len(text) // 4
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
@@ -17,6 +17,130 @@ class Config:
         self.LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-2.0-flash-lite')
         self.LLM_TEMPERATURE = float(os.getenv('LLM_TEMPERATURE', 0.05))
 
+        # การตั้งค่า pipeline สำหรับประมวลผล alert พร้อมกันหลายตัว
+        self.ALERT_WORKERS = int(os.getenv('ALERT_WORKERS', 4))
+        self.ALERT_QUEUE_SIZE = int(os.getenv('ALERT_QUEUE_SIZE', 100))
+
+        # จำนวน agent executor ที่ใช้ซ้ำได้ และใช้ prompt ที่มากับโปรเจกต์แทนการดึงจาก hub
+        self.AGENT_POOL_SIZE = int(os.getenv('AGENT_POOL_SIZE', self.ALERT_WORKERS))
+        self.USE_LOCAL_PROMPT = os.getenv('USE_LOCAL_PROMPT', 'false').lower() == 'true'
+
+        # จำนวน step ของ Plan-and-Execute ที่รันพร้อมกันได้ (1 = รันทีละ step แบบเดิม)
+        self.PLAN_MAX_PARALLEL_STEPS = int(os.getenv('PLAN_MAX_PARALLEL_STEPS', 4))
+
+        # Cache ผลการ enrich IOC (TTL เป็นวินาที, CACHE_DB_PATH ว่าง = เก็บในหน่วยความจำอย่างเดียว)
+        self.CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+        self.CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', '')
+        self.CACHE_TTL_VIRUSTOTAL = float(os.getenv('CACHE_TTL_VIRUSTOTAL', 6 * 3600))
+        self.CACHE_TTL_IPINFO = float(os.getenv('CACHE_TTL_IPINFO', 24 * 3600))
+        self.CACHE_NEGATIVE_TTL = float(os.getenv('CACHE_NEGATIVE_TTL', 15 * 60))
+
+        # จำกัดอัตราการเรียก provider (ครั้งต่อนาที, 0 = ไม่จำกัด) และการ retry เมื่อเจอ 429/5xx
+        self.RATE_LIMIT_VIRUSTOTAL_PER_MIN = float(os.getenv('RATE_LIMIT_VIRUSTOTAL_PER_MIN', 4))
+        self.RATE_LIMIT_VIRUSTOTAL_BURST = int(os.getenv('RATE_LIMIT_VIRUSTOTAL_BURST', 4))
+        self.RATE_LIMIT_IPINFO_PER_MIN = float(os.getenv('RATE_LIMIT_IPINFO_PER_MIN', 600))
+        self.RATE_LIMIT_IPINFO_BURST = int(os.getenv('RATE_LIMIT_IPINFO_BURST', 20))
+        self.PROVIDER_MAX_RETRIES = int(os.getenv('PROVIDER_MAX_RETRIES', 3))
+        self.PROVIDER_BACKOFF_BASE = float(os.getenv('PROVIDER_BACKOFF_BASE', 1.0))
+        self.PROVIDER_BACKOFF_MAX = float(os.getenv('PROVIDER_BACKOFF_MAX', 30.0))
+
+        # HTTP client ของแต่ละ provider: base URL (เปลี่ยนไปใช้ proxy/mock ได้), timeout (วินาที) และจำนวน request พร้อมกันสูงสุด
+        self.IPINFO_BASE_URL = os.getenv('IPINFO_BASE_URL', 'https://ipinfo.io')
+        self.VIRUSTOTAL_BASE_URL = os.getenv('VIRUSTOTAL_BASE_URL', 'https://www.virustotal.com/api/v3')
+        self.IPINFO_TIMEOUT = float(os.getenv('IPINFO_TIMEOUT', 10))
+        self.IPINFO_MAX_CONCURRENCY = int(os.getenv('IPINFO_MAX_CONCURRENCY', 32))
+        self.VIRUSTOTAL_TIMEOUT = float(os.getenv('VIRUSTOTAL_TIMEOUT', 30))
+        self.VIRUSTOTAL_MAX_CONCURRENCY = int(os.getenv('VIRUSTOTAL_MAX_CONCURRENCY', 4))
+
+        # Allowlist/blocklist ในเครื่อง (ไฟล์คั่นด้วย ,) ตัดสิน IOC ก่อนเรียก provider, โหลดใหม่เมื่อไฟล์เปลี่ยน (วินาที)
+        self.REPUTATION_PREFILTER_ENABLED = os.getenv('REPUTATION_PREFILTER_ENABLED', 'true').lower() == 'true'
+        self.REPUTATION_ALLOWLIST_FILES = os.getenv('REPUTATION_ALLOWLIST_FILES', '')
+        self.REPUTATION_BLOCKLIST_FILES = os.getenv('REPUTATION_BLOCKLIST_FILES', '')
+        self.REPUTATION_ALLOW_PRIVATE = os.getenv('REPUTATION_ALLOW_PRIVATE', 'true').lower() == 'true'
+        self.REPUTATION_RELOAD_INTERVAL = float(os.getenv('REPUTATION_RELOAD_INTERVAL', 60))
+
+        # จำนวน thread สูงสุดเมื่อ lookup IOC หลายตัวพร้อมกัน (process_batch)
+        self.BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 8))
+
+        # NATS: replica ที่ใช้ queue group เดียวกันจะแบ่ง alert กัน (ว่าง = subscribe ธรรมดา)
+        self.NATS_URL = os.getenv('NATS_URL', 'nats://localhost:4222')
+        self.NATS_SUBJECT = os.getenv('NATS_SUBJECT', 'alerts.telemetry')
+        self.NATS_QUEUE_GROUP = os.getenv('NATS_QUEUE_GROUP', 'threat-intel-listeners')
+
+        # รวม alert ซ้ำ (fingerprint จาก field ที่เลือก) ภายในช่วงเวลา ให้ enrich ครั้งเดียวพร้อมจำนวนครั้ง
+        self.AGGREGATION_ENABLED = os.getenv('AGGREGATION_ENABLED', 'true').lower() == 'true'
+        self.AGGREGATION_WINDOW = float(os.getenv('AGGREGATION_WINDOW', 60))
+        self.AGGREGATION_FIELDS = os.getenv(
+            'AGGREGATION_FIELDS',
+            'type,severity,rule,rule_id,src_ip,dst_ip,network.src_ip,network.dst_ip'
+        )
+        self.AGGREGATION_MAX_FINGERPRINTS = int(os.getenv('AGGREGATION_MAX_FINGERPRINTS', 50000))
+        self.AGGREGATION_BYPASS_SEVERITIES = os.getenv('AGGREGATION_BYPASS_SEVERITIES', 'critical')
+
+        # JetStream pull consumer: ack หลังเขียน history, retry แบบ backoff, ส่ง alert ที่ล้มเหลวซ้ำไป dead-letter
+        self.NATS_JETSTREAM = os.getenv('NATS_JETSTREAM', 'false').lower() == 'true'
+        self.JS_STREAM = os.getenv('JS_STREAM', 'ALERTS')
+        self.JS_DURABLE = os.getenv('JS_DURABLE', 'threat-intel-listener')
+        self.JS_CREATE_STREAMS = os.getenv('JS_CREATE_STREAMS', 'true').lower() == 'true'
+        self.JS_FETCH_BATCH = int(os.getenv('JS_FETCH_BATCH', 32))
+        self.JS_FETCH_TIMEOUT = float(os.getenv('JS_FETCH_TIMEOUT', 1.0))
+        self.JS_MAX_IN_FLIGHT = int(os.getenv('JS_MAX_IN_FLIGHT', 128))
+        self.JS_ACK_WAIT = float(os.getenv('JS_ACK_WAIT', 60))
+        self.JS_MAX_DELIVER = int(os.getenv('JS_MAX_DELIVER', 5))
+        self.JS_BACKOFF_BASE = float(os.getenv('JS_BACKOFF_BASE', 5))
+        self.JS_BACKOFF_MAX = float(os.getenv('JS_BACKOFF_MAX', 300))
+        self.JS_DEAD_LETTER_SUBJECT = os.getenv('JS_DEAD_LETTER_SUBJECT', 'alerts.deadletter')
+
+        # จำนวน worker process ที่แบ่ง alert ตาม IOC (0 = ใช้ thread ใน process เดียว)
+        self.LISTENER_PROCESSES = int(os.getenv('LISTENER_PROCESSES', 0))
+
+        # HTTP endpoint /healthz และ /readyz ของ listener (HEALTH_PORT 0 = ปิด)
+        self.HEALTH_HOST = os.getenv('HEALTH_HOST', '0.0.0.0')
+        self.HEALTH_PORT = int(os.getenv('HEALTH_PORT', 0))
+
+        # โหลด LLM/langchain/msticpy ล่วงหน้าใน background หลัง listener เริ่มรับ alert แล้ว
+        self.LISTENER_WARM_UP = os.getenv('LISTENER_WARM_UP', 'true').lower() == 'true'
+
+        # Metrics แบบ Prometheus ที่ /metrics บน HEALTH_PORT และ trace ราย alert เป็น JSONL (TRACE_FILE ว่าง = ปิด)
+        self.METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+        self.TRACE_FILE = os.getenv('TRACE_FILE', '')
+        self.TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 1.0))
+
+        # กฎ triage จากไฟล์ JSON (ว่าง = ใช้ triage_alert() แบบเดิม)
+        self.TRIAGE_RULES_FILE = os.getenv(
+            'TRIAGE_RULES_FILE',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'triage_rules.json')
+        )
+
+        # Fast path: enrich alert ที่มี IOC ชัดเจนโดยไม่ผ่าน LLM, ส่งต่อให้ agent เมื่อ severity ถึงระดับนี้
+        self.FAST_PATH_ENABLED = os.getenv('FAST_PATH_ENABLED', 'true').lower() == 'true'
+        self.FAST_PATH_ESCALATION_SEVERITY = os.getenv('FAST_PATH_ESCALATION_SEVERITY', 'high')
+
+        # ฐานข้อมูล geolocation/ASN แบบ offline (.mmdb หรือ .csv), ว่าง = ใช้ ipinfo.io อย่างเดียว
+        self.GEO_DB_PATH = os.getenv('GEO_DB_PATH', '')
+
+        # ประวัติ alert แบบแบ่ง segment (หมุนไฟล์ตามขนาด/อายุ, HISTORY_MAX_SEGMENTS 0 = เก็บทั้งหมด)
+        self.HISTORY_DIR = os.getenv('HISTORY_DIR', 'data/history')
+        self.HISTORY_SEGMENT_MAX_BYTES = int(os.getenv('HISTORY_SEGMENT_MAX_BYTES', 64 * 1024 * 1024))
+        self.HISTORY_SEGMENT_MAX_AGE = float(os.getenv('HISTORY_SEGMENT_MAX_AGE', 24 * 3600))
+        self.HISTORY_MAX_SEGMENTS = int(os.getenv('HISTORY_MAX_SEGMENTS', 0))
+        self.HISTORY_WRITE_BATCH = int(os.getenv('HISTORY_WRITE_BATCH', 256))
+
+        # Cache คำตอบของ LLM แบบ exact match บน SQLite (LLM_CACHE_TTL 0 = ปิด, DB_PATH ว่าง = เก็บในหน่วยความจำ)
+        self.LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 3600))
+        self.LLM_CACHE_DB_PATH = os.getenv('LLM_CACHE_DB_PATH', 'data/llm_cache.sqlite')
+        self.LLM_CACHE_MASK_VOLATILE = os.getenv('LLM_CACHE_MASK_VOLATILE', 'true').lower() == 'true'
+
+        # จำกัดขนาดผลลัพธ์ของ tool ที่ส่งให้ LLM เป็นจำนวน token โดยประมาณ (0 = ไม่ย่อ), ระบุราย tool ได้เช่น 'Retrieve_IP_Info=600'
+        self.TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv('TOOL_OUTPUT_TOKEN_BUDGET', 1000))
+        self.TOOL_OUTPUT_BUDGETS = os.getenv('TOOL_OUTPUT_BUDGETS', '')
+        self.TOOL_OUTPUT_TOP_N = int(os.getenv('TOOL_OUTPUT_TOP_N', 5))
+        self.TOOL_OUTPUT_STORE_MAX_ENTRIES = int(os.getenv('TOOL_OUTPUT_STORE_MAX_ENTRIES', 256))
+
+        # Cache คำตอบของ agent ใน Streamlit สำหรับคำถามซ้ำ (TTL เป็นวินาที, 0 = ปิด)
+        self.QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 15 * 60))
+        self.QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 256))
+
         # ตรวจสอบค่าที่จำเป็นต้องมี
         self._validate_config()
 
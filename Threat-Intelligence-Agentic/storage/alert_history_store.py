@@ -0,0 +1,532 @@
+import asyncio
+import bisect
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+_OFFSET = struct.Struct(">Q")
+_SEGMENT_PREFIX = "segment-"
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+Filter = Union[str, Sequence[str], None]
+
+
+def read_tail_lines(path: str, limit: int, block_size: int = _TAIL_BLOCK_SIZE) -> List[bytes]:
+    """
+    Read the last `limit` complete lines of a file, newest first
+
+    Seeks backwards from the end in fixed-size blocks, so the cost depends on
+    how much is returned rather than on the size of the file.
+
+    Args:
+        path (str): File to read
+        limit (int): Maximum number of lines
+        block_size (int): Bytes read per backward step
+
+    Returns:
+        list: Raw lines without their trailing newline
+    """
+    lines = []
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b""
+        seen_newline = False
+        while position > 0 and len(lines) < limit:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            parts = (f.read(step) + remainder).split(b"\n")
+            # parts[0] may continue in the previous block; keep it for the next step
+            remainder = parts[0]
+            complete = parts[1:]
+            if complete and not seen_newline:
+                # Whatever follows the last newline is a line still being written
+                complete = complete[:-1]
+                seen_newline = True
+            lines.extend(line for line in reversed(complete) if line)
+        if position == 0 and seen_newline and remainder and len(lines) < limit:
+            lines.append(remainder)
+    return lines[:limit]
+
+
+class AlertHistoryStore:
+    """
+    Append-only alert history split into rotating JSONL segments
+
+    Each segment ``segment-<first seq>.jsonl`` has a sibling ``.idx`` file of
+    8-byte record offsets, so any record (and therefore the tail) is one seek
+    away. A SQLite side index maps alert id, severity, type and IOCs to
+    sequence numbers. Records are only written by one process (the listener);
+    readers such as the Streamlit UI open the store with read_only=True.
+    """
+
+    def __init__(
+            self,
+            base_dir: str = "data/history",
+            max_segment_bytes: int = 64 * 1024 * 1024,
+            max_segment_age: float = 24 * 3600,
+            max_segments: int = 0,
+            read_only: bool = False
+    ):
+        self.base_dir = base_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.max_segments = max_segments
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        # (first seq, ts of its first record) of the segment being appended to
+        self._segment_started: Optional[tuple] = None
+
+        index_path = os.path.join(base_dir, "index.sqlite")
+        if read_only:
+            self._index = sqlite3.connect(
+                f"file:{index_path}?mode=ro", uri=True, check_same_thread=False
+            ) if os.path.exists(index_path) else None
+        else:
+            os.makedirs(base_dir, exist_ok=True)
+            self._index = sqlite3.connect(index_path, check_same_thread=False)
+            with self._index:
+                self._index.execute("PRAGMA journal_mode=WAL")
+                self._index.executescript("""
+                    CREATE TABLE IF NOT EXISTS alerts (
+                        seq INTEGER PRIMARY KEY,
+                        ts REAL,
+                        alert_id TEXT,
+                        severity TEXT,
+                        type TEXT
+                    );
+                    CREATE INDEX IF NOT EXISTS alerts_alert_id ON alerts (alert_id);
+                    CREATE INDEX IF NOT EXISTS alerts_severity ON alerts (severity, seq);
+                    CREATE INDEX IF NOT EXISTS alerts_type ON alerts (type, seq);
+                    CREATE TABLE IF NOT EXISTS alert_iocs (ioc TEXT, seq INTEGER);
+                    CREATE INDEX IF NOT EXISTS alert_iocs_ioc ON alert_iocs (ioc, seq);
+                    CREATE TABLE IF NOT EXISTS alert_tags (tag TEXT, seq INTEGER);
+                    CREATE INDEX IF NOT EXISTS alert_tags_tag ON alert_tags (tag, seq);
+                """)
+
+        if not read_only:
+            self._recover_last_segment()
+            self._enforce_retention()
+
+    # ------------------------------------------------------------------ segments
+
+    def _segment_path(self, first_seq: int, ext: str) -> str:
+        return os.path.join(self.base_dir, f"{_SEGMENT_PREFIX}{first_seq:012d}.{ext}")
+
+    def _segments(self) -> List[int]:
+        """First sequence number of every segment, oldest first"""
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(
+            int(name[len(_SEGMENT_PREFIX):-len(".jsonl")])
+            for name in os.listdir(self.base_dir)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(".jsonl")
+        )
+
+    def _segment_count(self, first_seq: int) -> int:
+        try:
+            # A torn trailing offset (crash mid-write) is ignored by flooring
+            return os.path.getsize(self._segment_path(first_seq, "idx")) // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def _recover_last_segment(self):
+        """Index records that reached the last segment but not its offset file"""
+        segments = self._segments()
+        if not segments:
+            return
+        first_seq = segments[-1]
+        count = self._segment_count(first_seq)
+        idx_path = self._segment_path(first_seq, "idx")
+
+        with open(self._segment_path(first_seq, "jsonl"), "rb") as data:
+            if count:
+                with open(idx_path, "rb") as idx:
+                    idx.seek((count - 1) * _OFFSET.size)
+                    data.seek(_OFFSET.unpack(idx.read(_OFFSET.size))[0])
+                data.readline()
+            position = data.tell()
+
+            recovered = []
+            for line in data:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    recovered.append((position, json.loads(line)))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Same as a torn tail: keep everything up to the last good record
+                    break
+                position += len(line)
+            end = position
+            size = data.seek(0, os.SEEK_END)
+            torn_tail = size > end
+
+        if torn_tail:
+            # Drop a partially written or corrupt tail so the next append starts clean
+            print(f"⚠️ Dropping {size - end} bytes of unreadable history after the last good record")
+            with open(self._segment_path(first_seq, "jsonl"), "r+b") as data:
+                data.truncate(end)
+        with open(idx_path, "r+b" if os.path.exists(idx_path) else "wb") as idx:
+            idx.truncate(count * _OFFSET.size)
+            idx.seek(0, os.SEEK_END)
+            for offset, _ in recovered:
+                idx.write(_OFFSET.pack(offset))
+        if recovered:
+            self._index_records([record for _, record in recovered])
+
+    def _current_segment(self) -> int:
+        """First seq of the segment to append to, rotating on size or age"""
+        segments = self._segments()
+        if segments:
+            first_seq = segments[-1]
+            path = self._segment_path(first_seq, "jsonl")
+            size = os.path.getsize(path)
+            if size == 0 or (size < self.max_segment_bytes and
+                             time.time() - self._segment_start_time(first_seq) < self.max_segment_age):
+                return first_seq
+            next_seq = first_seq + self._segment_count(first_seq)
+        else:
+            next_seq = 1
+
+        open(self._segment_path(next_seq, "jsonl"), "wb").close()
+        open(self._segment_path(next_seq, "idx"), "wb").close()
+        self._enforce_retention()
+        return next_seq
+
+    def _segment_start_time(self, first_seq: int) -> float:
+        """ts of a segment's first record (file times change on every append, so they cannot date it)"""
+        if self._segment_started is None or self._segment_started[0] != first_seq:
+            with open(self._segment_path(first_seq, "jsonl"), "rb") as data:
+                line = data.readline()
+            try:
+                started = float(json.loads(line)["ts"])
+            except (ValueError, KeyError, TypeError):
+                started = os.path.getmtime(self._segment_path(first_seq, "jsonl"))
+            self._segment_started = (first_seq, started)
+        return self._segment_started[1]
+
+    def _enforce_retention(self):
+        if not self.max_segments:
+            return
+        segments = self._segments()
+        expired = segments[:-self.max_segments]
+        for first_seq in expired:
+            for ext in ("jsonl", "idx"):
+                try:
+                    os.remove(self._segment_path(first_seq, ext))
+                except FileNotFoundError:
+                    pass
+        if expired:
+            oldest_kept = segments[len(expired)]
+            with self._index:
+                self._index.execute("DELETE FROM alerts WHERE seq < ?", (oldest_kept,))
+                self._index.execute("DELETE FROM alert_iocs WHERE seq < ?", (oldest_kept,))
+                self._index.execute("DELETE FROM alert_tags WHERE seq < ?", (oldest_kept,))
+
+    # ------------------------------------------------------------------ writes
+
+    def next_seq(self) -> int:
+        segments = self._segments()
+        if not segments:
+            return 1
+        return segments[-1] + self._segment_count(segments[-1])
+
+    def append_batch(self, records: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Append records in one write and index them; returns their sequence numbers
+
+        Args:
+            records (Iterable[dict]): History entries ({"alert": ..., "triage": ..., ...})
+
+        Returns:
+            list: Sequence number assigned to each record
+        """
+        if self.read_only:
+            raise RuntimeError("History store was opened read-only")
+
+        with self._lock:
+            # A batch never straddles segments; rotation happens between batches
+            first_seq = self._current_segment()
+            seq = first_seq + self._segment_count(first_seq)
+            stamped, lines, offsets = [], [], []
+            with open(self._segment_path(first_seq, "jsonl"), "ab") as data:
+                position = data.tell()
+                for record in records:
+                    record = {**record, "seq": seq, "ts": record.get("ts", time.time())}
+                    line = (json.dumps(record) + "\n").encode("utf-8")
+                    stamped.append(record)
+                    lines.append(line)
+                    offsets.append(position)
+                    position += len(line)
+                    seq += 1
+                data.write(b"".join(lines))
+            if not stamped:
+                return []
+            # Offsets are only published once the records they point at are on disk
+            with open(self._segment_path(first_seq, "idx"), "ab") as idx:
+                idx.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+
+            self._index_records(stamped)
+            return [record["seq"] for record in stamped]
+
+    def _index_records(self, records: List[Dict[str, Any]]):
+        rows, ioc_rows, tag_rows = [], [], []
+        for record in records:
+            alert = record.get("alert") or {}
+            rows.append((
+                record["seq"],
+                record.get("ts"),
+                str(alert.get("id")) if alert.get("id") is not None else None,
+                str(alert.get("severity", "")).lower() or None,
+                str(alert.get("type", "")).lower() or None
+            ))
+            for values in (record.get("iocs") or {}).values():
+                ioc_rows.extend((str(value).lower(), record["seq"]) for value in values)
+            tags = alert.get("tags") or []
+            if isinstance(tags, str):
+                tags = [tags]
+            tag_rows.extend((str(tag).lower(), record["seq"]) for tag in set(tags))
+        with self._index:
+            self._index.executemany("INSERT OR REPLACE INTO alerts VALUES (?, ?, ?, ?, ?)", rows)
+            self._index.executemany("INSERT INTO alert_iocs VALUES (?, ?)", ioc_rows)
+            self._index.executemany("INSERT INTO alert_tags VALUES (?, ?)", tag_rows)
+
+    # ------------------------------------------------------------------ reads
+
+    def count(self) -> int:
+        return sum(self._segment_count(first_seq) for first_seq in self._segments())
+
+    def read(self, seqs: Iterable[int]) -> List[Dict[str, Any]]:
+        """Fetch records by sequence number (missing ones are skipped), in the given order"""
+        segments = self._segments()
+        counts = {}
+        records = []
+        handles = {}
+        try:
+            for seq in seqs:
+                position = bisect.bisect_right(segments, seq) - 1
+                if position < 0:
+                    continue
+                first_seq = segments[position]
+                if first_seq not in counts:
+                    counts[first_seq] = self._segment_count(first_seq)
+                if seq - first_seq >= counts[first_seq]:
+                    continue
+                if first_seq not in handles:
+                    handles[first_seq] = (
+                        open(self._segment_path(first_seq, "idx"), "rb"),
+                        open(self._segment_path(first_seq, "jsonl"), "rb")
+                    )
+                idx, data = handles[first_seq]
+                idx.seek((seq - first_seq) * _OFFSET.size)
+                data.seek(_OFFSET.unpack(idx.read(_OFFSET.size))[0])
+                records.append(json.loads(data.readline()))
+        finally:
+            for idx, data in handles.values():
+                idx.close()
+                data.close()
+        return records
+
+    def _read_span(self, first_seq: int, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Records at positions [start, stop) of one segment with one offset read and one data read"""
+        with open(self._segment_path(first_seq, "idx"), "rb") as idx:
+            idx.seek(start * _OFFSET.size)
+            begin = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+            idx.seek(stop * _OFFSET.size)
+            following = idx.read(_OFFSET.size)
+        with open(self._segment_path(first_seq, "jsonl"), "rb") as data:
+            data.seek(begin)
+            if len(following) == _OFFSET.size:
+                chunk = data.read(_OFFSET.unpack(following)[0] - begin)
+            else:
+                chunk = data.read()
+        # Bytes past the last published offset may belong to a write in progress
+        return [json.loads(line) for line in chunk.split(b"\n", stop - start)[:stop - start]]
+
+    def tail(
+            self,
+            limit: int = 50,
+            before_seq: Optional[int] = None,
+            after_seq: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest records first, read backwards from the end of the newest segments
+
+        Args:
+            limit (int): Maximum number of records
+            before_seq (int, optional): Only records older than this (next page)
+            after_seq (int, optional): Only records newer than this (incremental refresh)
+
+        Returns:
+            list: History records, newest first
+        """
+        records = []
+        for first_seq in reversed(self._segments()):
+            if len(records) >= limit:
+                break
+            count = self._segment_count(first_seq)
+            stop = count if before_seq is None else min(count, before_seq - first_seq)
+            start = max(0, stop - (limit - len(records)))
+            if after_seq is not None:
+                start = max(start, after_seq + 1 - first_seq)
+            if start < stop:
+                records.extend(reversed(self._read_span(first_seq, start, stop)))
+            if after_seq is not None and first_seq <= after_seq:
+                break
+        return records
+
+    def distinct(self, field: str, limit: int = 200) -> List[str]:
+        """Known values of an indexed field ("severity", "type" or "tag"), for filter pickers"""
+        if self._index is None:
+            return []
+        table, column = {
+            "severity": ("alerts", "severity"),
+            "type": ("alerts", "type"),
+            "tag": ("alert_tags", "tag")
+        }[field]
+        with self._lock:
+            rows = self._index.execute(
+                f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column} LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _match(column: str, value: Filter, clauses: List[str], params: List[Any]):
+        if value is None or (not isinstance(value, str) and not value):
+            return
+        values = [value] if isinstance(value, str) else list(value)
+        clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+        params.extend(str(v).lower() for v in values)
+
+    def query(
+            self,
+            alert_id: Optional[str] = None,
+            severity: Filter = None,
+            alert_type: Filter = None,
+            tag: Filter = None,
+            ioc: Optional[str] = None,
+            limit: int = 50,
+            before_seq: Optional[int] = None,
+            after_seq: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest records matching every given filter, via the secondary indexes
+
+        severity, alert_type and tag accept one value or a list of values.
+        Paging is keyset based (before_seq/after_seq), so every page costs
+        the same regardless of how deep into the history it is.
+        """
+        clauses, params = [], []
+        if alert_id is not None:
+            clauses.append("alert_id = ?")
+            params.append(str(alert_id))
+        self._match("severity", severity, clauses, params)
+        self._match("type", alert_type, clauses, params)
+        tag_clauses = []
+        self._match("tag", tag, tag_clauses, params)
+        if tag_clauses:
+            clauses.append(f"seq IN (SELECT seq FROM alert_tags WHERE {tag_clauses[0]})")
+        if ioc is not None:
+            clauses.append("seq IN (SELECT seq FROM alert_iocs WHERE ioc = ?)")
+            params.append(ioc.lower())
+        if not clauses:
+            return self.tail(limit, before_seq=before_seq, after_seq=after_seq)
+        if before_seq is not None:
+            clauses.append("seq < ?")
+            params.append(before_seq)
+        if after_seq is not None:
+            clauses.append("seq > ?")
+            params.append(after_seq)
+
+        if self._index is None:
+            return []
+        with self._lock:
+            rows = self._index.execute(
+                f"SELECT seq FROM alerts WHERE {' AND '.join(clauses)} ORDER BY seq DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        return self.read(row[0] for row in rows)
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
+
+
+class AsyncHistoryWriter:
+    """
+    Single writer task that batches history appends for the asyncio listener
+
+    write() resolves once the record is on disk and indexed, which is the
+    point where a message can safely be acknowledged.
+    """
+
+    def __init__(self, store: AlertHistoryStore, max_batch: int = 256, max_delay: float = 0.05):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def write(self, record: Dict[str, Any]) -> int:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                seqs = await loop.run_in_executor(None, self.store.append_batch, [record for record, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), seq in zip(batch, seqs):
+                    if not future.done():
+                        future.set_result(seq)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self):
+        """Flush everything queued so far, then stop the writer task"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def open_history_store(config, read_only: bool = False) -> AlertHistoryStore:
+    return AlertHistoryStore(
+        base_dir=config.HISTORY_DIR,
+        max_segment_bytes=config.HISTORY_SEGMENT_MAX_BYTES,
+        max_segment_age=config.HISTORY_SEGMENT_MAX_AGE,
+        max_segments=config.HISTORY_MAX_SEGMENTS,
+        read_only=read_only
+    )
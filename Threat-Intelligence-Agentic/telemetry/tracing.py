@@ -0,0 +1,173 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from telemetry.metrics import REGISTRY
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "threat_intel_stage_seconds",
+    "Duration of pipeline stages, tool calls, provider lookups and LLM calls",
+    ("stage", "outcome")
+)
+ALERT_SECONDS = REGISTRY.histogram(
+    "threat_intel_alert_seconds",
+    "Time from dequeue to history write for one alert",
+    ("outcome",)
+)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while one alert was handled, possibly on several threads"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, start: float, seconds: float, outcome: str, attributes: Dict[str, Any]):
+        span = {
+            "stage": stage,
+            "offset_ms": round((start - self._start) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+            "outcome": outcome,
+            "thread": threading.current_thread().name
+        }
+        if attributes:
+            span["attributes"] = attributes
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self, seconds: float, outcome: str) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["offset_ms"])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(seconds * 1000, 3),
+            "outcome": outcome,
+            "attributes": self.attributes,
+            "spans": spans
+        }
+
+
+class JsonlTraceExporter:
+    """Appends one JSON line per finished trace; sample_rate keeps a random share of them"""
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def export(self, trace: Dict[str, Any]):
+        line = json.dumps(trace, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+_exporter: Optional[JsonlTraceExporter] = None
+
+
+def configure_tracing(config):
+    """Apply METRICS_ENABLED / TRACE_FILE / TRACE_SAMPLE_RATE from the config"""
+    global _exporter
+    REGISTRY.enabled = config.METRICS_ENABLED
+    _exporter = JsonlTraceExporter(config.TRACE_FILE, config.TRACE_SAMPLE_RATE) if config.TRACE_FILE else None
+
+
+@contextmanager
+def span(stage: str, **attributes: Any):
+    """
+    Time a block as one stage: observed in threat_intel_stage_seconds and,
+    inside trace(), added to the current alert's trace
+
+    Args:
+        stage (str): Stage name, e.g. "triage", "tool.Geolocation", "provider.virustotal"
+        **attributes: Extra fields stored on the span in exported traces
+    """
+    if not REGISTRY.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage, outcome=outcome)
+        current = _current_trace.get()
+        if current is not None:
+            current.add_span(stage, start, seconds, outcome, attributes)
+
+
+def record_span(stage: str, seconds: float, outcome: str = "ok", **attributes: Any):
+    """Record a span measured elsewhere (e.g. by LLM callbacks that see start and end separately)"""
+    if not REGISTRY.enabled:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage, outcome=outcome)
+    current = _current_trace.get()
+    if current is not None:
+        current.add_span(stage, time.perf_counter() - seconds, seconds, outcome, attributes)
+
+
+@contextmanager
+def trace(name: str, **attributes: Any):
+    """Collect the spans of one unit of work (an alert) and export them when it finishes"""
+    if not REGISTRY.enabled:
+        yield None
+        return
+    current = Trace(name, attributes)
+    token = _current_trace.set(current)
+    outcome = "ok"
+    try:
+        yield current
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        _current_trace.reset(token)
+        seconds = time.perf_counter() - current._start
+        ALERT_SECONDS.observe(seconds, outcome=outcome)
+        exporter = _exporter
+        if exporter is not None and exporter.sampled():
+            try:
+                exporter.export(current.to_dict(seconds, outcome))
+            except OSError as e:
+                print(f"⚠️ Could not export trace: {str(e)}")
+
+
+def traced(stage: str, func: Callable) -> Callable:
+    """Wrap func so every call is recorded as a span"""
+    def wrapper(*args, **kwargs):
+        with span(stage):
+            return func(*args, **kwargs)
+    wrapper.__name__ = getattr(func, "__name__", stage)
+    wrapper.__doc__ = getattr(func, "__doc__", None)
+    return wrapper
+
+
+def in_current_context(func: Callable) -> Callable:
+    """Bind func to a copy of the caller's context, so spans it records on a pool thread join the caller's trace"""
+    context = contextvars.copy_context()
+    # A context can only be entered by one thread at a time, so each call runs in its own copy
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
@@ -1,6 +1,16 @@
 import abc
 import json
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+from telemetry.tracing import in_current_context, span
+from tools.enrichment_cache import CACHE_MISS, EnrichmentCache, get_shared_cache
+from tools.rate_limiter import get_shared_rate_limiter
+from tools.reputation_prefilter import get_shared_prefilter
+from tools.single_flight import SingleFlight
+
+# Shared by every tool so concurrent lookups of one observable hit the provider once
+_in_flight = SingleFlight()
 
 
 class BaseThreatIntelligenceTool(abc.ABC):
@@ -26,6 +36,27 @@ class BaseThreatIntelligenceTool(abc.ABC):
         """
         pass
 
+    def process_batch(self, observables: Iterable[str]) -> Dict[str, Any]:
+        """
+        Process several observables in one call
+
+        Tools backed by a bulk provider endpoint override this; the default
+        fans the single-item process() out over a thread pool.
+
+        Args:
+            observables (Iterable[str]): Inputs to analyze (duplicates are merged)
+
+        Returns:
+            dict: Result of process() keyed by observable
+        """
+        observables = list(dict.fromkeys(observables))
+        if not observables:
+            return {}
+
+        max_workers = min(getattr(self.config, 'BATCH_MAX_WORKERS', 8), len(observables))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ti-batch") as pool:
+            return dict(zip(observables, pool.map(in_current_context(self.process), observables)))
+
     def _safe_json_parse(self, data: str) -> Dict[str, Any]:
         """
         Safely parse JSON with error handling
@@ -42,4 +73,113 @@ class BaseThreatIntelligenceTool(abc.ABC):
             return {
                 "error": f"JSON parsing failed: {str(e)}",
                 "raw_data": data
-            }
\ No newline at end of file
+            }
+
+    def _prefilter(self, ioc_type: str, observable: str) -> Optional[str]:
+        """
+        Verdict from the local allow/block lists, checked before any provider call
+
+        Args:
+            ioc_type (str): IOC type of the observable (ipv4, file_hash, ...)
+            observable (str): Value being looked up
+
+        Returns:
+            str: "benign" or "malicious", or None when a provider lookup is needed
+        """
+        prefilter = get_shared_prefilter(self.config)
+        return prefilter.reputation(ioc_type, observable) if prefilter else None
+
+    def _prefilter_batch(self, ioc_type: str, observables: Iterable[str]) -> Dict[str, str]:
+        """Verdicts of the observables the local lists decide, keyed by observable"""
+        prefilter = get_shared_prefilter(self.config)
+        if prefilter is None:
+            return {}
+        verdicts = ((observable, prefilter.reputation(ioc_type, observable)) for observable in observables)
+        return {observable: verdict for observable, verdict in verdicts if verdict}
+
+    def _cached_lookup(
+            self,
+            provider: str,
+            ioc_type: str,
+            observable: str,
+            fetch: Callable[[str], Any]
+    ) -> Any:
+        """
+        Return a provider result from the shared enrichment cache, calling
+        fetch only on a miss. fetch should return None when the provider has
+        no data for the observable; errors are raised and never cached.
+        Concurrent misses for the same observable share a single fetch, which
+        is paced and retried by the shared provider rate limiter.
+
+        Args:
+            provider (str): Provider name used for TTLs and statistics
+            ioc_type (str): IOC type of the observable (ipv4, file_hash, ...)
+            observable (str): Value being looked up
+            fetch (callable): Performs the provider call for the observable
+
+        Returns:
+            Any: Cached or freshly fetched provider result
+        """
+        cache = get_shared_cache(self.config)
+        value = cache.get(provider, ioc_type, observable)
+        if value is CACHE_MISS:
+            key = EnrichmentCache.make_key(provider, ioc_type, observable)
+            value = _in_flight.do(key, lambda: self._fetch_and_cache(cache, provider, ioc_type, observable, fetch))
+        return value
+
+    def _fetch_and_cache(self, cache, provider, ioc_type, observable, fetch):
+        # A flight that finished just before ours may already have filled the cache
+        value = cache.get(provider, ioc_type, observable, record=False)
+        if value is CACHE_MISS:
+            with span(f"provider.{provider}"):
+                value = get_shared_rate_limiter(self.config).call(provider, fetch, observable)
+            cache.set(provider, ioc_type, observable, value)
+        return value
+
+    def _cached_lookup_batch(
+            self,
+            provider: str,
+            ioc_type: str,
+            observables: List[str],
+            fetch_many: Callable[[List[str]], Dict[str, Any]],
+            chunk_size: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Bulk counterpart of _cached_lookup: serve what the cache has and fetch
+        the misses in chunks, each chunk charged to the rate limiter by size.
+
+        Args:
+            provider (str): Provider name used for TTLs, pacing and statistics
+            ioc_type (str): IOC type shared by all observables
+            observables (list): Values being looked up
+            fetch_many (callable): Bulk provider call returning {observable: result}
+            chunk_size (int): Maximum observables per provider call
+
+        Returns:
+            dict: Results keyed by observable. Observables whose bulk fetch
+            failed are left out so callers can fall back to single lookups.
+        """
+        cache = get_shared_cache(self.config)
+        limiter = get_shared_rate_limiter(self.config)
+
+        results = {}
+        misses = []
+        for observable in observables:
+            value = cache.get(provider, ioc_type, observable)
+            if value is CACHE_MISS:
+                misses.append(observable)
+            else:
+                results[observable] = value
+
+        for start in range(0, len(misses), chunk_size):
+            chunk = misses[start:start + chunk_size]
+            try:
+                with span(f"provider.{provider}", batch=len(chunk)):
+                    fetched = limiter.call(provider, fetch_many, chunk, cost=len(chunk))
+            except Exception as e:
+                print(f"⚠️ Bulk {provider} lookup failed for {len(chunk)} observables: {str(e)}")
+                continue
+            for observable, value in fetched.items():
+                cache.set(provider, ioc_type, observable, value)
+                results[observable] = value
+        return results
@@ -0,0 +1,243 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telemetry.metrics import REGISTRY
+
+# Returned by EnrichmentCache.get when nothing (not even a negative entry) is cached
+CACHE_MISS = object()
+
+
+class MemoryCacheBackend:
+    """Size-bounded in-memory LRU store of (value, expires_at) pairs"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Persistent store that survives restarts; values must be JSON serializable
+
+    Expired rows are purged when the store opens and then at most every
+    purge_interval seconds on write, so a long-running listener does not
+    grow the file without bound.
+    """
+
+    def __init__(self, path: str, purge_interval: float = 3600):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS enrichment_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS enrichment_cache_expires ON enrichment_cache (expires_at)"
+            )
+        self._next_purge = 0.0
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM enrichment_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO enrichment_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+        if time.time() >= self._next_purge:
+            self.purge_expired()
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM enrichment_cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        now = time.time()
+        self._next_purge = now + self.purge_interval
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM enrichment_cache WHERE expires_at < ?", (now,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM enrichment_cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+
+
+class EnrichmentCache:
+    """
+    IOC enrichment cache keyed by (provider, IOC type, observable)
+
+    Lookups go to an in-memory LRU first and then to an optional persistent
+    backend. A cached value of None is a negative entry ("not found") and is
+    kept for the shorter negative TTL.
+    """
+
+    def __init__(
+            self,
+            memory: Optional[MemoryCacheBackend] = None,
+            persistent: Optional[SQLiteCacheBackend] = None,
+            ttls: Optional[Dict[str, float]] = None,
+            default_ttl: float = 3600,
+            negative_ttl: float = 300
+    ):
+        self.memory = memory or MemoryCacheBackend()
+        self.persistent = persistent
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._invalidation_listeners: List[Callable[[str], Any]] = []
+
+    @staticmethod
+    def make_key(provider: str, ioc_type: str, observable: str) -> str:
+        return f"{provider.lower()}:{ioc_type.lower()}:{observable.strip().lower()}"
+
+    def _record(self, provider: str, outcome: str):
+        with self._stats_lock:
+            counters = self._stats.setdefault(provider, {"hits": 0, "negative_hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, provider: str, ioc_type: str, observable: str, record: bool = True) -> Any:
+        """Return the cached value, None for a negative entry, or CACHE_MISS"""
+        key = self.make_key(provider, ioc_type, observable)
+        now = time.time()
+
+        entry = self.memory.get(key)
+        if entry is None and self.persistent is not None:
+            entry = self.persistent.get(key)
+            if entry is not None and entry[1] > now:
+                # Promote to memory so the next lookup skips the disk
+                self.memory.set(key, *entry)
+
+        if entry is None or entry[1] <= now:
+            if entry is not None:
+                self.memory.delete(key)
+            if record:
+                self._record(provider, "misses")
+            return CACHE_MISS
+
+        value = entry[0]
+        if record:
+            self._record(provider, "negative_hits" if value is None else "hits")
+        return value
+
+    def set(self, provider: str, ioc_type: str, observable: str, value: Any):
+        """Cache a provider result; pass None to record a "not found" answer"""
+        key = self.make_key(provider, ioc_type, observable)
+        ttl = self.negative_ttl if value is None else self.ttls.get(provider, self.default_ttl)
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.persistent is not None:
+            self.persistent.set(key, value, expires_at)
+
+    def invalidate(self, provider: str, ioc_type: str, observable: str):
+        key = self.make_key(provider, ioc_type, observable)
+        self.memory.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+        for listener in self._invalidation_listeners:
+            listener(observable)
+
+    def add_invalidation_listener(self, listener: Callable[[str], Any]):
+        """Call listener(observable) whenever an observable is invalidated (e.g. to drop derived LLM answers)"""
+        self._invalidation_listeners.append(listener)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters per provider, including the hit rate"""
+        with self._stats_lock:
+            report = {}
+            for provider, counters in self._stats.items():
+                lookups = sum(counters.values())
+                hits = counters["hits"] + counters["negative_hits"]
+                report[provider] = {
+                    **counters,
+                    "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+                }
+            return report
+
+    def metric_families(self):
+        """Lookup counters for the /metrics endpoint"""
+        stats = self.stats()
+        yield ("threat_intel_cache_lookups_total", "counter", "Enrichment cache lookups by provider and result", [
+            ({"provider": provider, "result": result}, counters[result])
+            for provider, counters in stats.items() for result in ("hits", "negative_hits", "misses")
+        ])
+        yield ("threat_intel_cache_hit_ratio", "gauge", "Enrichment cache hit rate by provider", [
+            ({"provider": provider}, counters["hit_rate"]) for provider, counters in stats.items()
+        ])
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache(config=None) -> EnrichmentCache:
+    """Return the process-wide cache, creating it from the config on first use"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            if config is None:
+                _shared_cache = EnrichmentCache()
+            else:
+                _shared_cache = EnrichmentCache(
+                    memory=MemoryCacheBackend(config.CACHE_MAX_ENTRIES),
+                    persistent=SQLiteCacheBackend(config.CACHE_DB_PATH) if config.CACHE_DB_PATH else None,
+                    ttls={
+                        "virustotal": config.CACHE_TTL_VIRUSTOTAL,
+                        "ipinfo": config.CACHE_TTL_IPINFO
+                    },
+                    negative_ttl=config.CACHE_NEGATIVE_TTL
+                )
+            REGISTRY.register_collector("enrichment_cache", _shared_cache.metric_families)
+        return _shared_cache
@@ -0,0 +1,212 @@
+import csv
+import ipaddress
+import json
+import mmap
+import os
+import socket
+import struct
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# Index layout: header, then fixed-width records sorted by range start, then
+# the JSON payloads they point at. Addresses are 16-byte big-endian integers
+# (IPv4 mapped into ::ffff:0:0/96) so plain byte comparison orders them.
+INDEX_MAGIC = b"GEOIDX1\x00"
+_HEADER = struct.Struct(">8sQQ")      # magic, record count, payload section offset
+_RECORD = struct.Struct(">16s16sII")  # range start, range end, payload offset, payload length
+
+GEO_FIELDS = ("city", "region", "country", "loc", "org")
+_V4_MAPPED_PREFIX = b"\x00" * 10 + b"\xff\xff"
+
+
+def _address_key(value) -> bytes:
+    address = ipaddress.ip_address(value) if isinstance(value, str) else value
+    if address.version == 4:
+        return _V4_MAPPED_PREFIX + address.packed
+    return address.packed
+
+
+def _lookup_key(ip_address: str) -> Optional[bytes]:
+    # inet_pton is several times faster than ipaddress on the hot lookup path
+    try:
+        return _V4_MAPPED_PREFIX + socket.inet_pton(socket.AF_INET, ip_address)
+    except OSError:
+        pass
+    try:
+        return socket.inet_pton(socket.AF_INET6, ip_address)
+    except OSError:
+        return None
+
+
+def build_geo_index(csv_path: str, index_path: str) -> int:
+    """
+    Compile a CSV range file into the binary index read by GeoRangeIndex
+
+    The CSV needs either start_ip/end_ip columns or a network (CIDR) column,
+    plus any of city, region, country, loc and org (asn/as_name are folded
+    into org). Returns the number of ranges written.
+    """
+    ranges = []
+    payloads = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("network"):
+                network = ipaddress.ip_network(row["network"], strict=False)
+                start, end = network.network_address, network.broadcast_address
+            else:
+                start, end = ipaddress.ip_address(row["start_ip"]), ipaddress.ip_address(row["end_ip"])
+
+            record = {field: row[field] for field in GEO_FIELDS if row.get(field)}
+            if "org" not in record and (row.get("asn") or row.get("as_name")):
+                record["org"] = " ".join(filter(None, (row.get("asn"), row.get("as_name"))))
+
+            # Identical payloads (same city/org) are stored once
+            payload = json.dumps(record, sort_keys=True).encode("utf-8")
+            payloads.setdefault(payload, None)
+            ranges.append((_address_key(start), _address_key(end), payload))
+
+    ranges.sort(key=lambda r: r[0])
+
+    payload_section = bytearray()
+    for payload in payloads:
+        payloads[payload] = len(payload_section)
+        payload_section += payload
+
+    payload_offset = _HEADER.size + _RECORD.size * len(ranges)
+    # A unique temp file per build: several shard processes may compile the same index at once
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, len(ranges), payload_offset))
+            for start, end, payload in ranges:
+                f.write(_RECORD.pack(start, end, payloads[payload], len(payload)))
+            f.write(payload_section)
+        # Readers never see a half-written index
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(ranges)
+
+
+class GeoRangeIndex:
+    """
+    Memory-mapped, binary-searched IP range index
+
+    The file is mapped read-only, so every worker process that opens it
+    shares the same page-cache pages instead of holding its own copy.
+    """
+
+    def __init__(self, index_path: str):
+        self.path = index_path
+        with open(index_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._payload_offset = _HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{index_path} is not a geolocation index")
+        self._payload = lru_cache(maxsize=4096)(self._read_payload)
+
+    def _start(self, i: int) -> bytes:
+        offset = _HEADER.size + i * _RECORD.size
+        return self._mmap[offset:offset + 16]
+
+    def _read_payload(self, offset: int, length: int) -> Dict[str, Any]:
+        start = self._payload_offset + offset
+        return json.loads(self._mmap[start:start + length])
+
+    def lookup(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        key = _lookup_key(ip_address.strip())
+        if key is None:
+            return None
+
+        # Rightmost range whose start <= key
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._start(mid) <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+
+        _, end, offset, length = _RECORD.unpack_from(self._mmap, _HEADER.size + (lo - 1) * _RECORD.size)
+        if key > end:
+            return None
+        return dict(self._payload(offset, length))
+
+    def close(self):
+        self._mmap.close()
+
+
+class MMDBGeoDatabase:
+    """MaxMind/ipinfo .mmdb reader (needs the optional maxminddb package, which mmaps the file)"""
+
+    def __init__(self, path: str):
+        import maxminddb
+        self.path = path
+        self._reader = maxminddb.open_database(path, maxminddb.MODE_MMAP)
+
+    def lookup(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        try:
+            record = self._reader.get(ip_address.strip())
+        except ValueError:
+            return None
+        if not record:
+            return None
+
+        # ipinfo mmdb files are flat; MaxMind GeoLite2 nests names per language
+        if "country" in record and isinstance(record["country"], str):
+            return {field: record[field] for field in GEO_FIELDS if record.get(field)}
+
+        location = record.get("location", {})
+        subdivisions = record.get("subdivisions") or [{}]
+        org = " ".join(filter(None, (
+            f"AS{record['autonomous_system_number']}" if record.get("autonomous_system_number") else None,
+            record.get("autonomous_system_organization")
+        )))
+        result = {
+            "city": record.get("city", {}).get("names", {}).get("en"),
+            "region": subdivisions[0].get("names", {}).get("en"),
+            "country": record.get("country", {}).get("iso_code"),
+            "loc": f"{location['latitude']},{location['longitude']}" if "latitude" in location else None,
+            "org": org or None
+        }
+        return {field: value for field, value in result.items() if value}
+
+    def close(self):
+        self._reader.close()
+
+
+def open_geo_database(path: str):
+    """Open an .mmdb, a compiled index, or a CSV (compiled to <csv>.idx when stale)"""
+    if path.endswith(".mmdb"):
+        return MMDBGeoDatabase(path)
+    if path.endswith(".csv"):
+        index_path = f"{path}.idx"
+        if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+            build_geo_index(path, index_path)
+        path = index_path
+    return GeoRangeIndex(path)
+
+
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_geo_database(config=None):
+    """Return the process-wide local geolocation database, or None if not configured"""
+    global _shared_db
+    path = getattr(config, "GEO_DB_PATH", "")
+    if not path:
+        return None
+    with _shared_db_lock:
+        if _shared_db is None:
+            try:
+                _shared_db = open_geo_database(path)
+            except Exception as e:
+                print(f"⚠️ Local geolocation database unavailable, using ipinfo.io: {str(e)}")
+                _shared_db = False
+        return _shared_db or None
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telemetry.metrics import REGISTRY
+
+RETRIEVAL_TOOL_NAME = "Get_Full_Tool_Output"
+
+COMPACTIONS = REGISTRY.counter(
+    "threat_intel_tool_output_compactions_total", "Tool outputs summarised to fit their token budget", ("tool",)
+)
+TOKENS_SAVED = REGISTRY.counter(
+    "threat_intel_tool_output_tokens_saved_total", "Estimated prompt tokens removed by tool output compaction", ("tool",)
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count at ~4 characters per token, as used for the LLM cache stats"""
+    return len(text) // 4
+
+
+def summarize_samples(samples: List[Any], top_n: int) -> Dict[str, Any]:
+    """
+    Summary statistics of a list of VirusTotal-style sample records
+
+    Args:
+        samples (list): Records, usually dicts with positives/total/date/sha256
+        top_n (int): How many records to keep, highest positives first
+
+    Returns:
+        dict: count, positives min/max/mean, first/last date and the top records
+    """
+    records = [sample for sample in samples if isinstance(sample, dict)]
+    summary: Dict[str, Any] = {"count": len(samples)}
+
+    positives = [record["positives"] for record in records if isinstance(record.get("positives"), (int, float))]
+    if positives:
+        summary["positives"] = {
+            "min": min(positives),
+            "max": max(positives),
+            "mean": round(sum(positives) / len(positives), 1)
+        }
+    dates = sorted(str(record["date"]) for record in records if record.get("date"))
+    if dates:
+        summary["first_seen"] = dates[0]
+        summary["last_seen"] = dates[-1]
+
+    if top_n > 0:
+        if positives:
+            ranked = sorted(records, key=lambda record: record.get("positives") or 0, reverse=True)
+            summary["top_by_positives"] = ranked[:top_n]
+        else:
+            summary["first_items"] = samples[:top_n]
+    return summary
+
+
+def _compact_value(value: Any, top_n: int) -> Any:
+    """Replace every list longer than top_n, at the top level or one dict level down, by its summary"""
+    if isinstance(value, list):
+        return summarize_samples(value, top_n) if len(value) > top_n else value
+    if isinstance(value, dict):
+        return {
+            key: summarize_samples(item, top_n) if isinstance(item, list) and len(item) > top_n else item
+            for key, item in value.items()
+        }
+    return value
+
+
+def _truncated(text: str, budget: int, result_id: str, note: str) -> str:
+    """Wrap the head of text that fits the budget together with the reference to the full output"""
+    head = text[:max(0, budget * 4)]
+    while True:
+        wrapped = json.dumps({"truncated": head, "full_result_id": result_id, "note": note})
+        if estimate_tokens(wrapped) <= budget or not head:
+            return wrapped
+        # JSON escaping and the wrapper itself take room too; shrink until it fits
+        head = head[:len(head) * 3 // 4]
+
+
+class ToolOutputStore:
+    """
+    Bounded in-process store of full tool outputs, keyed by a content-derived ID
+
+    The ID depends only on the tool, the input and the payload, so the same
+    result always gets the same reference and prompts stay identical for
+    the LLM response cache. The least recently used entries are dropped
+    beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_id(tool: str, observable: str, payload: str) -> str:
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+        return f"{tool}:{observable}:{digest}"
+
+    def put(self, tool: str, observable: str, data: Any, payload: str) -> str:
+        result_id = self.make_id(tool, observable, payload)
+        with self._lock:
+            self._entries[result_id] = data
+            self._entries.move_to_end(result_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Any]:
+        with self._lock:
+            data = self._entries.get(result_id)
+            if data is not None:
+                self._entries.move_to_end(result_id)
+            return data
+
+
+class OutputCompactor:
+    """
+    Keep agent tool observations within a per-tool token budget
+
+    Outputs that fit their budget are passed through unchanged. Larger
+    ones have their sample lists replaced by summary statistics (count,
+    positives range, first/last date, top-N by positives), shrinking N
+    until the result fits; if even the bare summary is too large, its head
+    is truncated to the budget. The full output is kept in a ToolOutputStore
+    and the summary carries its full_result_id, which the agent can page
+    through with the Get_Full_Tool_Output tool.
+    """
+
+    def __init__(self, default_budget: int = 1000, budgets: Optional[Dict[str, int]] = None, top_n: int = 5,
+                 store: Optional[ToolOutputStore] = None):
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self.top_n = top_n
+        self.store = store or ToolOutputStore()
+
+    @classmethod
+    def from_config(cls, config) -> "OutputCompactor":
+        budgets = {}
+        for entry in config.TOOL_OUTPUT_BUDGETS.split(","):
+            if "=" in entry:
+                tool, budget = entry.split("=", 1)
+                budgets[tool.strip()] = int(budget)
+        return cls(
+            default_budget=config.TOOL_OUTPUT_TOKEN_BUDGET,
+            budgets=budgets,
+            top_n=config.TOOL_OUTPUT_TOP_N,
+            store=ToolOutputStore(config.TOOL_OUTPUT_STORE_MAX_ENTRIES)
+        )
+
+    def budget(self, tool: str) -> int:
+        return self.budgets.get(tool, self.default_budget)
+
+    def compact(self, tool: str, observable: str, output: Any) -> Any:
+        """
+        Return output, or a summary of it with a full_result_id when it exceeds the tool's budget
+
+        Args:
+            tool (str): Agent tool name, used for the budget and the reference
+            observable (str): Tool input (IP, hash, ...)
+            output (Any): Tool result, a dict/list or a JSON string
+
+        Returns:
+            Any: Same type as output (a JSON string stays a string)
+        """
+        budget = self.budget(tool)
+        payload = output if isinstance(output, str) else json.dumps(output, default=str)
+        tokens = estimate_tokens(payload)
+        if budget <= 0 or tokens <= budget:
+            return output
+
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            data = None
+        result_id = self.store.put(tool, observable.strip(), payload if data is None else data, payload)
+        note = f"Output summarised to fit the prompt; call {RETRIEVAL_TOOL_NAME} with the full_result_id for the records"
+
+        if data is None:
+            # Plain text: keep the head that fits and point at the rest
+            compacted_text = _truncated(payload, budget, result_id, note)
+        else:
+            top_n = self.top_n
+            while True:
+                compacted = _compact_value(data, top_n)
+                if not isinstance(compacted, dict):
+                    compacted = {"result": compacted}
+                compacted_text = json.dumps({**compacted, "full_result_id": result_id, "note": note}, default=str)
+                if estimate_tokens(compacted_text) <= budget:
+                    break
+                if top_n == 0:
+                    # Large scalars or deeply nested lists: the summary alone is still too big
+                    compacted_text = _truncated(compacted_text, budget, result_id, note)
+                    break
+                top_n //= 2
+
+        COMPACTIONS.inc(tool=tool)
+        TOKENS_SAVED.inc(max(0, tokens - estimate_tokens(compacted_text)), tool=tool)
+        return compacted_text if isinstance(output, str) else json.loads(compacted_text)
+
+    def wrap(self, tool: str, func: Callable[[str], Any]) -> Callable[[str], Any]:
+        """Wrap a single-input tool function so its result is compacted"""
+        def wrapper(observable: str):
+            return self.compact(tool, observable, func(observable))
+        wrapper.__name__ = getattr(func, "__name__", tool)
+        wrapper.__doc__ = getattr(func, "__doc__", None)
+        return wrapper
+
+    def retrieve(self, query: str) -> str:
+        """
+        Page through a stored full output
+
+        Args:
+            query (str): "<full_result_id>" or "<full_result_id> <offset>"
+
+        Returns:
+            str: JSON with every list sliced from offset, sized to the
+            retrieval budget, and next_offset while records remain. Outputs
+            that cannot be paged by record are paged as JSON text instead,
+            with offsets counted in characters
+        """
+        parts = query.strip().strip("'\"").split()
+        if not parts:
+            return json.dumps({"error": "Pass the full_result_id from a summarised tool output"})
+        result_id = parts[0]
+        try:
+            offset = max(0, int(parts[1])) if len(parts) > 1 else 0
+        except ValueError:
+            return json.dumps({"error": f"Offset must be a number, got {parts[1]!r}"})
+
+        data = self.store.get(result_id)
+        if data is None:
+            return json.dumps({"error": f"No stored output for {result_id} (unknown or evicted); call the original tool again"})
+        budget = self.budget(RETRIEVAL_TOOL_NAME)
+        if isinstance(data, str):
+            return self._text_page(result_id, data, offset, budget)
+
+        page, longest = self._page(data, offset, None)
+        first_record, _ = self._page(data, 0, 1)
+        if budget > 0 and (longest == 0 or estimate_tokens(json.dumps(first_record, default=str)) > budget):
+            # Nothing to page by record (no top-level lists, or records bigger than the budget): page the JSON text
+            return self._text_page(result_id, json.dumps(data, default=str), offset, budget)
+        size = max(longest - offset, 1)
+        while size > 1 and budget > 0 and estimate_tokens(json.dumps(page, default=str)) > budget:
+            size //= 2
+            page, _ = self._page(data, offset, size)
+        end = offset + size
+        page.update({"full_result_id": result_id, "offset": offset, "next_offset": end if end < longest else None})
+        return json.dumps(page, default=str)
+
+    @staticmethod
+    def _text_page(result_id: str, text: str, offset: int, budget: int) -> str:
+        """A budget-sized slice of text; offset and next_offset count characters"""
+        end = offset + budget * 4 if budget > 0 else len(text)
+        while True:
+            page = json.dumps({"full_result_id": result_id, "text": text[offset:end], "offset": offset,
+                               "next_offset": end if end < len(text) else None})
+            if budget <= 0 or estimate_tokens(page) <= budget or end <= offset + 1:
+                return page
+            end = offset + max(1, (end - offset) * 3 // 4)
+
+    @staticmethod
+    def _page(data: Any, offset: int, size: Optional[int]) -> Tuple[Dict[str, Any], int]:
+        """Slice the lists of data to [offset:offset+size]; also returns the longest list length"""
+        end = None if size is None else offset + size
+        if isinstance(data, list):
+            return {"result": data[offset:end]}, len(data)
+        page, longest = {}, 0
+        for key, value in data.items():
+            if isinstance(value, list):
+                page[key] = value[offset:end]
+                longest = max(longest, len(value))
+            else:
+                page[key] = value
+        return page, longest
+
+
+_shared_compactor = None
+_shared_compactor_lock = threading.Lock()
+
+
+def get_shared_compactor(config) -> Optional[OutputCompactor]:
+    """Process-wide compactor, so references stay valid across agent factories; None when disabled"""
+    global _shared_compactor
+    if config.TOOL_OUTPUT_TOKEN_BUDGET <= 0 and not config.TOOL_OUTPUT_BUDGETS:
+        return None
+    with _shared_compactor_lock:
+        if _shared_compactor is None:
+            _shared_compactor = OutputCompactor.from_config(config)
+        return _shared_compactor
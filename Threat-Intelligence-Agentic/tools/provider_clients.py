@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from telemetry.metrics import REGISTRY
+
+try:
+    import h2  # noqa: F401  (httpx negotiates HTTP/2 only when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ProviderSpec:
+    """Connection settings of one provider API"""
+
+    __slots__ = ("name", "base_url", "timeout", "max_concurrency", "headers")
+
+    def __init__(self, name: str, base_url: str, timeout: float = 10.0, max_concurrency: int = 16,
+                 headers: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.headers = headers or {}
+
+
+class ProviderClients:
+    """
+    Pooled async HTTP clients for the enrichment providers
+
+    Every provider gets one httpx.AsyncClient (keep-alive pool, HTTP/2 when
+    h2 is installed) and a semaphore capping its concurrent requests, all
+    owned by a single event loop: the NATS listener's loop when it passes
+    one in, otherwise a background loop thread. Async code awaits
+    request(); tool code on worker threads calls call(), which blocks that
+    thread only, so hundreds of lookups can be in flight on the one loop.
+    """
+
+    def __init__(self, specs: Dict[str, ProviderSpec], loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.specs = specs
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._thread = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="provider-clients", daemon=True)
+            self._thread.start()
+        self._loop = loop
+        self.stats = {name: {"requests": 0, "errors": 0, "in_flight": 0, "seconds": 0.0} for name in specs}
+
+    def _client(self, provider: str) -> httpx.AsyncClient:
+        # Created lazily so the client and semaphore belong to the owning loop
+        client = self._clients.get(provider)
+        if client is None:
+            spec = self.specs[provider]
+            client = self._clients[provider] = httpx.AsyncClient(
+                base_url=spec.base_url,
+                headers=spec.headers,
+                http2=HTTP2_AVAILABLE,
+                timeout=spec.timeout,
+                limits=httpx.Limits(
+                    max_connections=spec.max_concurrency,
+                    max_keepalive_connections=spec.max_concurrency
+                )
+            )
+            self._slots[provider] = asyncio.Semaphore(spec.max_concurrency)
+        return client
+
+    async def _request(self, provider: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        client = self._client(provider)
+        stats = self.stats[provider]
+        async with self._slots[provider]:
+            stats["in_flight"] += 1
+            start = time.perf_counter()
+            try:
+                return await client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                stats["errors"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+                stats["requests"] += 1
+                stats["seconds"] += time.perf_counter() - start
+
+    async def request(self, provider: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request through the provider's pooled client (awaitable from any event loop)
+
+        Args:
+            provider (str): Provider name, e.g. "ipinfo"
+            method (str): HTTP method
+            url (str): Path relative to the provider's base URL (or an absolute URL)
+            **kwargs: Passed to httpx (params, json, headers, timeout, ...)
+
+        Returns:
+            httpx.Response: Fully read response; status codes are left to the caller
+        """
+        if asyncio.get_running_loop() is self._loop:
+            return await self._request(provider, method, url, **kwargs)
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._request(provider, method, url, **kwargs), self._loop)
+        )
+
+    def call(self, provider: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Blocking request() for tool code running on worker threads"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            raise RuntimeError("ProviderClients.call() would block its own event loop; await request() instead")
+        return asyncio.run_coroutine_threadsafe(self._request(provider, method, url, **kwargs), self._loop).result()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {**counters, "seconds": round(counters["seconds"], 3), "http2": HTTP2_AVAILABLE}
+            for name, counters in self.stats.items()
+        }
+
+    def metric_families(self):
+        """HTTP request counters per provider for the /metrics endpoint"""
+        snapshot = self.snapshot()
+        yield ("threat_intel_provider_http_requests_total", "counter", "HTTP requests sent per provider", [
+            ({"provider": name}, counters["requests"]) for name, counters in snapshot.items()
+        ])
+        yield ("threat_intel_provider_http_errors_total", "counter", "Transport errors (timeouts, resets) per provider", [
+            ({"provider": name}, counters["errors"]) for name, counters in snapshot.items()
+        ])
+        yield ("threat_intel_provider_http_in_flight", "gauge", "HTTP requests currently in flight per provider", [
+            ({"provider": name}, counters["in_flight"]) for name, counters in snapshot.items()
+        ])
+
+    async def _close_clients(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    async def aclose(self):
+        """Close the pooled connections (await from any loop)"""
+        if asyncio.get_running_loop() is self._loop:
+            await self._close_clients()
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close_clients(), self._loop))
+
+    def close(self):
+        """Close the connections and stop the background loop, if this instance owns one"""
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._close_clients(), self._loop).result()
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+
+def provider_specs(config=None) -> Dict[str, ProviderSpec]:
+    """Connection settings for every provider, from the config (or the defaults)"""
+    return {
+        "ipinfo": ProviderSpec(
+            "ipinfo",
+            config.IPINFO_BASE_URL if config else "https://ipinfo.io",
+            timeout=config.IPINFO_TIMEOUT if config else 10.0,
+            max_concurrency=config.IPINFO_MAX_CONCURRENCY if config else 32
+        ),
+        "virustotal": ProviderSpec(
+            "virustotal",
+            config.VIRUSTOTAL_BASE_URL if config else "https://www.virustotal.com/api/v3",
+            timeout=config.VIRUSTOTAL_TIMEOUT if config else 30.0,
+            max_concurrency=config.VIRUSTOTAL_MAX_CONCURRENCY if config else 4,
+            headers={"x-apikey": config.VIRUSTOTAL_KEY} if config and config.VIRUSTOTAL_KEY else None
+        )
+    }
+
+
+_shared_clients = None
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_provider_clients(config=None, loop: Optional[asyncio.AbstractEventLoop] = None) -> ProviderClients:
+    """
+    Return the process-wide provider clients, creating them on first use
+
+    The NATS listener calls this first, with its own running loop, so its
+    lookups share that loop; everywhere else a background loop is started.
+    """
+    global _shared_clients
+    with _shared_clients_lock:
+        if _shared_clients is None:
+            _shared_clients = ProviderClients(provider_specs(config), loop=loop)
+            REGISTRY.register_collector("provider_clients", _shared_clients.metric_families)
+        return _shared_clients
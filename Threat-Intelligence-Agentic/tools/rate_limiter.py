@@ -0,0 +1,232 @@
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from telemetry.metrics import REGISTRY
+
+# Lower value = served first when several lookups wait for the same provider
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+_lookup_priority = contextvars.ContextVar("lookup_priority", default=PRIORITY_NORMAL)
+
+
+class RetryableProviderError(Exception):
+    """Raised by provider calls on HTTP 429/5xx so the limiter can back off and retry"""
+
+    def __init__(self, provider: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"{provider} returned HTTP {status}")
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+
+@contextmanager
+def lookup_priority(priority: int):
+    """Run provider lookups made inside the block with the given priority"""
+    token = _lookup_priority.set(priority)
+    try:
+        yield
+    finally:
+        _lookup_priority.reset(token)
+
+
+def priority_for_triage(triage_result: str) -> int:
+    """Map a triage_alert() label onto a lookup priority"""
+    if "High" in triage_result:
+        return PRIORITY_HIGH
+    if "Low" in triage_result:
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served in priority order (FIFO within a priority)"""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self.counters = {"granted": 0, "waited": 0, "timed_out": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None, cost: int = 1) -> bool:
+        """
+        Block until this caller may spend cost tokens; False on timeout.
+        A cost above the burst size waits for a full bucket and leaves it in
+        debt, so bulk requests are still paced at the configured rate.
+        """
+        if self.unlimited:
+            with self._cond:
+                self.counters["granted"] += 1
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        needed = min(cost, self.capacity)
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            waited = False
+            while True:
+                self._refill()
+                is_head = self._waiters[0] == entry
+                if is_head and self.tokens >= needed:
+                    heapq.heappop(self._waiters)
+                    self.tokens -= cost
+                    self.counters["granted"] += 1
+                    if waited:
+                        self.counters["waited"] += 1
+                    self._cond.notify_all()
+                    return True
+
+                wait_for = (needed - self.tokens) / self.rate if is_head else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiters.remove(entry)
+                        heapq.heapify(self._waiters)
+                        self.counters["timed_out"] += 1
+                        self._cond.notify_all()
+                        return False
+                    wait_for = remaining if wait_for is None else min(wait_for, remaining)
+                waited = True
+                self._cond.wait(wait_for)
+
+    def record(self, outcome: str):
+        with self._cond:
+            self.counters[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            if not self.unlimited:
+                self._refill()
+            return {
+                "rate_per_minute": self.rate * 60,
+                "burst": self.capacity,
+                "tokens_available": round(self.tokens, 2),
+                "waiting": len(self._waiters),
+                **self.counters
+            }
+
+
+class ProviderRateLimiter:
+    """
+    Central per-provider pacing for VirusTotal, ipinfo and friends
+
+    Every provider call goes through call(), which waits for a token (high
+    severity alerts first) and retries RetryableProviderError with full
+    jitter exponential backoff.
+    """
+
+    def __init__(
+            self,
+            limits: Dict[str, Tuple[float, int]],
+            max_retries: int = 3,
+            backoff_base: float = 1.0,
+            backoff_max: float = 30.0
+    ):
+        self.buckets = {
+            provider: TokenBucket(provider, rate, burst)
+            for provider, (rate, burst) in limits.items()
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+
+    def bucket(self, provider: str) -> TokenBucket:
+        with self._lock:
+            if provider not in self.buckets:
+                # Unknown providers are tracked but not paced
+                self.buckets[provider] = TokenBucket(provider, 0, 1)
+            return self.buckets[provider]
+
+    def call(
+            self,
+            provider: str,
+            fn: Callable[..., Any],
+            *args,
+            priority: Optional[int] = None,
+            cost: int = 1
+    ) -> Any:
+        bucket = self.bucket(provider)
+        if priority is None:
+            priority = _lookup_priority.get()
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire(priority, cost=cost)
+            try:
+                return fn(*args)
+            except RetryableProviderError as e:
+                bucket.record("throttled" if e.status == 429 else "failed")
+                if attempt == self.max_retries:
+                    raise
+                bucket.record("retries")
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                time.sleep(max(e.retry_after or 0, random.uniform(0, delay)))
+
+    def quota_state(self) -> Dict[str, Dict[str, Any]]:
+        """Current tokens, waiters and outcome counters for every provider"""
+        with self._lock:
+            buckets = dict(self.buckets)
+        return {provider: bucket.snapshot() for provider, bucket in buckets.items()}
+
+    def metric_families(self):
+        """Grant/throttle/retry counters and current token levels for the /metrics endpoint"""
+        state = self.quota_state()
+        yield ("threat_intel_provider_calls_total", "counter",
+               "Provider call outcomes seen by the rate limiter (throttled = HTTP 429, failed = 5xx)", [
+                   ({"provider": provider, "outcome": outcome}, bucket[outcome])
+                   for provider, bucket in state.items()
+                   for outcome in ("granted", "waited", "timed_out", "retries", "throttled", "failed")
+               ])
+        yield ("threat_intel_provider_tokens_available", "gauge", "Rate limiter tokens left per provider", [
+            ({"provider": provider}, bucket["tokens_available"]) for provider, bucket in state.items()
+        ])
+        yield ("threat_intel_provider_waiting", "gauge", "Lookups waiting for a provider token", [
+            ({"provider": provider}, bucket["waiting"]) for provider, bucket in state.items()
+        ])
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(config=None) -> ProviderRateLimiter:
+    """Return the process-wide limiter, creating it from the config on first use"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            if config is None:
+                _shared_limiter = ProviderRateLimiter({})
+            else:
+                _shared_limiter = ProviderRateLimiter(
+                    {
+                        "virustotal": (config.RATE_LIMIT_VIRUSTOTAL_PER_MIN, config.RATE_LIMIT_VIRUSTOTAL_BURST),
+                        "ipinfo": (config.RATE_LIMIT_IPINFO_PER_MIN, config.RATE_LIMIT_IPINFO_BURST)
+                    },
+                    max_retries=config.PROVIDER_MAX_RETRIES,
+                    backoff_base=config.PROVIDER_BACKOFF_BASE,
+                    backoff_max=config.PROVIDER_BACKOFF_MAX
+                )
+            REGISTRY.register_collector("rate_limiter", _shared_limiter.metric_families)
+        return _shared_limiter
@@ -0,0 +1,362 @@
+import bisect
+import hashlib
+import ipaddress
+import os
+import re
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from telemetry.metrics import REGISTRY
+
+VERDICT_BENIGN = "benign"
+VERDICT_MALICIOUS = "malicious"
+
+# Address space that never needs a provider lookup: RFC1918, loopback,
+# link-local, CGNAT, multicast and the IPv6 equivalents
+PRIVATE_RANGES = (
+    "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "127.0.0.0/8", "169.254.0.0/16",
+    "100.64.0.0/10", "0.0.0.0/8", "224.0.0.0/4", "::1/128", "fc00::/7", "fe80::/10"
+)
+
+_HEX_HASH = re.compile(r"[0-9a-f]+")
+_HASH_LENGTHS = (32, 40, 64)
+_SEPARATORS = re.compile(r"[\s,;]")
+_HASH_IOC_TYPES = ("md5", "sha1", "sha256", "file_hash", "hash")
+_IP_IOC_TYPES = ("ip", "ipv4", "ipv6")
+
+
+def _fingerprint(value: str) -> bytes:
+    """64-bit digest stored in the sorted hash arrays (collisions are ~n/2^64)"""
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+
+
+def _ipv4_int(value: str) -> Optional[int]:
+    try:
+        return struct.unpack(">I", socket.inet_pton(socket.AF_INET, value))[0]
+    except OSError:
+        return None
+
+
+def _merge_intervals(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort and merge overlapping/adjacent [start, end] ranges so one binary search answers a lookup"""
+    if not len(starts):
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    new_run = np.ones(len(starts), dtype=bool)
+    new_run[1:] = starts[1:] > reach[:-1] + 1
+    run_starts = np.flatnonzero(new_run)
+    return starts[new_run], np.maximum.reduceat(ends, run_starts)
+
+
+class _IntervalIndex:
+    """IPv4 ranges as two sorted uint32 arrays; the rare IPv6 ranges as sorted int lists"""
+
+    def __init__(self, v4: List[Tuple[int, int]], v6: List[Tuple[int, int]]):
+        starts = np.fromiter((start for start, _ in v4), dtype=np.int64, count=len(v4))
+        ends = np.fromiter((end for _, end in v4), dtype=np.int64, count=len(v4))
+        starts, ends = _merge_intervals(starts, ends)
+        self.v4_starts = starts.astype(np.uint32)
+        self.v4_ends = ends.astype(np.uint32)
+
+        merged: List[List[int]] = []
+        for start, end in sorted(v6):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.v6_starts = [start for start, _ in merged]
+        self.v6_ends = [end for _, end in merged]
+
+    def __len__(self):
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    def contains(self, ip_address: str) -> bool:
+        key = _ipv4_int(ip_address)
+        if key is not None:
+            # A uint32 needle keeps numpy from up-casting (copying) the whole array
+            i = int(np.searchsorted(self.v4_starts, np.uint32(key), side="right")) - 1
+            return i >= 0 and key <= int(self.v4_ends[i])
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return False
+        if address.version == 4:
+            return self.contains(str(address))
+        key = int(address)
+        i = bisect.bisect_right(self.v6_starts, key) - 1
+        return i >= 0 and key <= self.v6_ends[i]
+
+
+class _HashSet:
+    """Sorted array of 64-bit fingerprints: 8 bytes per entry, binary-searched"""
+
+    def __init__(self, values: Iterable[str]):
+        digests = b"".join(_fingerprint(value) for value in values)
+        self.fingerprints = np.unique(np.frombuffer(digests, dtype=">u8").astype(np.uint64))
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def __contains__(self, value: str) -> bool:
+        if not len(self.fingerprints):
+            return False
+        key = np.uint64(int.from_bytes(_fingerprint(value), "big"))
+        i = int(np.searchsorted(self.fingerprints, key))
+        return i < len(self.fingerprints) and self.fingerprints[i] == key
+
+
+class _ListIndex:
+    """Everything parsed from one side (allow or block) of the feeds"""
+
+    def __init__(self):
+        self.v4: List[Tuple[int, int]] = []
+        self.v6: List[Tuple[int, int]] = []
+        self.hashes: List[str] = []
+        self.domains: List[str] = []
+        self.invalid = 0
+
+    def add(self, entry: str):
+        entry = entry.strip().lower()
+        if not entry:
+            return
+        if "://" in entry:
+            entry = urlsplit(entry).hostname or ""
+
+        # Cheapest tests first: large feeds are mostly hashes and single IPs
+        if len(entry) in _HASH_LENGTHS and _HEX_HASH.fullmatch(entry):
+            self.hashes.append(entry)
+            return
+        key = _ipv4_int(entry) if entry[:1].isdigit() else None
+        if key is not None:
+            self.v4.append((key, key))
+            return
+        if not (entry[:1].isdigit() or ":" in entry):
+            self._add_domain(entry)
+            return
+        try:
+            if "-" in entry and entry.replace(".", "").replace("-", "").isdigit():
+                first, last = (ipaddress.ip_address(part.strip()) for part in entry.split("-", 1))
+            else:
+                network = ipaddress.ip_network(entry, strict=False)
+                first, last = network.network_address, network.broadcast_address
+            (self.v4 if first.version == 4 else self.v6).append((int(first), int(last)))
+            return
+        except ValueError:
+            self._add_domain(entry)
+
+    def _add_domain(self, entry: str):
+        domain = entry.lstrip("*.").rstrip(".")
+        if "." in domain and " " not in domain:
+            self.domains.append(domain)
+        else:
+            self.invalid += 1
+
+    def compile(self) -> "_CompiledList":
+        return _CompiledList(_IntervalIndex(self.v4, self.v6), _HashSet(self.hashes), _HashSet(self.domains))
+
+
+class _CompiledList:
+    __slots__ = ("ranges", "hashes", "domains")
+
+    def __init__(self, ranges: _IntervalIndex, hashes: _HashSet, domains: _HashSet):
+        self.ranges = ranges
+        self.hashes = hashes
+        self.domains = domains
+
+    def match(self, ioc_type: str, value: str) -> bool:
+        if ioc_type in _IP_IOC_TYPES:
+            return self.ranges.contains(value)
+        if ioc_type in _HASH_IOC_TYPES:
+            return value in self.hashes
+        if ioc_type == "domain":
+            # A listed domain covers its subdomains: check every parent suffix
+            labels = value.split(".")
+            return any(".".join(labels[i:]) in self.domains for i in range(len(labels) - 1))
+        if ioc_type == "url":
+            host = urlsplit(value).hostname or ""
+            return self.match("ipv4" if _ipv4_int(host) is not None or ":" in host else "domain", host)
+        return False
+
+    def sizes(self) -> Dict[str, int]:
+        return {"ranges": len(self.ranges), "hashes": len(self.hashes), "domains": len(self.domains)}
+
+
+class _PrefilterIndex:
+    """One immutable generation of the index; reloads build a new one and swap the reference"""
+
+    def __init__(self, allow: _CompiledList, block: _CompiledList, private: _CompiledList,
+                 mtimes: Dict[str, float], invalid: int):
+        self.allow = allow
+        self.block = block
+        self.private = private
+        self.mtimes = mtimes
+        self.invalid = invalid
+        self.loaded_at = time.time()
+
+
+def _read_feed(path: str, target: _ListIndex):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            # Feeds are one entry per line; trailing comments and CSV columns are ignored
+            if "#" in line:
+                line = line.split("#", 1)[0]
+            line = line.strip()
+            if line:
+                target.add(_SEPARATORS.split(line, 1)[0])
+
+
+class ReputationPrefilter:
+    """
+    Local allowlist/blocklist verdicts for observables, checked before any provider call
+
+    Feeds are plain text files with one entry per line: IPs, CIDRs, IPv4
+    ranges ("a-b"), MD5/SHA1/SHA256 hashes, domains (covering their
+    subdomains) or URLs. IP ranges are merged into sorted interval arrays
+    and hashes/domains are kept as a sorted array of 64-bit fingerprints,
+    so millions of entries cost a few bytes each and a lookup is a binary
+    search. The blocklist wins over the allowlist.
+
+    The compiled index is immutable; when a feed file changes it is rebuilt
+    on a background thread and swapped in with one reference assignment, so
+    lookups never see a half-loaded index.
+    """
+
+    def __init__(self, allowlist_files: Iterable[str] = (), blocklist_files: Iterable[str] = (),
+                 allow_private: bool = True, reload_interval: float = 60.0):
+        self.allowlist_files = [path for path in allowlist_files if path]
+        self.blocklist_files = [path for path in blocklist_files if path]
+        self.allow_private = allow_private
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._next_check = time.monotonic() + reload_interval
+        self.stats = {"checks": 0, "benign": 0, "malicious": 0, "reloads": 0}
+        self._index = self._build()
+
+    @classmethod
+    def from_config(cls, config) -> "ReputationPrefilter":
+        return cls(
+            allowlist_files=[path.strip() for path in config.REPUTATION_ALLOWLIST_FILES.split(",")],
+            blocklist_files=[path.strip() for path in config.REPUTATION_BLOCKLIST_FILES.split(",")],
+            allow_private=config.REPUTATION_ALLOW_PRIVATE,
+            reload_interval=config.REPUTATION_RELOAD_INTERVAL
+        )
+
+    def _mtimes(self) -> Dict[str, float]:
+        mtimes = {}
+        for path in self.allowlist_files + self.blocklist_files:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                mtimes[path] = 0.0
+        return mtimes
+
+    def _build(self) -> _PrefilterIndex:
+        mtimes = self._mtimes()
+        allow, block, private = _ListIndex(), _ListIndex(), _ListIndex()
+        for paths, target in ((self.allowlist_files, allow), (self.blocklist_files, block)):
+            for path in paths:
+                if mtimes[path]:
+                    _read_feed(path, target)
+                else:
+                    print(f"⚠️ Reputation feed not found: {path}")
+        if self.allow_private:
+            for network in PRIVATE_RANGES:
+                private.add(network)
+        return _PrefilterIndex(allow.compile(), block.compile(), private.compile(), mtimes, allow.invalid + block.invalid)
+
+    def reload(self) -> bool:
+        """Rebuild the index from the feeds and swap it in; False if a reload is already running"""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            start = time.perf_counter()
+            self._index = self._build()
+            self.stats["reloads"] += 1
+            sizes = self.sizes()
+            print(f"🛡️ Reputation prefilter loaded in {time.perf_counter() - start:.2f}s: {sizes}")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check or not (self.allowlist_files or self.blocklist_files):
+            return
+        self._next_check = now + self.reload_interval
+        if self._mtimes() != self._index.mtimes:
+            # Lookups keep using the current index while the new one is built
+            threading.Thread(target=self.reload, name="reputation-reload", daemon=True).start()
+
+    def check(self, ioc_type: str, observable: str) -> Optional[Dict[str, str]]:
+        """
+        Look an observable up in the local lists
+
+        Args:
+            ioc_type (str): ipv4/ipv6/ip, md5/sha1/sha256/file_hash, domain or url
+            observable (str): Value to check
+
+        Returns:
+            dict: {"verdict": "benign" | "malicious", "source": list name}, or
+            None when the lists say nothing and a provider lookup is needed
+        """
+        self._maybe_reload()
+        index = self._index
+        value = observable.strip().lower()
+        self.stats["checks"] += 1
+
+        if index.block.match(ioc_type, value):
+            self.stats["malicious"] += 1
+            return {"verdict": VERDICT_MALICIOUS, "source": "blocklist"}
+        for source, compiled in (("allowlist", index.allow), ("private", index.private)):
+            if compiled.match(ioc_type, value):
+                self.stats["benign"] += 1
+                return {"verdict": VERDICT_BENIGN, "source": source}
+        return None
+
+    def reputation(self, ioc_type: str, observable: str) -> Optional[str]:
+        """Verdict only; the reputation hook used by the triage rules engine"""
+        result = self.check(ioc_type, observable)
+        return result["verdict"] if result else None
+
+    def sizes(self) -> Dict[str, Dict[str, int]]:
+        index = self._index
+        return {"allowlist": index.allow.sizes(), "blocklist": index.block.sizes(), "invalid_entries": index.invalid}
+
+    def metric_families(self):
+        """Verdict counters and index sizes for the /metrics endpoint"""
+        stats = dict(self.stats)
+        yield ("threat_intel_prefilter_checks_total", "counter", "Observables checked against the local lists", [
+            ({}, stats["checks"])
+        ])
+        yield ("threat_intel_prefilter_verdicts_total", "counter", "Provider lookups skipped by local verdict", [
+            ({"verdict": VERDICT_BENIGN}, stats["benign"]), ({"verdict": VERDICT_MALICIOUS}, stats["malicious"])
+        ])
+        yield ("threat_intel_prefilter_entries", "gauge", "Compiled allowlist/blocklist entries", [
+            ({"list": name, "kind": kind}, count)
+            for name, sizes in self.sizes().items() if isinstance(sizes, dict)
+            for kind, count in sizes.items()
+        ])
+
+
+_shared_prefilter = None
+_shared_prefilter_lock = threading.Lock()
+
+
+def get_shared_prefilter(config=None) -> Optional[ReputationPrefilter]:
+    """Return the process-wide prefilter, or None when REPUTATION_PREFILTER_ENABLED is off"""
+    global _shared_prefilter
+    if config is None or not config.REPUTATION_PREFILTER_ENABLED:
+        return None
+    with _shared_prefilter_lock:
+        if _shared_prefilter is None:
+            _shared_prefilter = ReputationPrefilter.from_config(config)
+            REGISTRY.register_collector("reputation_prefilter", _shared_prefilter.metric_families)
+        return _shared_prefilter
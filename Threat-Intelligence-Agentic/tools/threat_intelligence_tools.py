@@ -1,14 +1,142 @@
 import json
-import requests
-from typing import Optional, Dict, Any
-from msticpy.sectools.tilookup import TILookup
-from msticpy.sectools.vtlookupv3.vtlookupv3 import VTLookupV3
+import threading
+import httpx
+import numpy as np
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterable, List, Tuple
 
 from config import Config
 from tools.BaseThreatIntelligenceTool import BaseThreatIntelligenceTool
+from tools.geo_database import get_geo_database
+from tools.provider_clients import ProviderClients, get_shared_provider_clients
+from tools.rate_limiter import RetryableProviderError
+from tools.reputation_prefilter import VERDICT_MALICIOUS
 import os
 
+# msticpy and pandas are only imported once a provider lookup or batch
+# scoring actually needs them, which keeps listener startup fast
+if TYPE_CHECKING:
+    import pandas as pd
+    from msticpy.sectools.tilookup import TILookup
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# msticpy reports an HTTP status or a LookupStatus value (OK = 0, NO_DATA = 4)
+VT_OK_STATUS = (0, 200)
+VT_NO_DATA_STATUS = (4, 404)
+IPINFO_BATCH_SIZE = 1000
+VT_BATCH_SIZE = 25
+
+# TILookup loads msticpyconfig.yaml and instantiates every provider, so one
+# instance is shared by all tools (and every Streamlit session) in the process
+_shared_ti_lookup = None
+_shared_ti_lookup_lock = threading.Lock()
+
+
+def get_shared_ti_lookup() -> "TILookup":
+    """Return the process-wide msticpy provider registry, loading it on first use"""
+    global _shared_ti_lookup
+    with _shared_ti_lookup_lock:
+        if _shared_ti_lookup is None:
+            from msticpy.sectools.tilookup import TILookup
+            _shared_ti_lookup = TILookup()
+        return _shared_ti_lookup
+
+
+class _SharedTILookup:
+    """Tool attribute that resolves to the shared TILookup on first access"""
+
+    def __get__(self, instance, owner):
+        return get_shared_ti_lookup()
+
+
+def _retryable_error(provider: str, response: httpx.Response) -> RetryableProviderError:
+    retry_after = response.headers.get('Retry-After')
+    return RetryableProviderError(
+        provider,
+        response.status_code,
+        float(retry_after) if retry_after and retry_after.isdigit() else None
+    )
+
+
+def _vt_status(row) -> int:
+    status = row.get('Status')
+    return VT_OK_STATUS[0] if status is None or status != status else int(status)
+
+
+def _vt_ip_details(ti_lookup: "TILookup", ip_address: str) -> Optional[Dict[str, Any]]:
+    """Raw VirusTotal IP report via msticpy, or None when VT has no data; any other failure raises, so it is never cached"""
+    result = ti_lookup.lookup_ioc(observable=ip_address, ioc_type="ipv4", providers=["VirusTotal"])
+    row = result.iloc[0]
+    status = _vt_status(row)
+    if status in RETRYABLE_STATUS:
+        raise RetryableProviderError("virustotal", status)
+    if status in VT_NO_DATA_STATUS:
+        return None
+    if status not in VT_OK_STATUS:
+        # e.g. 401/403 for a bad key or 400 for a malformed request
+        raise RuntimeError(f"VirusTotal IP lookup failed with status {status}: {row.get('Details') or ''}".strip())
+    return row['RawResult'] or None
+
+
+def _vt_ip_details_batch(ti_lookup: "TILookup", ip_addresses: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Bulk VirusTotal IP reports via msticpy lookup_iocs. IPs that VT throttled
+    or failed on are left out so callers can retry them individually
+    (and get the error from the single lookup).
+    """
+    import pandas as pd
+
+    data = pd.DataFrame({"Ioc": ip_addresses, "IocType": "ipv4"})
+    result = ti_lookup.lookup_iocs(data=data, ioc_col="Ioc", ioc_type_col="IocType", providers=["VirusTotal"])
+
+    details = {}
+    for _, row in result.iterrows():
+        status = _vt_status(row)
+        if status in VT_NO_DATA_STATUS:
+            details[row['Ioc']] = None
+        elif status in VT_OK_STATUS:
+            details[row['Ioc']] = row['RawResult'] or None
+    return details
+
+
+def _ipinfo_details(clients: ProviderClients, ip_address: str, token: str) -> Optional[Dict[str, Any]]:
+    """Raw ipinfo.io record, or None when the IP is unknown to ipinfo"""
+    response = clients.call("ipinfo", "GET", f"/{ip_address}/json", params={'token': token})
+    if response.status_code == 404:
+        return None
+    if response.status_code in RETRYABLE_STATUS:
+        raise _retryable_error("ipinfo", response)
+    response.raise_for_status()
+    return response.json()
+
+
+def _ipinfo_details_batch(
+        clients: ProviderClients,
+        ip_addresses: List[str],
+        token: str
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Bulk ipinfo.io records from the batch endpoint (up to 1000 IPs per request)"""
+    response = clients.call(
+        "ipinfo", "POST", "/batch",
+        params={'token': token},
+        json=list(ip_addresses),
+        timeout=30
+    )
+    if response.status_code in RETRYABLE_STATUS:
+        raise _retryable_error("ipinfo", response)
+    response.raise_for_status()
+    data = response.json()
+
+    details = {}
+    for ip in ip_addresses:
+        record = data.get(ip)
+        # Unknown or invalid IPs come back as an error record instead of a location
+        details[ip] = record if isinstance(record, dict) and 'error' not in record else None
+    return details
+
+
 class IPIntelligenceTool(BaseThreatIntelligenceTool):
+    ti_lookup = _SharedTILookup()
+
     def __init__(self, config: Optional[Config] = None):
         """
         Initialize IPIntelligenceTool
@@ -17,27 +145,51 @@ class IPIntelligenceTool(BaseThreatIntelligenceTool):
             config (Config, optional): Configuration object. Defaults to None.
         """
         super().__init__(config)
-        self.ti_lookup = TILookup()
         self.vt_key = config.VIRUSTOTAL_KEY if config else None
 
+    @staticmethod
+    def _format(ip_address: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "ip": ip_address,
+            "detected_samples": details.get('detected_communicating_samples', []),
+            "undetected_samples": details.get('undetected_communicating_samples', [])
+        }
+
+    @staticmethod
+    def _prefiltered(ip_address: str, verdict: str) -> Dict[str, Any]:
+        return {"ip": ip_address, "detected_samples": [], "undetected_samples": [], "prefilter": verdict}
+
     def process(self, ip_address: str) -> Dict[str, Any]:
         try:
+            # Known-good/known-bad IPs are decided locally, without a provider call
+            verdict = self._prefilter("ip", ip_address)
+            if verdict:
+                return self._prefiltered(ip_address, verdict)
+
             # Virus Total IP Lookup
-            result = self.ti_lookup.lookup_ioc(
-                observable=ip_address,
-                ioc_type="ipv4",
-                providers=["VirusTotal"]
-            )
-            details = result.at[0, 'RawResult']
+            details = self._cached_lookup(
+                "virustotal", "ipv4", ip_address,
+                lambda ip: _vt_ip_details(self.ti_lookup, ip)
+            ) or {}
 
-            return {
-                "ip": ip_address,
-                "detected_samples": details.get('detected_communicating_samples', []),
-                "undetected_samples": details.get('undetected_communicating_samples', [])
-            }
+            return self._format(ip_address, details)
         except Exception as e:
             return {"error": str(e)}
 
+    def process_batch(self, observables: Iterable[str]) -> Dict[str, Any]:
+        ip_addresses = list(dict.fromkeys(observables))
+        verdicts = self._prefilter_batch("ip", ip_addresses)
+        details = self._cached_lookup_batch(
+            "virustotal", "ipv4", [ip for ip in ip_addresses if ip not in verdicts],
+            lambda chunk: _vt_ip_details_batch(self.ti_lookup, chunk),
+            chunk_size=VT_BATCH_SIZE
+        )
+        return {
+            ip: self._prefiltered(ip, verdicts[ip]) if ip in verdicts else
+            self._format(ip, details[ip] or {}) if ip in details else self.process(ip)
+            for ip in ip_addresses
+        }
+
 
 class GeolocationTool(BaseThreatIntelligenceTool):
     def __init__(self, config: Config):
@@ -45,79 +197,151 @@ class GeolocationTool(BaseThreatIntelligenceTool):
 
     def process(self, ip_address: str) -> Dict[str, Any]:
         try:
-            response = requests.get(
-                f'https://ipinfo.io/{ip_address}/json',
-                params={'token': self.config.IPINFO_API_KEY},
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            return {
-                "ip": ip_address,
-                "city": data.get('city', 'Unknown'),
-                "region": data.get('region', 'Unknown'),
-                "country": data.get('country', 'Unknown'),
-                "location": data.get('loc', 'Unknown'),
-                "organization": data.get('org', 'Unknown')
-            }
-        except requests.RequestException as e:
+            # Local database first; ipinfo.io only for IPs it does not cover
+            geo_db = get_geo_database(self.config)
+            data = geo_db.lookup(ip_address) if geo_db else None
+            verdict = self._prefilter("ip", ip_address)
+            if data is None and verdict:
+                # Listed IPs are not worth an ipinfo.io call
+                return {**self._format(ip_address, {}), "prefilter": verdict}
+            if data is None:
+                data = self._cached_lookup(
+                    "ipinfo", "ipv4", ip_address,
+                    lambda ip: _ipinfo_details(get_shared_provider_clients(self.config), ip, self.config.IPINFO_API_KEY)
+                ) or {}
+
+            return self._format(ip_address, data)
+        except (httpx.HTTPError, RetryableProviderError) as e:
             return {"error": f"Geolocation lookup failed: {str(e)}"}
 
+    @staticmethod
+    def _format(ip_address: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "ip": ip_address,
+            "city": data.get('city', 'Unknown'),
+            "region": data.get('region', 'Unknown'),
+            "country": data.get('country', 'Unknown'),
+            "location": data.get('loc', 'Unknown'),
+            "organization": data.get('org', 'Unknown')
+        }
+
+    def process_batch(self, observables: Iterable[str]) -> Dict[str, Any]:
+        ip_addresses = list(dict.fromkeys(observables))
+
+        data = {}
+        geo_db = get_geo_database(self.config)
+        if geo_db:
+            for ip in ip_addresses:
+                local = geo_db.lookup(ip)
+                if local is not None:
+                    data[ip] = local
+
+        verdicts = self._prefilter_batch("ip", [ip for ip in ip_addresses if ip not in data])
+        remaining = [ip for ip in ip_addresses if ip not in data and ip not in verdicts]
+        if remaining:
+            data.update(self._cached_lookup_batch(
+                "ipinfo", "ipv4", remaining,
+                lambda chunk: _ipinfo_details_batch(
+                    get_shared_provider_clients(self.config), chunk, self.config.IPINFO_API_KEY
+                ),
+                chunk_size=IPINFO_BATCH_SIZE
+            ))
+        return {
+            ip: {**self._format(ip, {}), "prefilter": verdicts[ip]} if ip in verdicts else
+            self._format(ip, data[ip] or {}) if ip in data else self.process(ip)
+            for ip in ip_addresses
+        }
+
 class Retrieve_IP_Info(BaseThreatIntelligenceTool):
+    ti_lookup = _SharedTILookup()
+
     def __init__(self, config: Config):
         super().__init__(config)
         self.config = config
-        self.ti_lookup = TILookup()
         self.vt_key = config.VIRUSTOTAL_KEY if config else None
 
     def process(self, ip_address: str) -> str:
         """Look up IP information from Virus Total"""
         try:
-            result = self.ti_lookup.lookup_ioc(observable=ip_address, ioc_type="ipv4", providers=["VirusTotal"])
-            details = result.at[0, 'RawResult']
+            details = self._cached_lookup(
+                "virustotal", "ipv4", ip_address,
+                lambda ip: _vt_ip_details(self.ti_lookup, ip)
+            ) or {}
             comm_samples = details.get('detected_communicating_samples', [])
             return json.dumps(comm_samples)
         except Exception as e:
             return f"IP lookup error: {str(e)}"
 
+    def process_batch(self, observables: Iterable[str]) -> Dict[str, Any]:
+        ip_addresses = list(dict.fromkeys(observables))
+        details = self._cached_lookup_batch(
+            "virustotal", "ipv4", ip_addresses,
+            lambda chunk: _vt_ip_details_batch(self.ti_lookup, chunk),
+            chunk_size=VT_BATCH_SIZE
+        )
+        return {
+            ip: json.dumps((details[ip] or {}).get('detected_communicating_samples', []))
+            if ip in details else self.process(ip)
+            for ip in ip_addresses
+        }
+
 
 class MalwareAnalysisTool(BaseThreatIntelligenceTool):
     def __init__(self, config: Config):
         self.config = config
         self.vt_key = config.VIRUSTOTAL_KEY
 
+    def _fetch_file_summary(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        # Same /files/{id} object VTLookupV3.get_object fetched, over the pooled VT client
+        response = get_shared_provider_clients(self.config).call("virustotal", "GET", f"/files/{file_hash}")
+        if response.status_code == 404:
+            return None
+        if response.status_code in RETRYABLE_STATUS:
+            # An exhausted quota comes back as 429 QuotaExceededError
+            raise _retryable_error("virustotal", response)
+        response.raise_for_status()
+        attributes = response.json().get("data", {}).get("attributes", {})
+
+        return {
+            "hash": file_hash,
+            "detection_rate": attributes.get("last_analysis_stats"),
+            "first_seen": attributes.get("first_submission_date"),
+            "last_seen": attributes.get("last_submission_date"),
+            "file_type": attributes.get("type_description"),
+            "reputation": attributes.get("reputation")
+        }
+
     def process(self, file_hash: str) -> Dict[str, Any]:
         try:
-            vt_lookup = VTLookupV3(self.vt_key)
-            result = vt_lookup.get_object(file_hash, "file")
-
-            if result is None:
-                return {"error": "No malware information found"}
-
-            return {
-                "hash": file_hash,
-                "detection_rate": result.detection_summary,
-                "first_seen": result.first_submission_date,
-                "last_seen": result.last_submission_date,
-                "file_type": result.type,
-                "reputation": result.reputation
-            }
+            verdict = self._prefilter("file_hash", file_hash)
+            if verdict:
+                return {"hash": file_hash, "prefilter": verdict}
+
+            summary = self._cached_lookup("virustotal", "file_hash", file_hash, self._fetch_file_summary)
+
+            if summary is None:
+                # Unknown to VirusTotal is a result, not a failed lookup
+                return {"hash": file_hash, "found": False}
+
+            return summary
         except Exception as e:
             return {"error": str(e)}
 
 class ThreatScoreAssessmentTool(BaseThreatIntelligenceTool):
+    ti_lookup = _SharedTILookup()
+
     def __init__(self, config: Config):
         self.config = config
         self.vt_key = config.VIRUSTOTAL_KEY
-        self.ti_lookup = TILookup()
         self.geolocation_api_key = os.getenv('IPINFO_API_KEY', '')
 
     def ip_info(self, ip_address: str) -> str:
         """Look up IP information from Virus Total"""
         try:
-            result = self.ti_lookup.lookup_ioc(observable=ip_address, ioc_type="ipv4", providers=["VirusTotal"])
-            details = result.at[0, 'RawResult']
+            details = self._cached_lookup(
+                "virustotal", "ipv4", ip_address,
+                lambda ip: _vt_ip_details(self.ti_lookup, ip)
+            ) or {}
             comm_samples = details.get('detected_communicating_samples', [])
             return json.dumps(comm_samples)
         except Exception as e:
@@ -125,13 +349,18 @@ class ThreatScoreAssessmentTool(BaseThreatIntelligenceTool):
 
     def geolocate_ip(self, ip_address: str) -> str:
         """Perform geolocation lookup for an IP address with improved error handling"""
-        if not self.geolocation_api_key:
+        geo_db = get_geo_database(self.config)
+        data = geo_db.lookup(ip_address) if geo_db else None
+
+        if data is None and not self.geolocation_api_key:
             return json.dumps({"error": "Geolocation API key not configured"})
 
         try:
-            response = requests.get(f'https://ipinfo.io/{ip_address}/json?token={self.geolocation_api_key}', timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            if data is None:
+                data = self._cached_lookup(
+                    "ipinfo", "ipv4", ip_address,
+                    lambda ip: _ipinfo_details(get_shared_provider_clients(self.config), ip, self.geolocation_api_key)
+                ) or {}
 
             location_info = {
                 'city': data.get('city', 'Unknown'),
@@ -142,71 +371,157 @@ class ThreatScoreAssessmentTool(BaseThreatIntelligenceTool):
             }
 
             return json.dumps(location_info)
-        except requests.RequestException as e:
+        except (httpx.HTTPError, RetryableProviderError) as e:
             return json.dumps({"error": f"Geolocation lookup failed: {str(e)}"})
 
     def process(self, ip_address: str) -> str:
         """Calculate an aggregated threat score based on multiple intelligence sources"""
         try:
+            verdict = self._prefilter("ip", ip_address)
+            if verdict:
+                threat_score, risk_assessment = ThreatScoreCalculator.verdict_score(verdict)
+                return json.dumps({
+                    'threat_score': threat_score,
+                    'details': {'prefilter': verdict, 'risk_assessment': risk_assessment}
+                })
+
             vt_samples_str = self.ip_info(ip_address)
             vt_samples = json.loads(vt_samples_str)
 
             geolocation_str = self.geolocate_ip(ip_address)
             geolocation = json.loads(geolocation_str)
 
-            threat_score = 0
-            threat_score += min(len(vt_samples), 10)
-
-            high_risk_countries = ['RU', 'CN', 'IR', 'KP']
-            if geolocation.get('country') in high_risk_countries:
-                threat_score += 5
-
-            suspicious_orgs = ['Hosting Provider', 'Cloud Provider']
-            if any(org in geolocation.get('org', '') for org in suspicious_orgs):
-                threat_score += 3
+            threat_score, risk_assessment = ThreatScoreCalculator.score(
+                len(vt_samples),
+                geolocation.get('country'),
+                geolocation.get('org', '')
+            )
 
             return json.dumps({
                 'threat_score': threat_score,
                 'details': {
                     'malicious_samples_count': len(vt_samples),
                     'location': geolocation,
-                    'risk_assessment': 'High' if threat_score > 10 else 'Medium' if threat_score > 5 else 'Low'
+                    'risk_assessment': risk_assessment
                 }
             })
         except Exception as e:
             return json.dumps({"error": f"Threat score assessment failed: {str(e)}"})
 
+    def process_batch(self, observables: Iterable[str]) -> Dict[str, Any]:
+        ip_addresses = list(dict.fromkeys(observables))
+        verdicts = self._prefilter_batch("ip", ip_addresses)
+        lookup_ips = [ip for ip in ip_addresses if ip not in verdicts]
+
+        # Warm the shared cache with bulk provider calls, then score from cache
+        self._cached_lookup_batch(
+            "virustotal", "ipv4", lookup_ips,
+            lambda chunk: _vt_ip_details_batch(self.ti_lookup, chunk),
+            chunk_size=VT_BATCH_SIZE
+        )
+        geo_db = get_geo_database(self.config)
+        remote_ips = [ip for ip in lookup_ips if not geo_db or geo_db.lookup(ip) is None]
+        if self.geolocation_api_key and remote_ips:
+            self._cached_lookup_batch(
+                "ipinfo", "ipv4", remote_ips,
+                lambda chunk: _ipinfo_details_batch(
+                    get_shared_provider_clients(self.config), chunk, self.geolocation_api_key
+                ),
+                chunk_size=IPINFO_BATCH_SIZE
+            )
+        return super().process_batch(ip_addresses)
+
 class ThreatScoreCalculator:
     HIGH_RISK_COUNTRIES = ['RU', 'CN', 'IR', 'KP']
     SUSPICIOUS_ORGS = ['Hosting Provider', 'Cloud Provider']
 
+    # Weighted rule table shared by the scalar and the batch scorer
+    SCORING_RULES = {
+        'sample_weight': 1,
+        'max_sample_points': 10,
+        'high_risk_countries': HIGH_RISK_COUNTRIES,
+        'high_risk_country_weight': 5,
+        'suspicious_orgs': SUSPICIOUS_ORGS,
+        'suspicious_org_weight': 3,
+        'high_threshold': 10,
+        'medium_threshold': 5,
+        # VirusTotal engines flagging a file hash as malicious
+        'malware_high_detections': 10,
+        'malware_medium_detections': 3
+    }
+
     @classmethod
-    def calculate_threat_score(
+    def _rules(cls, rules: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {**cls.SCORING_RULES, **(rules or {})}
+
+    @classmethod
+    def score(
             cls,
-            ip_intelligence: Dict,
-            geolocation: Dict
-    ) -> Dict[str, Any]:
+            sample_count: int,
+            country: Optional[str],
+            organization: Optional[str],
+            rules: Optional[Dict[str, Any]] = None
+    ) -> Tuple[int, str]:
+        """Score one IP from its detected sample count, country code and organization"""
+        rules = cls._rules(rules)
         threat_score = 0
 
         # Score based on malicious samples
-        threat_score += min(len(ip_intelligence.get('detected_samples', [])), 10)
+        threat_score += min(sample_count * rules['sample_weight'], rules['max_sample_points'])
 
         # Score based on geographical risk
-        country = geolocation.get('country')
-        if country in cls.HIGH_RISK_COUNTRIES:
-            threat_score += 5
+        if country in rules['high_risk_countries']:
+            threat_score += rules['high_risk_country_weight']
 
         # Score based on organization
-        org = geolocation.get('organization', '')
-        if any(susp_org in org for susp_org in cls.SUSPICIOUS_ORGS):
-            threat_score += 3
+        if any(susp_org in (organization or '') for susp_org in rules['suspicious_orgs']):
+            threat_score += rules['suspicious_org_weight']
 
         # Determine risk level
         risk_level = (
-            'High' if threat_score > 10 else
-            'Medium' if threat_score > 5 else
+            'High' if threat_score > rules['high_threshold'] else
+            'Medium' if threat_score > rules['medium_threshold'] else
             'Low'
         )
+        return threat_score, risk_level
+
+    @classmethod
+    def verdict_score(cls, verdict: str, rules: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        """Score for an IP the reputation prefilter decided: blocklisted is High, allowlisted Low"""
+        rules = cls._rules(rules)
+        if verdict == VERDICT_MALICIOUS:
+            return rules['high_threshold'] + 1, 'High'
+        return 0, 'Low'
+
+    @classmethod
+    def malware_score(cls, summary: Dict[str, Any], rules: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        """Score for a MalwareAnalysisTool result, on the same scale and thresholds as the IP scores"""
+        rules = cls._rules(rules)
+        if summary.get('prefilter'):
+            return cls.verdict_score(summary['prefilter'], rules)
+        malicious = (summary.get('detection_rate') or {}).get('malicious') or 0
+        if malicious >= rules['malware_high_detections']:
+            return rules['high_threshold'] + 1, 'High'
+        if malicious >= rules['malware_medium_detections']:
+            return rules['medium_threshold'] + 1, 'Medium'
+        return 0, 'Low'
+
+    @classmethod
+    def calculate_threat_score(
+            cls,
+            ip_intelligence: Dict,
+            geolocation: Dict,
+            rules: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        if ip_intelligence.get('prefilter'):
+            threat_score, risk_level = cls.verdict_score(ip_intelligence['prefilter'], rules)
+        else:
+            threat_score, risk_level = cls.score(
+                len(ip_intelligence.get('detected_samples', [])),
+                geolocation.get('country'),
+                geolocation.get('organization', ''),
+                rules
+            )
 
         return {
             "threat_score": threat_score,
@@ -215,4 +530,74 @@ class ThreatScoreCalculator:
                 "ip_intelligence": ip_intelligence,
                 "geolocation": geolocation
             }
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def calculate_threat_scores(
+            cls,
+            sample_counts,
+            countries,
+            organizations,
+            rules: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized scoring of many IPs at once, identical to the scalar path
+
+        Args:
+            sample_counts (array-like): Detected sample count per IP
+            countries (array-like): Country code per IP (None for unknown)
+            organizations (array-like): Organization string per IP (None for unknown)
+            rules (dict, optional): Overrides for SCORING_RULES
+
+        Returns:
+            dict: ``threat_score`` (int array) and ``risk_level`` (str array)
+        """
+        rules = cls._rules(rules)
+        counts = np.asarray(sample_counts, dtype=np.int64)
+
+        threat_scores = np.minimum(counts * rules['sample_weight'], rules['max_sample_points'])
+
+        # Countries and organizations repeat heavily, so each rule is checked
+        # once per distinct value and broadcast back through the factorized codes
+        high_risk = cls._flag_distinct(countries, lambda country: country in rules['high_risk_countries'])
+        threat_scores = threat_scores + np.where(high_risk, rules['high_risk_country_weight'], 0)
+
+        suspicious = cls._flag_distinct(
+            organizations,
+            lambda org: any(susp_org in org for susp_org in rules['suspicious_orgs'])
+        )
+        threat_scores = threat_scores + np.where(suspicious, rules['suspicious_org_weight'], 0)
+
+        risk_levels = np.select(
+            [threat_scores > rules['high_threshold'], threat_scores > rules['medium_threshold']],
+            ['High', 'Medium'],
+            default='Low'
+        )
+        return {"threat_score": threat_scores, "risk_level": risk_levels}
+
+    @staticmethod
+    def _flag_distinct(values, predicate) -> np.ndarray:
+        import pandas as pd
+
+        codes, distinct = pd.factorize(pd.Series(values, dtype=object))
+        # Missing values get code -1, which picks the trailing False
+        flags = np.array([bool(predicate(value)) for value in distinct] + [False], dtype=bool)
+        return flags[codes]
+
+    @classmethod
+    def score_dataframe(
+            cls,
+            frame: "pd.DataFrame",
+            sample_count_col: str = 'sample_count',
+            country_col: str = 'country',
+            organization_col: str = 'organization',
+            rules: Optional[Dict[str, Any]] = None
+    ) -> "pd.DataFrame":
+        """Return a copy of frame with threat_score and risk_level columns added"""
+        scores = cls.calculate_threat_scores(
+            frame[sample_count_col].to_numpy(),
+            frame[country_col].to_numpy(dtype=object),
+            frame[organization_col].to_numpy(dtype=object),
+            rules
+        )
+        return frame.assign(threat_score=scores['threat_score'], risk_level=scores['risk_level'])
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_FINGERPRINT_FIELDS = (
+    "type", "severity", "rule", "rule_id",
+    "src_ip", "dst_ip", "network.src_ip", "network.dst_ip"
+)
+# Fields that classify an alert but do not identify what it is about; an
+# alert matched on these alone is never treated as a repeat
+_CLASSIFIER_FIELDS = {"type", "severity", "tags"}
+
+
+def field_value(alert: Dict[str, Any], path: str):
+    """Resolve a dotted field path ("network.src_ip"); missing fields give None"""
+    value = alert
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class _Group:
+    __slots__ = ("fingerprint", "alert", "first_seen", "last_seen", "count", "record")
+
+    def __init__(self, fingerprint: str, alert: Dict[str, Any], now: float):
+        self.fingerprint = fingerprint
+        self.alert = alert
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 1
+        self.record = None
+
+
+class AlertAggregator:
+    """
+    Collapse repeated alerts before they reach triage and enrichment
+
+    Alerts are fingerprinted by a configurable set of fields. The first alert
+    of a fingerprint is enriched as usual; repeats seen within `window`
+    seconds of it are only counted. When the window closes, a single
+    aggregate record (the first alert's enriched record plus the count and
+    first/last seen times) is produced for the history. A group whose
+    first alert is still being enriched when its window closes is held back
+    until record_result() or discard() settles it.
+
+    The fingerprint table is an insertion-ordered TTL map capped at
+    `max_fingerprints`; when full, the oldest group is closed early, so
+    memory stays bounded however many distinct alerts arrive. Not
+    thread-safe: it is driven from the listener's event loop.
+    """
+
+    def __init__(
+            self,
+            fields: Iterable[str] = DEFAULT_FINGERPRINT_FIELDS,
+            window: float = 60.0,
+            max_fingerprints: int = 50000,
+            bypass_severities: Iterable[str] = ("critical",)
+    ):
+        self.fields = tuple(fields)
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.bypass_severities = {severity.lower() for severity in bypass_severities}
+        self._groups: "OrderedDict[str, _Group]" = OrderedDict()
+        self._closed: List[_Group] = []
+        self.stats = {"unique": 0, "suppressed": 0, "bypassed": 0, "evicted": 0}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            fields=[field.strip() for field in config.AGGREGATION_FIELDS.split(",") if field.strip()],
+            window=config.AGGREGATION_WINDOW,
+            max_fingerprints=config.AGGREGATION_MAX_FINGERPRINTS,
+            bypass_severities=[s.strip() for s in config.AGGREGATION_BYPASS_SEVERITIES.split(",") if s.strip()]
+        )
+
+    def fingerprint(self, alert: Dict[str, Any]) -> Optional[str]:
+        """Stable digest of the configured fields, or None if none of them identify the alert"""
+        values = [(field, field_value(alert, field)) for field in self.fields]
+        values = [(field, value) for field, value in values if value not in (None, "", [], {})]
+        if all(field in _CLASSIFIER_FIELDS for field, _ in values):
+            return None
+        canonical = json.dumps(values, sort_keys=True, default=str).lower()
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    def observe(self, alert: Dict[str, Any], now: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Register an incoming alert
+
+        Args:
+            alert (dict): Parsed alert
+            now (float, optional): Arrival time; defaults to time.time()
+
+        Returns:
+            tuple: (enrich, fingerprint) - enrich is False for a duplicate that
+            was folded into an open group and needs no further processing
+        """
+        severity = str(alert.get("severity", "")).lower()
+        fingerprint = None if severity in self.bypass_severities else self.fingerprint(alert)
+        if fingerprint is None:
+            self.stats["bypassed"] += 1
+            return True, None
+
+        now = time.time() if now is None else now
+        group = self._groups.get(fingerprint)
+        if group is not None and now - group.first_seen < self.window:
+            group.count += 1
+            group.last_seen = now
+            self.stats["suppressed"] += 1
+            return False, fingerprint
+
+        if group is not None:
+            # Window over but not yet swept: close it and start a fresh group
+            self._closed.append(self._groups.pop(fingerprint))
+        elif len(self._groups) >= self.max_fingerprints:
+            self._closed.append(self._groups.popitem(last=False)[1])
+            self.stats["evicted"] += 1
+
+        self._groups[fingerprint] = _Group(fingerprint, alert, now)
+        self.stats["unique"] += 1
+        return True, fingerprint
+
+    def _awaiting_result(self, fingerprint: Optional[str]) -> Optional[_Group]:
+        """Oldest group of fingerprint, open or closed, whose first alert has no record yet"""
+        if not fingerprint:
+            return None
+        for group in self._closed:
+            if group.fingerprint == fingerprint and group.record is None:
+                return group
+        group = self._groups.get(fingerprint)
+        return group if group is not None and group.record is None else None
+
+    def record_result(self, fingerprint: Optional[str], record: Dict[str, Any]):
+        """Remember the enriched record of a group's first alert for its aggregate"""
+        group = self._awaiting_result(fingerprint)
+        if group is not None:
+            group.record = record
+
+    def discard(self, fingerprint: Optional[str]):
+        """
+        Drop the group whose first alert failed to enrich
+
+        Its repeats were already counted and settled, so no aggregate is
+        written for them; the next alert with this fingerprint starts a new
+        group and is enriched.
+        """
+        group = self._awaiting_result(fingerprint)
+        if group is None:
+            return
+        if self._groups.get(fingerprint) is group:
+            del self._groups[fingerprint]
+        else:
+            self._closed.remove(group)
+
+    def expire(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Close every group whose window has ended; returns aggregate records for groups with repeats"""
+        now = time.time() if now is None else now
+        # Groups are in first_seen order, so only the front can have expired
+        while self._groups:
+            group = next(iter(self._groups.values()))
+            if now - group.first_seen < self.window:
+                break
+            self._closed.append(self._groups.popitem(last=False)[1])
+        return self._drain_closed()
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Close all open groups (on shutdown)"""
+        self._closed.extend(self._groups.values())
+        self._groups.clear()
+        return self._drain_closed(final=True)
+
+    def _drain_closed(self, final: bool = False) -> List[Dict[str, Any]]:
+        closed, self._closed = self._closed, []
+        if not final:
+            # Repeats of an alert that is still being enriched wait for its record
+            self._closed = [group for group in closed if group.count > 1 and group.record is None]
+            closed = [group for group in closed if group.count == 1 or group.record is not None]
+        return [self._aggregate_record(group) for group in closed if group.count > 1]
+
+    @staticmethod
+    def _aggregate_record(group: _Group) -> Dict[str, Any]:
+        # The first alert's history record already exists; this one carries
+        # its enrichment forward with the number of alerts it stands for
+        record = dict(group.record) if group.record else {"alert": group.alert}
+        record.pop("seq", None)
+        record.pop("ts", None)
+        record["aggregation"] = {
+            "fingerprint": group.fingerprint,
+            "count": group.count,
+            "first_seen": group.first_seen,
+            "last_seen": group.last_seen
+        }
+        return record
+
+    def __len__(self) -> int:
+        return len(self._groups)
@@ -0,0 +1,79 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from agents.agent_factory import ThreatIntelAgentFactory
+from telemetry.tracing import span
+from tools.rate_limiter import lookup_priority, priority_for_triage
+from tools.reputation_prefilter import get_shared_prefilter
+from triage.alert_router import AlertRouter, ROUTE_FAST_PATH
+from triage.fast_path import FastPathEnricher
+from triage.ioc_extractor import extract_iocs_from_alert, summarize_iocs
+from triage.rules_engine import TriageRulesEngine
+from triage.triage_logic import triage_alert
+
+
+class AlertPipeline:
+    """
+    Triage and enrich one alert, independent of how it was delivered
+
+    Used on worker threads by NATSAlertListener and inside each worker
+    process of the sharded multi-process mode.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.agent_factory = ThreatIntelAgentFactory(config)
+        self.router = AlertRouter.from_config(config)
+        self.fast_path = FastPathEnricher.from_factory(self.agent_factory, config.BATCH_MAX_WORKERS)
+        prefilter = get_shared_prefilter(config)
+        self.rules = TriageRulesEngine.from_config(config, reputation=prefilter.reputation if prefilter else None)
+
+    def process(self, alert: Dict[str, Any], extracted: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """Return the history record for an alert (blocking; call from a worker thread)"""
+        # 🧬 Step 0: Pull observables out of the alert once, up front
+        extracted = extracted or extract_iocs_from_alert(alert)
+        observables = {ioc_type: values for ioc_type, values in extracted.items() if values}
+        iocs = summarize_iocs(extracted)
+
+        # 🔎 Step 1: Triage
+        with span("triage"):
+            triage_result = self.rules.triage(alert, extracted) if self.rules else triage_alert(alert)
+        print(f"🧪 Triage Result: {triage_result}")
+
+        # High severity alerts get first claim on the provider quota
+        with lookup_priority(priority_for_triage(triage_result)):
+            # ⚡ Step 2a: Deterministic fast path for routine, well-structured alerts
+            if self.config.FAST_PATH_ENABLED and self.router.route(triage_result, iocs) == ROUTE_FAST_PATH:
+                with span("fast_path"):
+                    enrichment = self.fast_path.enrich(alert, iocs)
+                if not self.router.needs_escalation(enrichment):
+                    print(f"⚡ Fast-path Output: score={enrichment['threat_score']} risk={enrichment['risk_level']}\n")
+                    return {
+                        "alert": alert,
+                        "triage": triage_result,
+                        "iocs": observables,
+                        "enrichment": enrichment
+                    }
+                print("⬆️ Fast-path result needs review, escalating to agent")
+
+            # 🧠 Step 2b: Use Agent to enrich/analyze
+            with span("agent"), self.agent_factory.react_agent() as agent:
+                result = agent.invoke({
+                    "input": f"{json.dumps(alert)}\n\nExtracted observables: {json.dumps(observables)}"
+                })
+
+        print(f"🤖 Agent Output:\n{result}\n")
+
+        return {
+            "alert": alert,
+            "triage": triage_result,
+            "iocs": observables
+        }
+
+    def warm_up(self):
+        """Load the agent backends ahead of the first escalation, logging instead of raising"""
+        try:
+            self.agent_factory.warm_up()
+            print("🔥 Agent backends loaded")
+        except Exception as e:
+            print(f"⚠️ Warm-up failed, agent backends will load on first use: {str(e)}")
@@ -0,0 +1,46 @@
+from typing import Any, Dict, List, Optional
+
+ROUTE_FAST_PATH = "fast_path"
+ROUTE_AGENT = "agent"
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2}
+
+
+def severity_rank(triage_result: str) -> Optional[int]:
+    """Rank a triage_alert() label; unknown/unclassified labels rank as None"""
+    for name, rank in SEVERITY_RANK.items():
+        if f"{name} severity" in triage_result.lower():
+            return rank
+    return None
+
+
+class AlertRouter:
+    """
+    Decide whether an alert can be enriched by the deterministic fast path or
+    has to be escalated to the LLM agent.
+
+    An alert is escalated when it carries no usable IOC, when triage could
+    not classify it, when its severity reaches the escalation threshold, or
+    when the fast-path result itself looks dangerous or incomplete.
+    """
+
+    def __init__(self, escalation_severity: str = "high", escalation_risk_levels=("High",)):
+        self.escalation_rank = SEVERITY_RANK.get(escalation_severity.lower(), SEVERITY_RANK["high"])
+        self.escalation_risk_levels = set(escalation_risk_levels)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(escalation_severity=config.FAST_PATH_ESCALATION_SEVERITY)
+
+    def route(self, triage_result: str, iocs: Dict[str, List[str]]) -> str:
+        if not any(iocs.values()):
+            return ROUTE_AGENT
+
+        rank = severity_rank(triage_result)
+        if rank is None or rank >= self.escalation_rank:
+            return ROUTE_AGENT
+
+        return ROUTE_FAST_PATH
+
+    def needs_escalation(self, enrichment: Dict[str, Any]) -> bool:
+        return bool(enrichment.get("errors")) or enrichment.get("risk_level") in self.escalation_risk_levels
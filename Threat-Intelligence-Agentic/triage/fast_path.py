@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from telemetry.tracing import in_current_context
+from tools.threat_intelligence_tools import ThreatScoreCalculator
+from triage.ioc_extractor import extract_iocs_from_alert, summarize_iocs
+
+RISK_ORDER = {"Low": 0, "Medium": 1, "High": 2}
+
+
+class FastPathEnricher:
+    """
+    Enrich an alert by calling the tools directly instead of running the agent
+
+    IP intelligence, geolocation and malware lookups run in parallel. Each IP
+    and each file hash is scored with ThreatScoreCalculator, and the alert
+    takes the highest score and risk level of either.
+    """
+
+    def __init__(self, ip_intel_tool, geolocation_tool, malware_tool, max_workers: int = 8):
+        self.ip_intel_tool = ip_intel_tool
+        self.geolocation_tool = geolocation_tool
+        self.malware_tool = malware_tool
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fast-path")
+
+    @classmethod
+    def from_factory(cls, agent_factory, max_workers: int = 8):
+        """Reuse the tool instances (and their caches) owned by an agent factory"""
+        return cls(
+            agent_factory.ip_intel_tool,
+            agent_factory.geolocation_tool,
+            agent_factory.malware_tool,
+            max_workers=max_workers
+        )
+
+    def enrich(self, alert: Dict[str, Any], iocs: Dict[str, List[str]] = None) -> Dict[str, Any]:
+        iocs = iocs or summarize_iocs(extract_iocs_from_alert(alert))
+        ips, hashes = iocs.get("ips", []), iocs.get("hashes", [])
+
+        # Pool threads run in the caller's context so lookup priority and trace spans carry over
+        ip_intel_future = self._pool.submit(in_current_context(self.ip_intel_tool.process_batch), ips)
+        geolocation_future = self._pool.submit(in_current_context(self.geolocation_tool.process_batch), ips)
+        malware_future = self._pool.submit(in_current_context(self.malware_tool.process_batch), hashes)
+
+        ip_intel = ip_intel_future.result()
+        geolocation = geolocation_future.result()
+        malware = malware_future.result()
+
+        ip_scores = {
+            ip: ThreatScoreCalculator.calculate_threat_score(ip_intel[ip], geolocation[ip])
+            for ip in ips
+        }
+        hash_scores = {
+            file_hash: ThreatScoreCalculator.malware_score(malware[file_hash])
+            for file_hash in hashes
+            if isinstance(malware.get(file_hash), dict) and "error" not in malware[file_hash]
+        }
+        scores = [(score["threat_score"], score["risk_level"]) for score in ip_scores.values()]
+        scores += list(hash_scores.values())
+        errors = [
+            result["error"]
+            for result in list(ip_intel.values()) + list(geolocation.values()) + list(malware.values())
+            if isinstance(result, dict) and "error" in result
+        ]
+
+        threat_score = max((score for score, _ in scores), default=0)
+        risk_level = max((risk for _, risk in scores), key=RISK_ORDER.get, default="Low")
+
+        return {
+            "mode": "fast_path",
+            "iocs": iocs,
+            "threat_score": threat_score,
+            "risk_level": risk_level,
+            "ip_scores": ip_scores,
+            "hash_risk_levels": {file_hash: risk for file_hash, (_, risk) in hash_scores.items()},
+            "malware": malware,
+            "errors": errors
+        }
@@ -0,0 +1,147 @@
+import ipaddress
+import re
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+IOC_TYPES = ("ipv4", "ipv6", "cidr", "md5", "sha1", "sha256", "domain", "url")
+
+# Common defanging styles: 1[.]2[.]3[.]4, evil(dot)com, hxxps[:]//...
+_DEFANG_RE = re.compile(r"\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)|\[:\]|\[://\]|hxxp", re.IGNORECASE)
+_REFANG_MAP = {
+    "[.]": ".", "(.)": ".", "{.}": ".", "[dot]": ".", "(dot)": ".",
+    "[:]": ":", "[://]": "://", "hxxp": "http"
+}
+
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+
+# One alternation scanned in a single pass; earlier groups win, so URLs are
+# consumed before their hosts and IPv4 before the domain pattern
+_IOC_RE = re.compile(
+    r"(?P<url>\b(?:https?|ftp)://[^\s\"'<>\\]+)"
+    rf"|(?P<ipv4>(?<![\d.]){_OCTET}(?:\.{_OCTET}){{3}}(?:/(?:3[0-2]|[12]?\d))?(?!\.?\d))"
+    r"|(?P<hash>\b[A-Fa-f0-9]{32}(?:[A-Fa-f0-9]{8}(?:[A-Fa-f0-9]{24})?)?\b)"
+    r"|(?P<domain>\b(?:[A-Za-z0-9-]{1,63}\.)+[A-Za-z]{2,63}\b)"
+    r"|(?P<ipv6>(?<![\w:])(?:[A-Fa-f0-9]{0,4}:){2,7}[A-Fa-f0-9]{0,4}(?:/\d{1,3})?(?![\w:]))"
+)
+
+_HASH_TYPES = {32: "md5", 40: "sha1", 64: "sha256"}
+
+# Suffixes that look like TLDs but are almost always file names in telemetry
+_FILE_SUFFIXES = frozenset({
+    "exe", "dll", "sys", "bat", "cmd", "ps1", "vbs", "js", "jar", "py", "sh",
+    "json", "jsonl", "xml", "yaml", "yml", "ini", "cfg", "conf", "log", "txt", "csv",
+    "htm", "html", "php", "asp", "aspx", "doc", "docx", "xls", "xlsx", "pdf",
+    "zip", "rar", "gz", "tar", "tmp", "dat", "bin", "png", "jpg", "gif", "local"
+})
+
+_URL_TRAILING = ".,;:!?)]}'\""
+
+
+def refang(text: str) -> str:
+    """Undo common IOC defanging so the patterns can match"""
+    return _DEFANG_RE.sub(lambda m: _REFANG_MAP[m.group(0).lower()], text)
+
+
+def _add_ip(iocs: Dict[str, Dict[str, None]], value: str):
+    try:
+        if "/" in value:
+            network = ipaddress.ip_network(value, strict=False)
+            iocs["cidr"][str(network)] = None
+        else:
+            address = ipaddress.ip_address(value)
+            iocs["ipv4" if address.version == 4 else "ipv6"][str(address)] = None
+    except ValueError:
+        pass
+
+
+def _add_domain(iocs: Dict[str, Dict[str, None]], value: str):
+    domain = value.lower().rstrip(".")
+    labels = domain.split(".")
+    if labels[-1] in _FILE_SUFFIXES:
+        return
+    # The scan pattern is loose about hyphens; DNS labels cannot start or end with one
+    if any(label.startswith("-") or label.endswith("-") for label in labels):
+        return
+    iocs["domain"][domain] = None
+
+
+def extract_iocs_from_text(text: str) -> Dict[str, List[str]]:
+    """
+    Extract, normalize and de-duplicate observables from free text
+
+    Args:
+        text (str): Text to scan (defanged IOCs are refanged first)
+
+    Returns:
+        dict: Observables per IOC type, in order of first appearance
+    """
+    iocs = {ioc_type: {} for ioc_type in IOC_TYPES}
+    if text:
+        _scan(refang(text), iocs)
+    return {ioc_type: list(values) for ioc_type, values in iocs.items()}
+
+
+def _scan(text: str, iocs: Dict[str, Dict[str, None]]):
+    for match in _IOC_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+
+        if kind == "hash":
+            iocs[_HASH_TYPES[len(value)]][value.lower()] = None
+        elif kind == "ipv4" and "/" not in value:
+            # The octet pattern only admits canonical dotted quads, no re-parse needed
+            iocs["ipv4"][value] = None
+        elif kind == "ipv4" or kind == "ipv6":
+            _add_ip(iocs, value)
+        elif kind == "domain":
+            _add_domain(iocs, value)
+        else:
+            url = value.rstrip(_URL_TRAILING)
+            try:
+                parts = urlsplit(url)
+                host = parts.hostname
+            except ValueError:
+                continue
+            if not host:
+                continue
+            iocs["url"][parts._replace(scheme=parts.scheme.lower(), netloc=parts.netloc.lower()).geturl()] = None
+            try:
+                ipaddress.ip_address(host)
+            except ValueError:
+                _add_domain(iocs, host)
+            else:
+                _add_ip(iocs, host)
+
+
+def extract_iocs_from_alert(alert: Any) -> Dict[str, List[str]]:
+    """
+    Extract observables from every string value of a nested alert
+
+    Args:
+        alert (Any): Parsed alert JSON (dicts, lists and scalars)
+
+    Returns:
+        dict: Observables per IOC type, de-duplicated across the alert
+    """
+    strings = []
+    stack = [alert]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            strings.append(node)
+        elif isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+    # Scanning one joined buffer is much cheaper than one regex pass per field;
+    # reversing restores document order after the stack walk
+    return extract_iocs_from_text("\n".join(reversed(strings)))
+
+
+def summarize_iocs(iocs: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Group extracted observables into the IPs/hashes shape used by the enrichment tools"""
+    return {
+        "ips": iocs["ipv4"] + iocs["ipv6"],
+        "hashes": iocs["md5"] + iocs["sha1"] + iocs["sha256"]
+    }
@@ -0,0 +1,374 @@
+import itertools
+import json
+import operator
+import re
+import string
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from triage.alert_aggregator import field_value
+from triage.ioc_extractor import extract_iocs_from_alert
+
+# Conditions a rule may use; every condition maps field -> accepted values,
+# values within a condition are OR'ed and conditions within a rule AND'ed
+CONDITIONS = ("equals", "contains", "regex", "tags_any", "tags_all", "ioc_reputation")
+
+DEFAULT_LABEL = "❔ Unclassified - severity: {severity}"
+ERROR_LABEL = "❌ Error during triage: {error}"
+
+# (ioc_type, value) -> verdict such as "malicious", or None when unknown
+ReputationLookup = Callable[[str, str], Optional[str]]
+
+
+def _normalize(value: Any):
+    """Case-insensitive view of a field: lists become frozensets, missing becomes ''"""
+    if isinstance(value, str):
+        return value.lower()
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple, set)):
+        return frozenset(str(item).lower() for item in value)
+    return str(value).lower()
+
+
+def _as_list(value) -> List[str]:
+    return [str(item).lower() for item in (value if isinstance(value, list) else [value])]
+
+
+class _Rule:
+    __slots__ = ("name", "label", "template", "regexes", "tags_any", "tags_all", "reputation")
+
+    def __init__(self, name: str, label: str):
+        self.name = name
+        self.label = label
+        self.template = "{" in label
+        self.regexes: List[Tuple[str, re.Pattern]] = []
+        self.tags_any: List[Tuple[str, frozenset]] = []
+        self.tags_all: List[Tuple[str, frozenset]] = []
+        self.reputation: Dict[str, frozenset] = {}
+
+
+_UNKNOWN = object()
+
+# (label from the field conditions, ({ioc_type: verdicts}, label) overrides in rule order)
+_Outcome = Tuple[str, Tuple[Tuple[Dict[str, frozenset], str], ...]]
+
+
+class TriageRulesEngine:
+    """
+    Ordered, first-match-wins triage rules compiled into a bitset matcher
+
+    Rules are loaded from a JSON file of the form::
+
+        {
+          "default": "❔ Unclassified - severity: {severity}",
+          "reputation": {"malicious": ["203.0.113.7"]},
+          "rules": [
+            {"name": "edr-ransomware", "label": "🚨 High Severity",
+             "equals": {"source": ["edr"]}, "tags_any": {"tags": ["ransomware"]}},
+            {"name": "high", "label": "🚨 High Severity",
+             "equals": {"severity": ["high", "sev-high"]}}
+          ]
+        }
+
+    Field paths may be dotted ("network.src_ip") and all matching is
+    case-insensitive. Labels may reference top-level fields as `{severity}`.
+
+    `equals` and `contains` conditions are compiled into per-field lookup
+    tables of rule bitmasks, so an alert is narrowed to its candidate rules
+    with a few dict lookups; regex and tag conditions are only checked for
+    those candidates, in rule order. That outcome is memoized by the values
+    of the fields the rules reference, together with the reputation rules
+    ahead of the settling rule that would give a different label. Only
+    those are checked per alert, so IOC reputation is consulted only where
+    a verdict could still change the label, and large replays of similar
+    alerts stay cheap.
+    """
+
+    def __init__(
+            self,
+            rules: List[Dict[str, Any]],
+            default: str = DEFAULT_LABEL,
+            reputation: Optional[ReputationLookup] = None,
+            memo_size: int = 65536
+    ):
+        self.default = default
+        self.reputation = reputation
+        self.memo_size = memo_size
+        self._memo: Dict[tuple, _Outcome] = {}
+        self._rules: List[_Rule] = []
+        self._equals: Dict[str, Dict[str, int]] = {}
+        self._contains: Dict[str, List[Tuple[str, int]]] = {}
+        self._contains_memo: Dict[Tuple[str, str], int] = {}
+        self._compile(rules)
+
+    @classmethod
+    def from_file(cls, path: str, reputation: Optional[ReputationLookup] = None) -> "TriageRulesEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        if spec.get("reputation"):
+            static = cls.static_reputation(spec["reputation"])
+            reputation = cls.chain_reputation(reputation, static) if reputation else static
+        return cls(spec.get("rules", []), default=spec.get("default", DEFAULT_LABEL), reputation=reputation)
+
+    @classmethod
+    def from_config(cls, config, reputation: Optional[ReputationLookup] = None) -> Optional["TriageRulesEngine"]:
+        """Load TRIAGE_RULES_FILE, or return None to keep the built-in triage_alert()"""
+        if not config.TRIAGE_RULES_FILE:
+            return None
+        return cls.from_file(config.TRIAGE_RULES_FILE, reputation=reputation)
+
+    @staticmethod
+    def static_reputation(verdicts: Dict[str, List[str]]) -> ReputationLookup:
+        """Reputation lookup over inline {verdict: [ioc, ...]} lists from the rules file"""
+        table = {str(ioc).lower(): verdict.lower() for verdict, iocs in verdicts.items() for ioc in iocs}
+        return lambda ioc_type, value: table.get(value.lower())
+
+    @staticmethod
+    def chain_reputation(*lookups: ReputationLookup) -> ReputationLookup:
+        """First non-None verdict of several lookups, e.g. the reputation prefilter then the inline lists"""
+        return lambda ioc_type, value: next(
+            (verdict for verdict in (lookup(ioc_type, value) for lookup in lookups) if verdict is not None),
+            None
+        )
+
+    def _compile(self, rules: List[Dict[str, Any]]):
+        all_bits = (1 << len(rules)) - 1
+        equals_fields, contains_fields, label_fields = set(), set(), set()
+        for spec in rules:
+            equals_fields.update(spec.get("equals", {}))
+            contains_fields.update(spec.get("contains", {}))
+
+        # A rule without a condition on a field matches any value of it
+        self._equals = {field: {} for field in equals_fields}
+        self._equals_wildcard = {field: all_bits for field in equals_fields}
+        self._contains = {field: [] for field in contains_fields}
+        self._contains_wildcard = {field: all_bits for field in contains_fields}
+
+        referenced = set(equals_fields) | set(contains_fields)
+        for index, spec in enumerate(rules):
+            bit = 1 << index
+            name = spec.get("name", f"rule-{index}")
+            unknown = set(spec) - set(CONDITIONS) - {"name", "label"}
+            if unknown:
+                raise ValueError(f"Triage rule '{name}' has unknown keys: {', '.join(sorted(unknown))}")
+            if "label" not in spec:
+                raise ValueError(f"Triage rule '{name}' has no label")
+
+            rule = _Rule(name, spec["label"])
+            for field, values in spec.get("equals", {}).items():
+                self._equals_wildcard[field] &= ~bit
+                for value in _as_list(values):
+                    self._equals[field][value] = self._equals[field].get(value, 0) | bit
+            for field, values in spec.get("contains", {}).items():
+                self._contains_wildcard[field] &= ~bit
+                self._contains[field].extend((value, bit) for value in _as_list(values))
+            for field, pattern in spec.get("regex", {}).items():
+                try:
+                    rule.regexes.append((field, re.compile(pattern, re.IGNORECASE)))
+                except re.error as e:
+                    raise ValueError(f"Triage rule '{name}' has an invalid regex for '{field}': {str(e)}")
+                referenced.add(field)
+            for field, values in spec.get("tags_any", {}).items():
+                rule.tags_any.append((field, frozenset(_as_list(values))))
+                referenced.add(field)
+            for field, values in spec.get("tags_all", {}).items():
+                rule.tags_all.append((field, frozenset(_as_list(values))))
+                referenced.add(field)
+            for ioc_type, verdicts in spec.get("ioc_reputation", {}).items():
+                rule.reputation[ioc_type] = frozenset(_as_list(verdicts))
+            label_fields.update(self._template_fields(rule.label))
+            self._rules.append(rule)
+
+        label_fields.update(self._template_fields(self.default))
+        # The memo key: every field whose value can change the outcome
+        self._fields = tuple(sorted(referenced | label_fields))
+        self._flat = not any("." in field for field in self._fields)
+
+    @staticmethod
+    def _template_fields(label: str) -> List[str]:
+        return [field for _, field, _, _ in string.Formatter().parse(label) if field]
+
+    def _candidates(self, view: Dict[str, Any]) -> int:
+        mask = -1
+        for field, table in self._equals.items():
+            mask &= table.get(view[field], 0) | self._equals_wildcard[field]
+            if not mask:
+                return 0
+        for field, needles in self._contains.items():
+            value = view[field]
+            key = (field, value) if isinstance(value, str) else None
+            hits = self._contains_memo.get(key) if key else None
+            if hits is None:
+                hits = 0
+                for needle, bit in needles:
+                    if isinstance(value, str) and needle in value:
+                        hits |= bit
+                if key and len(self._contains_memo) < self.memo_size:
+                    self._contains_memo[key] = hits
+            mask &= hits | self._contains_wildcard[field]
+            if not mask:
+                return 0
+        return mask
+
+    @staticmethod
+    def _matches(rule: _Rule, view: Dict[str, Any]) -> bool:
+        """Regex and tag conditions; reputation is checked per alert by _resolve()"""
+        for field, pattern in rule.regexes:
+            value = view[field]
+            if isinstance(value, frozenset):
+                if not any(pattern.search(item) for item in value):
+                    return False
+            elif not pattern.search(value):
+                return False
+        for field, tags in rule.tags_any:
+            value = view[field]
+            if tags.isdisjoint(value if isinstance(value, frozenset) else {value}):
+                return False
+        for field, tags in rule.tags_all:
+            value = view[field]
+            if not tags.issubset(value if isinstance(value, frozenset) else {value}):
+                return False
+        return True
+
+    def _label(self, label: str, template: bool, view: Dict[str, Any]) -> str:
+        if not template:
+            return label
+        return label.format_map({
+            field: ", ".join(sorted(value)) if isinstance(value, frozenset) else value
+            for field, value in view.items()
+        })
+
+    def _outcome(self, alert: Dict[str, Any]) -> _Outcome:
+        """Settle an alert on its field values alone, keeping the reputation rules that could still override it"""
+        fields = self._fields
+        raw = map(alert.get, fields) if self._flat else (field_value(alert, field) for field in fields)
+        key = tuple(map(_normalize, raw))
+        outcome = self._memo.get(key)
+        if outcome is not None:
+            return outcome
+
+        view = dict(zip(fields, key))
+        mask = self._candidates(view)
+        label, pending = None, []
+        while mask:
+            low = mask & -mask
+            rule = self._rules[low.bit_length() - 1]
+            mask ^= low
+            if not self._matches(rule, view):
+                continue
+            if not rule.reputation:
+                label = self._label(rule.label, rule.template, view)
+                break
+            # Without a lookup reputation rules never match
+            if self.reputation is not None:
+                pending.append((rule.reputation, self._label(rule.label, rule.template, view)))
+        if label is None:
+            label = self._label(self.default, "{" in self.default, view)
+        # A trailing override with the settled label cannot change the result, so skip its lookups
+        while pending and pending[-1][1] == label:
+            pending.pop()
+
+        outcome = (label, tuple(pending))
+        if len(self._memo) < self.memo_size:
+            self._memo[key] = outcome
+        return outcome
+
+    def _resolve(
+            self,
+            outcome: _Outcome,
+            alert: Dict[str, Any],
+            extracted: Optional[Dict[str, List[str]]],
+            verdicts: Optional[Dict[str, Dict[str, Optional[str]]]] = None
+    ) -> str:
+        """Apply the pending reputation overrides; verdicts ({ioc_type: {value: verdict}}) memoizes lookups"""
+        label, pending = outcome
+        if not pending:
+            return label
+        # Extracted IOCs are only needed (and computed) for reputation rules
+        if extracted is None:
+            extracted = extract_iocs_from_alert(alert)
+        reputation = self.reputation
+        if verdicts is None:
+            verdicts = {}
+        for conditions, override in pending:
+            # Alerts carry few observables, so walk those rather than every condition
+            for ioc_type, values in extracted.items():
+                if not values:
+                    continue
+                accepted = conditions.get(ioc_type)
+                if accepted is None:
+                    continue
+                known = verdicts.get(ioc_type)
+                if known is None:
+                    known = verdicts[ioc_type] = {}
+                for value in values:
+                    verdict = known.get(value, _UNKNOWN)
+                    if verdict is _UNKNOWN:
+                        verdict = known[value] = reputation(ioc_type, value)
+                    if verdict in accepted:
+                        return override
+        return label
+
+    def _evaluate(self, alert: Dict[str, Any], extracted: Optional[Dict[str, List[str]]]) -> str:
+        try:
+            return self._resolve(self._outcome(alert), alert, extracted)
+        except Exception as e:
+            return ERROR_LABEL.format(error=str(e))
+
+    def triage(self, alert: Dict[str, Any], extracted: Optional[Dict[str, List[str]]] = None) -> str:
+        """Label one alert with the first matching rule (or the default label)"""
+        return self._evaluate(alert, extracted)
+
+    def triage_batch(
+            self,
+            alerts: Iterable[Dict[str, Any]],
+            extracted: Optional[Iterable[Optional[Dict[str, List[str]]]]] = None
+    ) -> List[str]:
+        """
+        Label a batch of alerts (e.g. a history replay)
+
+        Within a batch, alerts are first matched on the raw values of the
+        referenced fields, so repeats skip normalization entirely, and each
+        observable's reputation is looked up at most once.
+
+        Args:
+            alerts (iterable): Parsed alerts
+            extracted (iterable, optional): Pre-extracted IOCs per alert, aligned with alerts
+
+        Returns:
+            list: One triage label per alert, in input order
+        """
+        if extracted is None:
+            extracted = itertools.repeat(None)
+        fields, outcome_of, resolve = self._fields, self._outcome, self._resolve
+        # Dotted paths need field_value(); plain keys can be read straight off the dict
+        if not self._flat:
+            read = lambda alert: tuple(field_value(alert, field) for field in fields)
+        elif len(fields) == 1:
+            read = operator.methodcaller("get", fields[0])
+        else:
+            read = lambda alert: tuple(map(alert.get, fields))
+
+        seen: Dict[Any, _Outcome] = {}
+        verdicts: Dict[str, Dict[str, Optional[str]]] = {}
+        labels = []
+        append = labels.append
+        for alert, iocs in zip(alerts, extracted):
+            try:
+                raw = read(alert)
+                outcome = seen.get(raw)
+            except (AttributeError, TypeError):
+                # Not a dict, or unhashable field values (lists): no raw-key shortcut
+                raw, outcome = _UNKNOWN, None
+            try:
+                if outcome is None:
+                    outcome = outcome_of(alert)
+                    if raw is not _UNKNOWN:
+                        seen[raw] = outcome
+                append(resolve(outcome, alert, iocs, verdicts) if outcome[1] else outcome[0])
+            except Exception as e:
+                append(ERROR_LABEL.format(error=str(e)))
+        return labels
+
+    def __len__(self) -> int:
+        return len(self._rules)
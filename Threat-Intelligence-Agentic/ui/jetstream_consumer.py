@@ -0,0 +1,168 @@
+import asyncio
+import json
+import random
+from typing import Awaitable, Callable, Optional
+
+from nats.js.api import AckPolicy, ConsumerConfig, StreamConfig
+from nats.js.errors import NotFoundError
+
+
+class JetStreamAlertConsumer:
+    """
+    Durable pull consumer for the alert subject
+
+    Messages are fetched in batches while fewer than max_in_flight are
+    unacknowledged, handed to the listener's intake queue together with the
+    message, and only acked by the listener once the history record is
+    written. Failures are nak'ed with exponential backoff; after max_deliver
+    attempts (or when the payload is not JSON) the alert is published to the
+    dead-letter subject and terminated so it is never redelivered.
+    """
+
+    def __init__(self, nc, config, subject: str, enqueue: Callable[[dict, object], Awaitable[None]]):
+        self.nc = nc
+        self.js = nc.jetstream()
+        self.subject = subject
+        self.enqueue = enqueue
+
+        self.stream = config.JS_STREAM
+        self.durable = config.JS_DURABLE
+        self.fetch_batch = config.JS_FETCH_BATCH
+        self.fetch_timeout = config.JS_FETCH_TIMEOUT
+        self.max_in_flight = config.JS_MAX_IN_FLIGHT
+        self.max_deliver = config.JS_MAX_DELIVER
+        self.ack_wait = config.JS_ACK_WAIT
+        self.backoff_base = config.JS_BACKOFF_BASE
+        self.backoff_max = config.JS_BACKOFF_MAX
+        self.dead_letter_subject = config.JS_DEAD_LETTER_SUBJECT
+        self.create_streams = config.JS_CREATE_STREAMS
+
+        self._psub = None
+        self._fetch_task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._slots = asyncio.Condition()
+        self.stats = {"fetched": 0, "acked": 0, "redelivered": 0, "dead_lettered": 0}
+
+    async def _ensure_stream(self, name: str, subjects):
+        try:
+            await self.js.stream_info(name)
+        except NotFoundError:
+            await self.js.add_stream(StreamConfig(name=name, subjects=subjects))
+            print(f"🗄️ Created JetStream stream '{name}' for {subjects}")
+
+    async def start(self):
+        if self.create_streams:
+            await self._ensure_stream(self.stream, [self.subject])
+            if self.dead_letter_subject:
+                await self._ensure_stream(f"{self.stream}_DLQ", [self.dead_letter_subject])
+
+        # Replicas bind to the same durable, so the server spreads messages across them
+        self._psub = await self.js.pull_subscribe(
+            self.subject,
+            durable=self.durable,
+            stream=self.stream,
+            config=ConsumerConfig(
+                ack_policy=AckPolicy.EXPLICIT,
+                ack_wait=self.ack_wait,
+                max_deliver=self.max_deliver,
+                max_ack_pending=self.max_in_flight
+            )
+        )
+        self._fetch_task = asyncio.create_task(self._fetch_loop())
+        print(
+            f"📥 JetStream pull consumer '{self.durable}' on stream '{self.stream}' "
+            f"(batch {self.fetch_batch}, max in flight {self.max_in_flight})"
+        )
+
+    async def _fetch_loop(self):
+        while True:
+            # Only ask for as many messages as there are free in-flight slots
+            async with self._slots:
+                await self._slots.wait_for(lambda: self._in_flight < self.max_in_flight)
+                batch = min(self.fetch_batch, self.max_in_flight - self._in_flight)
+
+            try:
+                msgs = await self._psub.fetch(batch, timeout=self.fetch_timeout)
+            except asyncio.TimeoutError:
+                # No messages within fetch_timeout (nats' TimeoutError subclasses this)
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ JetStream fetch failed: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+
+            self.stats["fetched"] += len(msgs)
+            for msg in msgs:
+                try:
+                    alert = json.loads(msg.data.decode())
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    # Retrying will never fix a malformed payload
+                    try:
+                        await self.dead_letter(msg, f"invalid JSON: {str(e)}")
+                    except Exception as dl_error:
+                        print(f"❌ Could not dead-letter alert: {str(dl_error)}")
+                    continue
+                self._in_flight += 1
+                await self.enqueue(alert, msg)
+
+    async def _release(self):
+        async with self._slots:
+            self._in_flight -= 1
+            self._slots.notify_all()
+
+    async def keep_alive(self, msg):
+        """Extend the ack deadline while a slow (LLM) enrichment is still running"""
+        while True:
+            await asyncio.sleep(self.ack_wait / 2)
+            await msg.in_progress()
+
+    async def ack(self, msg):
+        try:
+            await msg.ack()
+            self.stats["acked"] += 1
+        finally:
+            await self._release()
+
+    async def retry_or_dead_letter(self, msg, error: Exception):
+        """nak with exponential backoff, or dead-letter once max_deliver is reached"""
+        try:
+            deliveries = msg.metadata.num_delivered
+            if deliveries >= self.max_deliver:
+                await self.dead_letter(msg, str(error), deliveries)
+                return
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (deliveries - 1))
+            # Jitter keeps a burst of failures from being redelivered in lockstep
+            await msg.nak(delay=delay * random.uniform(0.8, 1.2))
+            self.stats["redelivered"] += 1
+        finally:
+            await self._release()
+
+    async def dead_letter(self, msg, reason: str, deliveries: Optional[int] = None):
+        if self.dead_letter_subject:
+            headers = {
+                "Alert-Error": " ".join(reason.split())[:1024],
+                "Alert-Subject": msg.subject,
+                "Alert-Deliveries": str(deliveries if deliveries is not None else msg.metadata.num_delivered),
+                "Alert-Stream-Sequence": str(msg.metadata.sequence.stream)
+            }
+            await self.js.publish(self.dead_letter_subject, msg.data, headers=headers)
+        await msg.term()
+        self.stats["dead_lettered"] += 1
+        print(f"☠️ Alert dead-lettered to '{self.dead_letter_subject}': {reason}")
+
+    async def stop(self):
+        """Stop fetching; messages already handed out are still acked by the listener"""
+        if self._fetch_task is not None:
+            self._fetch_task.cancel()
+            try:
+                await self._fetch_task
+            except asyncio.CancelledError:
+                pass
+            self._fetch_task = None
+
+    async def close(self):
+        if self._psub is not None:
+            await self._psub.unsubscribe()
+            self._psub = None
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+# A route handler returns (HTTP status, content type, body)
+Response = Tuple[int, str, Union[str, bytes]]
+Handler = Callable[[], Union[Response, Awaitable[Response]]]
+
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def json_response(status: int, payload: Dict) -> Response:
+    return status, "application/json", json.dumps(payload)
+
+
+class HealthServer:
+    """
+    Minimal asyncio HTTP server for probes, run on the listener's own event loop
+
+    Because it shares the loop, a liveness probe that answers also proves the
+    loop is not blocked. Routes are plain callables so other endpoints can be
+    registered next to /healthz and /readyz.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8081):
+        self.host = host
+        self.port = port
+        self.routes: Dict[str, Handler] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_route(self, path: str, handler: Handler):
+        self.routes[path] = handler
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"🩺 Health endpoints on http://{self.host}:{self.port} ({', '.join(self.routes)})")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await asyncio.wait_for(reader.readline(), 5)).decode("latin-1").split()
+            # Headers are not needed; read them so the client sees a clean response
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1].split("?", 1)[0]
+            handler = self.routes.get(path)
+            if handler is None:
+                status, content_type, body = json_response(404, {"error": f"unknown path {path}"})
+            elif method not in ("GET", "HEAD"):
+                status, content_type, body = json_response(405, {"error": "use GET"})
+            else:
+                try:
+                    result = handler()
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    status, content_type, body = result
+                except Exception as e:
+                    status, content_type, body = json_response(500, {"error": str(e)})
+
+            body = body.encode("utf-8") if isinstance(body, str) else body
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1")
+            )
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import signal
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from triage.ioc_extractor import extract_iocs_from_alert
+
+# Order in which observables are tried as the shard key: alerts about the
+# same IP (or, failing that, the same file) always land on the same process,
+# so that process's enrichment cache and single-flight table see them all
+SHARD_KEY_TYPES = ("ipv4", "ipv6", "sha256", "sha1", "md5", "domain", "url", "cidr")
+# How often the result collector and blocked submits check that the shards are still alive
+LIVENESS_INTERVAL = 1.0
+
+
+def shard_key(alert: Dict[str, Any], extracted: Dict[str, List[str]]) -> str:
+    for ioc_type in SHARD_KEY_TYPES:
+        if extracted.get(ioc_type):
+            return extracted[ioc_type][0]
+    return str(alert.get("id", ""))
+
+
+def shard_for(alert: Dict[str, Any], extracted: Dict[str, List[str]], shards: int) -> int:
+    """Stable shard index (crc32, unlike hash(), is the same in every process)"""
+    return zlib.crc32(shard_key(alert, extracted).encode("utf-8")) % shards
+
+
+def _shard_main(shard: int, inbox, outbox, threads: int):
+    """Entry point of one worker process: run the alert pipeline on a thread pool"""
+    # The parent owns shutdown and sends a sentinel; Ctrl+C must not kill shards mid-alert
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from config.Config import Config
+    from triage.alert_pipeline import AlertPipeline
+
+    config = Config()
+    pipeline = AlertPipeline(config)
+    if config.LISTENER_WARM_UP:
+        threading.Thread(target=pipeline.warm_up, daemon=True).start()
+
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"shard-{shard}")
+    slots = threading.BoundedSemaphore(threads)
+
+    def run(ticket, alert, extracted):
+        try:
+            outbox.put((ticket, True, pipeline.process(alert, extracted)))
+        except Exception as e:
+            outbox.put((ticket, False, str(e)))
+        finally:
+            slots.release()
+
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        # Leave alerts in the shared inbox while every thread is busy
+        slots.acquire()
+        pool.submit(run, *item)
+
+    pool.shutdown(wait=True)
+
+
+class ShardedAlertDispatcher:
+    """
+    Fan alerts out to worker processes, sharded by their primary IOC
+
+    Each process runs its own AlertPipeline (and so its own GIL, caches and
+    agent pool). Results come back to the parent, which keeps sole ownership
+    of the history writer. If a shard process dies (OOM kill, native
+    crash), the alerts it held fail instead of waiting forever, and new
+    alerts for that shard are refused until the listener is restarted
+    (/readyz reports it as not ready).
+    """
+
+    def __init__(self, processes: int, threads_per_process: int, queue_size: int = 100):
+        self.processes = processes
+        self.threads_per_process = threads_per_process
+        self.queue_size = queue_size
+        self._tickets = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ticket_shards: Dict[int, int] = {}
+        self._dead_shards = set()
+        self._stopping = False
+        self._workers = []
+        self._inboxes = []
+        self._outbox = None
+        self._collector = None
+        self._loop = None
+
+    def start(self):
+        """Spawn the worker processes (call from the event loop)"""
+        self._loop = asyncio.get_running_loop()
+        # spawn, not fork: the parent already has threads and an event loop
+        context = multiprocessing.get_context("spawn")
+        self._outbox = context.Queue()
+        self._inboxes = [context.Queue(maxsize=self.queue_size) for _ in range(self.processes)]
+        self._workers = [
+            context.Process(
+                target=_shard_main,
+                args=(shard, inbox, self._outbox, self.threads_per_process),
+                name=f"alert-shard-{shard}",
+                daemon=True
+            )
+            for shard, inbox in enumerate(self._inboxes)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._collector = threading.Thread(target=self._collect, name="shard-results", daemon=True)
+        self._collector.start()
+
+    async def submit(self, alert: Dict[str, Any], extracted: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """Process an alert on its shard and return the history record"""
+        extracted = extracted or extract_iocs_from_alert(alert)
+        shard = shard_for(alert, extracted, self.processes)
+        if shard in self._dead_shards:
+            raise RuntimeError(f"Worker process {shard} is not running")
+        ticket = next(self._tickets)
+        future = self._loop.create_future()
+        self._pending[ticket] = future
+        self._ticket_shards[ticket] = shard
+        # A full shard inbox blocks here, which backs up into the intake queue
+        try:
+            await self._loop.run_in_executor(None, self._put, shard, (ticket, alert, extracted))
+        except BaseException:
+            # Never handed over, so nobody awaits the future; the dead-shard sweep must not fail it
+            self._ticket_shards.pop(ticket, None)
+            self._pending.pop(ticket, None)
+            raise
+        return await future
+
+    def _put(self, shard: int, item):
+        while True:
+            if not self._workers[shard].is_alive():
+                raise RuntimeError(f"Worker process {shard} is not running")
+            try:
+                self._inboxes[shard].put(item, timeout=LIVENESS_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _collect(self):
+        while True:
+            try:
+                item = self._outbox.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                if not self._stopping:
+                    for shard, worker in enumerate(self._workers):
+                        if shard not in self._dead_shards and not worker.is_alive():
+                            self._dead_shards.add(shard)
+                            self._loop.call_soon_threadsafe(self._fail_shard, shard, worker.exitcode)
+                continue
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._resolve, *item)
+
+    def _fail_shard(self, shard: int, exitcode: Optional[int]):
+        """Fail every alert handed to a shard that died"""
+        tickets = [ticket for ticket, owner in self._ticket_shards.items() if owner == shard]
+        print(f"💥 Worker process {shard} exited (code {exitcode}); failing its {len(tickets)} alerts")
+        for ticket in tickets:
+            self._resolve(ticket, False, f"Worker process {shard} exited with code {exitcode}")
+
+    def _resolve(self, ticket: int, ok: bool, payload: Any):
+        self._ticket_shards.pop(ticket, None)
+        future = self._pending.pop(ticket, None)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def alive(self) -> List[bool]:
+        return [worker.is_alive() for worker in self._workers]
+
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def stop(self, timeout: float = 30.0):
+        """Let every shard finish its queued alerts, then stop the processes"""
+        self._stopping = True
+        for shard, inbox in enumerate(self._inboxes):
+            if self._workers[shard].is_alive():
+                await self._loop.run_in_executor(None, inbox.put, None)
+        for worker in self._workers:
+            await self._loop.run_in_executor(None, worker.join, timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+        self._outbox.put(None)
+        await self._loop.run_in_executor(None, self._collector.join)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Worker process stopped before finishing the alert"))
+        self._pending.clear()
+        self._ticket_shards.clear()
@@ -1,58 +1,316 @@
 import asyncio
 import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
 from nats.aio.client import Client as NATS
-from triage.triage_logic import triage_alert
-from agents.agent_factory import ThreatIntelAgentFactory
+from triage.alert_aggregator import AlertAggregator
+from triage.alert_pipeline import AlertPipeline
+from triage.ioc_extractor import extract_iocs_from_alert
+from storage.alert_history_store import AsyncHistoryWriter, open_history_store
+from telemetry.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from telemetry.tracing import configure_tracing, in_current_context, span, trace
+from tools.provider_clients import get_shared_provider_clients
+from ui.jetstream_consumer import JetStreamAlertConsumer
+from ui.listener_health import HealthServer, json_response
+from ui.listener_workers import ShardedAlertDispatcher
 from config.Config import Config
 
 
 class NATSAlertListener:
-    def __init__(self, nats_url="nats://localhost:4222", subject="alerts.telemetry"):
-        self.nats_url = nats_url
-        self.subject = subject
+    def __init__(self, nats_url=None, subject=None, num_workers=None, queue_size=None,
+                 queue_group=None, processes=None):
         self.config = Config()
-        self.agent_factory = ThreatIntelAgentFactory(self.config)
+        configure_tracing(self.config)
+        self.nats_url = nats_url or self.config.NATS_URL
+        self.subject = subject or self.config.NATS_SUBJECT
+        # Replicas in the same queue group share the subject instead of each
+        # receiving every alert; an empty group means a plain subscription
+        self.queue_group = self.config.NATS_QUEUE_GROUP if queue_group is None else queue_group
+        self.history = open_history_store(self.config)
+        self.history_writer = AsyncHistoryWriter(self.history, max_batch=self.config.HISTORY_WRITE_BATCH)
+
+        # Bounded pipeline: alerts are queued by the NATS callback and enriched
+        # by a pool of workers so a slow LLM/provider call never blocks the loop
+        self.num_workers = num_workers or self.config.ALERT_WORKERS
+        self.queue_size = queue_size or self.config.ALERT_QUEUE_SIZE
+        self.processes = self.config.LISTENER_PROCESSES if processes is None else processes
+
+        if self.processes > 0:
+            # 🧩 Multi-process mode: alerts are sharded by IOC across worker processes
+            self.pipeline = None
+            self.dispatcher = ShardedAlertDispatcher(self.processes, self.num_workers, self.queue_size)
+            self._executor = None
+        else:
+            self.pipeline = AlertPipeline(self.config)
+            self.dispatcher = None
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.num_workers,
+                thread_name_prefix="alert-worker"
+            )
+
+        # 🧮 Repeats of an alert within the window are counted instead of enriched again
+        self.aggregator = AlertAggregator.from_config(self.config) if self.config.AGGREGATION_ENABLED else None
+
+        self._nc = None
+        self._provider_clients = None
+        self._jetstream = None
+        self._queue = None
+        self._subscribed = False
+        self._draining = False
+        self._stop = None
+        self._started_at = time.time()
+        self.stats = {"received": 0, "processed": 0, "failed": 0, "invalid": 0}
+        REGISTRY.register_collector("listener", self.metric_families)
+
+    def _process_alert(self, alert):
+        """Triage and enrich a single alert (runs on a worker thread)"""
+        return self.pipeline.process(alert)
+
+    async def _enrich(self, alert):
+        if self.dispatcher is not None:
+            return await self.dispatcher.submit(alert, extract_iocs_from_alert(alert))
+        loop = asyncio.get_running_loop()
+        # run_in_executor does not carry contextvars over, so the alert's trace is handed to the thread explicitly
+        return await loop.run_in_executor(self._executor, in_current_context(self._process_alert), alert)
+
+    def stop(self):
+        """Ask a running listener to drain and exit, as SIGINT/SIGTERM do (call on its event loop)"""
+        if self._stop is not None:
+            self._stop.set()
+
+    def _health(self):
+        return json_response(200, {"status": "ok", "uptime_seconds": round(time.time() - self._started_at, 1)})
+
+    def _readiness(self):
+        """Ready once connected, subscribed and (in multi-process mode) every shard is alive"""
+        shards = self.dispatcher.alive() if self.dispatcher is not None else []
+        checks = {
+            "nats_connected": bool(self._nc and self._nc.is_connected),
+            "subscribed": self._subscribed,
+            "draining": self._draining,
+            "shards_alive": sum(shards) if shards else None
+        }
+        ready = checks["nats_connected"] and checks["subscribed"] and not self._draining and all(shards)
+        return json_response(200 if ready else 503, {
+            "ready": ready,
+            **checks,
+            "queue_group": self.queue_group or None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "processes": self.processes,
+            "workers": self.num_workers,
+            **self.stats,
+            **(self._jetstream.stats if self._jetstream is not None else {}),
+            "aggregation": dict(self.aggregator.stats, open_groups=len(self.aggregator)) if self.aggregator is not None else None,
+            "providers": self._provider_clients.snapshot() if self._provider_clients is not None else None
+        })
+
+    def _metrics(self):
+        return 200, PROMETHEUS_CONTENT_TYPE, REGISTRY.render()
+
+    def metric_families(self):
+        """Alert counters, queue depth, JetStream settlement and aggregation stats for /metrics"""
+        yield ("threat_intel_alerts_total", "counter", "Alerts seen by the listener by outcome", [
+            ({"outcome": outcome}, count) for outcome, count in self.stats.items()
+        ])
+        yield ("threat_intel_queue_depth", "gauge", "Alerts waiting for a worker", [
+            ({}, self._queue.qsize() if self._queue is not None else 0)
+        ])
+        yield ("threat_intel_queue_capacity", "gauge", "Size of the bounded alert queue", [({}, self.queue_size)])
+        if self._jetstream is not None:
+            yield ("threat_intel_jetstream_messages_total", "counter", "JetStream messages by settlement", [
+                ({"result": result}, count) for result, count in self._jetstream.stats.items()
+            ])
+        if self.aggregator is not None:
+            yield ("threat_intel_aggregated_alerts_total", "counter", "Alerts by aggregation decision", [
+                ({"result": result}, count) for result, count in self.aggregator.stats.items()
+            ])
+            yield ("threat_intel_aggregation_open_groups", "gauge", "Alert groups inside their window", [
+                ({}, len(self.aggregator))
+            ])
+
+    async def _worker(self, queue):
+        while True:
+            # msg is the JetStream message to settle, or None for core NATS
+            alert, msg, fingerprint = await queue.get()
+            keep_alive = asyncio.create_task(self._jetstream.keep_alive(msg)) if msg is not None else None
+            try:
+                with trace("alert", alert_id=alert.get("id") if isinstance(alert, dict) else None):
+                    alert_log = await self._enrich(alert)
+                    # ✍️ Save alert log + triage result; the single writer task batches appends
+                    with span("history_write"):
+                        await self.history_writer.write(alert_log)
+                    if self.aggregator is not None:
+                        # Only a saved record may stand for its group in the aggregate
+                        self.aggregator.record_result(fingerprint, alert_log)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"❌ Error: {str(e)}")
+                if self.aggregator is not None:
+                    # Later repeats must be enriched, not folded into a group that will never have a record
+                    self.aggregator.discard(fingerprint)
+                if msg is not None:
+                    keep_alive.cancel()
+                    try:
+                        await self._jetstream.retry_or_dead_letter(msg, e)
+                    except Exception as settle_error:
+                        print(f"❌ Could not nak alert: {str(settle_error)}")
+            else:
+                if msg is not None:
+                    # Acked only once the record is durable, so a crash means redelivery, not loss.
+                    # Settled outside the try above: a failed ack must not also nak the message
+                    keep_alive.cancel()
+                    try:
+                        await self._jetstream.ack(msg)
+                    except Exception as ack_error:
+                        # The record is written; the redelivery after ack_wait is the cost of a lost ack
+                        print(f"❌ Could not ack alert: {str(ack_error)}")
+            finally:
+                queue.task_done()
+
+    def _admit(self, alert):
+        """Returns (enrich, fingerprint); duplicates inside an open window are only counted"""
+        if self.aggregator is None:
+            return True, None
+        return self.aggregator.observe(alert)
+
+    async def _write_aggregates(self, records):
+        for record in records:
+            try:
+                await self.history_writer.write(record)
+            except Exception as e:
+                print(f"❌ Error writing aggregate: {str(e)}")
+
+    async def _aggregation_flusher(self):
+        """Periodically write one aggregate record per closed group of repeated alerts"""
+        interval = max(1.0, min(self.aggregator.window / 4, 10.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self._write_aggregates(self.aggregator.expire())
 
     async def connect_and_listen(self):
-        nc = NATS()
+        health = None
+        if self.config.HEALTH_PORT:
+            health = HealthServer(self.config.HEALTH_HOST, self.config.HEALTH_PORT)
+            health.add_route("/healthz", self._health)
+            health.add_route("/readyz", self._readiness)
+            if self.config.METRICS_ENABLED:
+                health.add_route("/metrics", self._metrics)
+            try:
+                await health.start()
+            except OSError as e:
+                # Port taken (e.g. a second replica on this host); probes are optional, alerts are not
+                print(f"⚠️ Health endpoints disabled, could not bind {self.config.HEALTH_HOST}:{self.config.HEALTH_PORT}: {e}")
+                health = None
+
+        nc = self._nc = NATS()
         await nc.connect(self.nats_url)
 
         print(f"✅ Connected to NATS at {self.nats_url}, listening on '{self.subject}'")
 
+        self.history_writer.start()
+        if self.pipeline is not None:
+            # Provider HTTP clients live on this loop; worker threads submit their lookups to it
+            self._provider_clients = get_shared_provider_clients(self.config, loop=asyncio.get_running_loop())
+        if self.dispatcher is not None:
+            self.dispatcher.start()
+            print(f"🧩 Sharding alerts by IOC across {self.processes} worker processes")
+        queue = self._queue = asyncio.Queue(maxsize=self.queue_size)
+        # In multi-process mode each shard runs num_workers threads, so keep enough alerts in flight
+        concurrency = self.num_workers * max(self.processes, 1)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(concurrency)]
+
         async def message_handler(msg):
             data = msg.data.decode()
             print(f"\n📩 Received alert: {data}")
 
+            self.stats["received"] += 1
             try:
                 alert = json.loads(data)
+            except json.JSONDecodeError as e:
+                self.stats["invalid"] += 1
+                print(f"❌ Error: {str(e)}")
+                return
 
-                # 🔎 Step 1: Triage
-                triage_result = triage_alert(alert)
-                print(f"🧪 Triage Result: {triage_result}")
+            enrich, fingerprint = self._admit(alert)
+            if not enrich:
+                return
 
-                # 🧠 Step 2: Use Agent to enrich/analyze
-                agent = self.agent_factory.create_react_agent()
-                result = agent.invoke({"input": json.dumps(alert)})
+            # Blocks this subscription while the queue is full (backpressure);
+            # pending messages are buffered by the NATS client meanwhile
+            await queue.put((alert, None, fingerprint))
 
-                print(f"🤖 Agent Output:\n{result}\n")
+        async def enqueue_jetstream(alert, msg):
+            self.stats["received"] += 1
+            if msg.metadata.num_delivered > 1:
+                # A redelivery is a retry of an alert that failed, not a repeat of it
+                await queue.put((alert, msg, None))
+                return
+            enrich, fingerprint = self._admit(alert)
+            if not enrich:
+                # Folded into its group's count; the aggregate record covers it
+                await self._jetstream.ack(msg)
+                return
+            await queue.put((alert, msg, fingerprint))
 
-                # ✍️ (Optional) Save to log or database
-                # ✍️ Save alert log + triage result to file
-                alert_log = {
-                    "alert": alert,
-                    "triage": triage_result
-                }
+        if self.config.NATS_JETSTREAM:
+            # 📥 Durable mode: pull in batches, ack after the history write
+            self._jetstream = JetStreamAlertConsumer(nc, self.config, self.subject, enqueue_jetstream)
+            await self._jetstream.start()
+            group = f" via durable consumer '{self._jetstream.durable}'"
+        else:
+            await nc.subscribe(self.subject, queue=self.queue_group, cb=message_handler)
+            group = f" in queue group '{self.queue_group}'" if self.queue_group else ""
+        self._subscribed = True
+        flusher = asyncio.create_task(self._aggregation_flusher()) if self.aggregator is not None else None
+        print(f"🚀 Waiting for alerts{group} with {concurrency} workers... (Press Ctrl+C to stop)")
 
-                with open("data/alert_history.jsonl", "a", encoding="utf-8") as f:
-                    f.write(json.dumps(alert_log) + "\n")
+        loop = asyncio.get_running_loop()
+        if self.pipeline is not None and self.config.LISTENER_WARM_UP:
+            # Heavy imports happen after the subscription is live, not before
+            loop.run_in_executor(None, self.pipeline.warm_up)
 
-            except Exception as e:
-                print(f"❌ Error: {str(e)}")
+        stop = self._stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                # Signal handlers are not available on Windows event loops
+                pass
 
-        await nc.subscribe(self.subject, cb=message_handler)
-        print("🚀 Waiting for alerts... (Press Ctrl+C to stop)")
-        while True:
-            await asyncio.sleep(1)
+        try:
+            await stop.wait()
+        finally:
+            # 🧹 Graceful drain: stop intake, finish queued alerts, then exit
+            print("🛑 Draining in-flight alerts...")
+            self._draining = True
+            if self._jetstream is not None:
+                # Acks need the connection, so finish queued alerts before draining it
+                await self._jetstream.stop()
+                await queue.join()
+                await self._jetstream.close()
+                await nc.drain()
+            else:
+                await nc.drain()
+                await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if flusher is not None:
+                flusher.cancel()
+                await self._write_aggregates(self.aggregator.flush())
+            if self.dispatcher is not None:
+                await self.dispatcher.stop()
+            await self.history_writer.close()
+            self.history.close()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            if self._provider_clients is not None:
+                await self._provider_clients.aclose()
+            if health is not None:
+                await health.stop()
+            print("👋 Listener stopped")
 
 
 # ✅ Run this only if directly called
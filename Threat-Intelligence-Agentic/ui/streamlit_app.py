@@ -1,12 +1,42 @@
 import streamlit as st
 import json
+import time
 from config.Config import Config
 from agents.agent_factory import ThreatIntelAgentFactory
+from tools.enrichment_cache import CACHE_MISS, EnrichmentCache, MemoryCacheBackend
+from triage.ioc_extractor import extract_iocs_from_text, refang
+from ui.triage_display import display_alert_history
+
+AGENT_CACHE_KEYS = {"🌼 React Agent": "react", "📋 Plan and Execute Agent": "plan_execute"}
+
+
+# Streamlit reruns this script on every interaction; the heavy objects (LLM
+# client, tools, msticpy registry, pooled agents) are built once per process
+# and shared by every session
+@st.cache_resource
+def get_config():
+    return Config()
+
+
+@st.cache_resource
+def get_agent_factory():
+    return ThreatIntelAgentFactory(get_config())
+
+
+@st.cache_resource
+def get_query_cache():
+    config = get_config()
+    return EnrichmentCache(
+        memory=MemoryCacheBackend(config.QUERY_CACHE_MAX_ENTRIES),
+        ttls={"agent": config.QUERY_CACHE_TTL}
+    )
+
 
 class ThreatIntelStreamlitApp:
     def __init__(self):
-        self.config = Config()
-        self.agent_factory = ThreatIntelAgentFactory(self.config)
+        self.config = get_config()
+        self.agent_factory = get_agent_factory()
+        self.query_cache = get_query_cache()
 
     def _render_sidebar(self):
         st.sidebar.header("🌸 Threat Intelligence Config")
@@ -24,17 +54,60 @@ class ThreatIntelStreamlitApp:
         - Analyze threat level
         """)
 
+    def _prepare_query(self, query):
+        """Refang the query and spell out the observables found in it for the agent"""
+        query = refang(query)
+        observables = {ioc_type: values for ioc_type, values in extract_iocs_from_text(query).items() if values}
+        if observables:
+            query = f"{query}\n\nExtracted observables: {json.dumps(observables)}"
+        return query
+
     def _process_query(self, query):
+        """Answer a query, serving repeats from the result cache; returns (result, cache_hit, seconds)"""
+        start = time.perf_counter()
         try:
-            if self.agent_type == "🌼 React Agent":
-                agent = self.agent_factory.create_react_agent()
-                result = agent.invoke({"input": query})
+            query = self._prepare_query(query)
+            agent_key = AGENT_CACHE_KEYS.get(self.agent_type, "react")
+            use_cache = self.config.QUERY_CACHE_TTL > 0
+
+            if use_cache:
+                cached = self.query_cache.get("agent", agent_key, query)
+                if cached is not CACHE_MISS:
+                    return cached, True, time.perf_counter() - start
+
+            if agent_key == "react":
+                with self.agent_factory.react_agent() as agent:
+                    result = agent.invoke({"input": query})
             else:
-                agent = self.agent_factory.create_plan_execute_agent()
-                result = agent.invoke(query)
-            return result
+                with self.agent_factory.plan_execute_agent() as agent:
+                    result = agent.invoke(query)
+
+            if use_cache:
+                self.query_cache.set("agent", agent_key, query, result)
+            return result, False, time.perf_counter() - start
         except Exception as e:
-            return {"error": str(e)}
+            return {"error": str(e)}, False, time.perf_counter() - start
+
+    def _render_result(self, result, cache_hit, elapsed):
+        if cache_hit:
+            st.caption(f"⚡ Cached result · {elapsed * 1000:.0f} ms")
+        else:
+            st.caption(f"🧠 Fresh analysis · {elapsed:.2f} s")
+        st.subheader("📊 Result")
+        st.json(result)
+
+    def _render_cache_stats(self):
+        stats = self.query_cache.stats().get("agent", {})
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        st.sidebar.metric("🗃️ Query cache hit rate", f"{stats.get('hit_rate', 0.0):.0%}", help=f"{lookups} lookups")
+
+        llm_stats = self.agent_factory.llm_cache_stats()
+        if llm_stats:
+            st.sidebar.metric(
+                "🧠 LLM cache hit rate",
+                f"{llm_stats['hit_rate']:.0%}",
+                help=f"Saved {llm_stats['saved_tokens']:,} tokens and {llm_stats['saved_seconds']:.1f} s of LLM time"
+            )
 
     def run(self):
         # 🌈 พาสเทลธีมด้วย CSS
@@ -79,7 +152,7 @@ class ThreatIntelStreamlitApp:
                 return
 
             with st.spinner("🌀 Analyzing Threat Intelligence..."):
-                result = self._process_query(query)
+                self._render_result(*self._process_query(query))
         st.title("🛡️ Threat Intelligence Agentic UI")
 
         # UI แบบเลือกหน้า
@@ -88,16 +161,11 @@ class ThreatIntelStreamlitApp:
         if tab == "🧠 Ask Agent":
             query = st.text_input("Ask the Agent", placeholder="Ex. Analyze alert: 77.246.107.91")
             if query:
-                result = self._process_query(query)
-                st.markdown("### 🧠 Result")
-                st.json(result)
+                self._render_result(*self._process_query(query))
         elif tab == "📋 View Alert History":
-            display_alert_history()
-
-
+            display_alert_history(self.config)
 
-            st.subheader("📊 Result")
-            st.json(result)
+        self._render_cache_stats()
 
 
 def main():
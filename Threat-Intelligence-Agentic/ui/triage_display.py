@@ -1,39 +1,109 @@
-import streamlit as st
 import json
 import os
+import time
 
-def display_alert_history():
-    st.header("📋 Alert Triage History")
+import pandas as pd
+import streamlit as st
+from config.Config import Config
+from storage.alert_history_store import open_history_store, read_tail_lines
+
+# ไฟล์ประวัติแบบเดิม (ก่อนมี history store) ยังแสดงได้โดยอ่านย้อนจากท้ายไฟล์
+LEGACY_HISTORY_FILE = "data/alert_history.jsonl"
+PAGE_SIZES = [25, 50, 100, 250]
 
-    file_path = "data/alert_history.jsonl"
 
-    if not os.path.exists(file_path):
+def _history_row(entry):
+    """Flatten one history record into a table row"""
+    alert = entry.get("alert") or {}
+    enrichment = entry.get("enrichment") or {}
+    tags = alert.get("tags") or []
+    return {
+        "seq": entry.get("seq"),
+        "received": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["ts"])) if entry.get("ts") else "",
+        "alert_id": str(alert.get("id", "N/A")),
+        "type": alert.get("type", "N/A"),
+        "severity": alert.get("severity", "N/A"),
+        "tags": ", ".join(tags) if isinstance(tags, list) else str(tags),
+        "triage": str(entry.get("triage", "❔ Unknown")),
+        "risk": enrichment.get("risk_level", ""),
+        "count": (entry.get("aggregation") or {}).get("count", 1),
+        "iocs": sum(len(values) for values in (entry.get("iocs") or {}).values())
+    }
+
+
+def _display_legacy_history():
+    if not os.path.exists(LEGACY_HISTORY_FILE):
         st.info("No alerts have been received yet.")
         return
+    rows = []
+    for line in read_tail_lines(LEGACY_HISTORY_FILE, 50):  # โชว์ 50 รายการล่าสุด
+        try:
+            rows.append(_history_row(json.loads(line)))
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            continue
+    st.caption(f"Showing the last {len(rows)} entries of {LEGACY_HISTORY_FILE}")
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+
 
-    # ปุ่ม refresh
-    if st.button("🔄 Refresh Alerts"):
-        st.experimental_rerun()
+def display_alert_history(config=None):
+    st.header("📋 Alert Triage History")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    # อ่านอย่างเดียว: listener เป็นผู้เขียนประวัติ
+    store = open_history_store(config or Config(), read_only=True)
+    try:
+        if store.next_seq() == 1:
+            _display_legacy_history()
+            return
 
-    if not lines:
-        st.warning("No alert entries found.")
-        return
+        # ตัวกรองทำงานฝั่ง store (SQLite index) ไม่ได้กรองหลังโหลดทั้งหมด
+        col_severity, col_type, col_tag, col_size = st.columns([2, 2, 2, 1])
+        severity = col_severity.multiselect("Severity", store.distinct("severity"))
+        alert_type = col_type.multiselect("Type", store.distinct("type"))
+        tag = col_tag.multiselect("Tag", store.distinct("tag"))
+        page_size = col_size.selectbox("Rows", PAGE_SIZES, index=1)
 
-    for line in reversed(lines[-50:]):  # โชว์ 50 รายการล่าสุด
-        try:
-            data = json.loads(line)
-            alert = data.get("alert", {})
-            triage = data.get("triage", "❔ Unknown")
-
-            st.markdown("---")
-            st.markdown(f"**🆔 Alert ID:** `{alert.get('id', 'N/A')}`")
-            st.markdown(f"**📛 Type:** `{alert.get('type', 'N/A')}`")
-            st.markdown(f"**🔥 Severity:** `{alert.get('severity', 'N/A')}`")
-            st.markdown(f"**🏷 Tags:** {', '.join(alert.get('tags', []))}")
-            st.markdown(f"**🧪 Triage Result:** {triage}")
-
-        except json.JSONDecodeError:
-            st.error("⚠️ Failed to parse alert entry.")
+        # หน้าแบบ keyset: เก็บ cursor (seq) ของแต่ละหน้า ทำให้ทุกหน้าใช้เวลาเท่ากัน
+        view_key = (tuple(severity), tuple(alert_type), tuple(tag), page_size)
+        state = st.session_state
+        if state.get("history_view") != view_key:
+            state.history_view = view_key
+            state.history_cursors = [None]
+            state.history_rows = []
+            state.history_last_seq = None
+
+        filters = {"severity": severity, "alert_type": alert_type, "tag": tag}
+        cursor = state.history_cursors[-1]
+
+        if cursor is None:
+            # หน้าแรก: refresh แบบเพิ่มเฉพาะรายการที่ใหม่กว่า seq ล่าสุดที่เคยโหลด
+            newer = [
+                _history_row(entry)
+                for entry in store.query(limit=page_size, after_seq=state.history_last_seq, **filters)
+            ]
+            state.history_rows = (newer + state.history_rows)[:page_size]
+            if state.history_rows:
+                state.history_last_seq = state.history_rows[0]["seq"]
+            rows = state.history_rows
+            if newer and len(newer) < len(rows):
+                st.toast(f"🔔 {len(newer)} new alert(s)")
+        else:
+            rows = [_history_row(entry) for entry in store.query(limit=page_size, before_seq=cursor, **filters)]
+
+        col_newer, col_refresh, col_older, col_info = st.columns([1, 1, 1, 4])
+        if col_newer.button("⬅️ Newer", disabled=len(state.history_cursors) == 1):
+            state.history_cursors.pop()
+            st.rerun()
+        if col_refresh.button("🔄 Refresh Alerts"):
+            st.rerun()
+        if col_older.button("Older ➡️", disabled=len(rows) < page_size):
+            state.history_cursors.append(rows[-1]["seq"])
+            st.rerun()
+        col_info.caption(f"Page {len(state.history_cursors)} · {store.count():,} alerts stored")
+
+        if not rows:
+            st.warning("No alert entries found.")
+            return
+
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+    finally:
+        store.close()